@@ -0,0 +1,142 @@
+"""Requests per second of the ``text`` client against a local stub server.
+
+The stub runs in its own process and answers like captura does for document updates, but instantly, so
+what is measured is the client: connection reuse, pool limits, and the
+scheduler. Every run sends ``--requests`` updates through
+:class:`text_client.scheduler.Scheduler` with ``--concurrency`` in flight.
+
+The stub server speaks HTTP/1.1 only, so ``http2`` is not measured here.
+
+.. code:: shell
+
+    PYTHONPATH=src python benchmarks/bench_client.py --concurrency 32
+"""
+
+# =========================================================================== #
+import asyncio
+import logging
+import multiprocessing
+import socket
+import time
+from typing import Annotated, Any, Callable, Dict, List, Optional
+
+import httpx
+import typer
+import uvicorn
+from common import dump, summarize
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse
+from starlette.routing import Route
+
+# --------------------------------------------------------------------------- #
+from text_app.schemas import TextClientConfig
+from text_client.scheduler import Scheduler, create_client
+
+
+async def update_document(request: Request) -> JSONResponse:
+    uuid = request.path_params["uuid"]
+    return JSONResponse(dict(kind="documents", data=dict(uuid=uuid)))
+
+
+app = Starlette(routes=[Route("/documents/{uuid}", update_document, methods=["PATCH"])])
+
+
+def serve(port: int) -> None:
+    uvicorn.run(app, host="127.0.0.1", port=port, log_level="warning")
+
+
+def start_server() -> str:
+    """Run the stub server in a daemon process so that it does not compete
+    with the client for the GIL. Returns its url."""
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+
+    multiprocessing.Process(target=serve, args=(port,), daemon=True).start()
+    while True:
+        try:
+            socket.create_connection(("127.0.0.1", port)).close()
+            break
+        except ConnectionRefusedError:
+            time.sleep(0.05)
+
+    return f"http://127.0.0.1:{port}"
+
+
+async def measure(
+    url: str,
+    client: Callable[[], httpx.AsyncClient],
+    requests: int,
+    concurrency: int,
+    shared: bool,
+) -> Dict[str, Any]:
+    """Send ``requests`` updates. When not ``shared`` a client is created
+    for every request."""
+
+    scheduler = Scheduler(concurrency=concurrency)
+    latencies: List[float] = []
+
+    async def send(client_shared: httpx.AsyncClient | None, index: int) -> None:
+        start = time.perf_counter()
+        path = f"{url}/documents/{index}"
+        if client_shared is not None:
+            res = await scheduler.request(client_shared.patch, path, json={})
+        else:
+            async with client() as client_own:
+                res = await scheduler.request(client_own.patch, path, json={})
+
+        res.raise_for_status()
+        latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    if shared:
+        async with client() as client_shared:
+            await asyncio.gather(*(send(client_shared, i) for i in range(requests)))
+    else:
+        await asyncio.gather(*(send(None, i) for i in range(requests)))
+    elapsed = time.perf_counter() - start
+
+    return dict(**summarize(latencies), requests_per_second=requests / elapsed)
+
+
+def main(
+    requests: Annotated[int, typer.Option("--requests")] = 2000,
+    concurrency: Annotated[int, typer.Option("--concurrency")] = 32,
+    output: Annotated[Optional[str], typer.Option("--output")] = None,
+):
+    # NOTE: Logging every request would dominate the measurement.
+    logging.getLogger("httpx").setLevel(logging.WARNING)
+
+    url = start_server()
+    config = TextClientConfig(concurrency=concurrency)  # type: ignore
+    config_small = TextClientConfig(concurrency=concurrency, keepalive=1)  # type: ignore
+
+    runs: Dict[str, Callable[[], Any]] = {
+        "client_per_request": lambda: measure(
+            url, httpx.AsyncClient, requests, concurrency, shared=False
+        ),
+        "default_client": lambda: measure(
+            url, httpx.AsyncClient, requests, concurrency, shared=True
+        ),
+        "tuned_client": lambda: measure(
+            url, lambda: create_client(config), requests, concurrency, shared=True
+        ),
+        "tuned_client_keepalive_1": lambda: measure(
+            url,
+            lambda: create_client(config_small),
+            requests,
+            concurrency,
+            shared=True,
+        ),
+    }
+    results = {name: asyncio.run(run()) for name, run in runs.items()}
+    dump(
+        dict(requests=requests, concurrency=concurrency, results=results),
+        output,
+    )
+
+
+if __name__ == "__main__":
+    typer.run(main)
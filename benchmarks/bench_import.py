@@ -0,0 +1,124 @@
+"""Time cold starts of the ``text`` CLI and of mounting ``TextView``.
+
+Every run is a fresh interpreter, as in CI and when workers boot, so the
+numbers include importing ``captura`` itself. ``baseline`` imports only
+``captura`` and its client to show how much of the rest is this package.
+With ``--top`` the slowest imports of every command, as reported by
+``python -X importtime``, are included as well.
+
+.. code:: shell
+
+    PYTHONPATH=src python benchmarks/bench_import.py --output baseline.json
+    PYTHONPATH=src python benchmarks/bench_import.py --compare baseline.json
+"""
+
+# =========================================================================== #
+import json
+import os
+import subprocess
+import sys
+import time
+from os import path
+from typing import Annotated, Any, Dict, List, Optional
+
+import typer
+from common import dump, summarize
+
+PATH_HOOKS = path.realpath(
+    path.join(path.dirname(__file__), "..", "docker", "hooks.py")
+)
+
+MOUNT = f"""
+import importlib.util
+from app.views import AppView
+spec = importlib.util.spec_from_file_location("hooks", {PATH_HOOKS!r})
+hooks = importlib.util.module_from_spec(spec)
+spec.loader.exec_module(hooks)
+hooks.captura_plugins_app(AppView)
+"""
+
+COMMANDS: Dict[str, List[str]] = dict(
+    baseline=["-c", "import app, client"],
+    cli_help=["-m", "text_client", "--help"],
+    mount=["-c", MOUNT],
+)
+
+
+def run(args: List[str]) -> float:
+    start = time.perf_counter()
+    subprocess.run(
+        [sys.executable, *args],
+        check=True,
+        env=os.environ,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    return time.perf_counter() - start
+
+
+def importtime(args: List[str], top: int) -> List[Dict[str, Any]]:
+    """Slowest imports by cumulative time in milliseconds."""
+
+    process = subprocess.run(
+        [sys.executable, "-X", "importtime", *args],
+        env=os.environ,
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+        check=True,
+    )
+
+    imports: List[Dict[str, Any]] = []
+    for line in process.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+
+        self_us, cumulative_us, module = line.removeprefix("import time:").split("|")
+        imports.append(
+            dict(
+                module=module.strip(),
+                self=int(self_us) / 1000,
+                cumulative=int(cumulative_us) / 1000,
+            )
+        )
+
+    imports.sort(key=lambda item: item["cumulative"], reverse=True)
+    return imports[:top]
+
+
+def main(
+    runs: Annotated[int, typer.Option("--runs")] = 10,
+    top: Annotated[int, typer.Option("--top")] = 0,
+    output: Annotated[Optional[str], typer.Option("--output")] = None,
+    baseline: Annotated[Optional[str], typer.Option("--compare")] = None,
+    tolerance: Annotated[float, typer.Option("--tolerance")] = 0.1,
+):
+    results: Dict[str, Dict[str, Any]] = dict()
+    for name, args in COMMANDS.items():
+        run(args)
+        results[name] = summarize([run(args) for _ in range(runs)])
+        if top:
+            results[name]["imports"] = importtime(args, top)
+
+    dump(dict(runs=runs, results=results), output)
+
+    if baseline is None:
+        return
+
+    with open(baseline, "r") as file:
+        before = json.load(file)["results"]
+
+    regressions = [
+        f"{name}: `p50` {before[name]['p50']:.1f}ms -> {result['p50']:.1f}ms."
+        for name, result in results.items()
+        if name in before and result["p50"] > before[name]["p50"] * (1 + tolerance)
+    ]
+    for regression in regressions:
+        print(regression)
+
+    if regressions:
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,110 @@
+"""Compare the blocking and async document lookups in ``text_app.depends``.
+
+Every round clears the caches and then fires ``--concurrency`` lookups for
+distinct documents at once, so that every lookup is cold. The blocking lookup
+goes through the threadpool exactly like FastAPI runs sync dependencies.
+
+.. code:: shell
+
+    PYTHONPATH=src python benchmarks/bench_lookup.py --concurrency 200
+"""
+
+# =========================================================================== #
+import asyncio
+import random
+import tempfile
+import time
+from typing import Annotated, Awaitable, Callable, Dict, List, Optional
+
+import typer
+from common import (
+    create_corpus,
+    create_database,
+    create_sessionmakers,
+    create_status,
+    dump,
+    summarize,
+)
+from starlette.concurrency import run_in_threadpool
+
+# --------------------------------------------------------------------------- #
+from text_app import depends
+from text_app.metrics import Timings
+
+Lookup = Callable[[str], Awaitable[depends.HashableDocumentOutput]]
+
+
+def clear() -> None:
+    depends.cache.clear()
+
+
+async def measure(
+    lookup: Lookup,
+    names: List[str],
+    concurrency: int,
+    rounds: int,
+) -> List[float]:
+    latencies: List[float] = []
+
+    async def timed(name: str) -> None:
+        start = time.perf_counter()
+        await lookup(name)
+        latencies.append(time.perf_counter() - start)
+
+    for _ in range(rounds):
+        clear()
+        sample = random.sample(names, min(concurrency, len(names)))
+        await asyncio.gather(*(timed(name) for name in sample))
+
+    return latencies
+
+
+async def run(count: int, concurrency: int, rounds: int) -> Dict[str, Dict]:
+    with tempfile.TemporaryDirectory() as directory:
+        corpus = create_corpus(count)
+        status = create_status(directory, corpus)
+        sessionmaker, async_sessionmaker = create_sessionmakers(
+            create_database(directory, corpus)
+        )
+
+        async def lookup_sync(name: str):
+            return await run_in_threadpool(
+                depends.get_by_name_json_sync,
+                sessionmaker,
+                status,
+                name=name,
+            )
+
+        async def lookup_async(name: str):
+            return await depends.get_by_name_json(
+                Timings(),
+                async_sessionmaker,
+                status,
+                name=name,
+            )
+
+        names = list(corpus)
+        results = {
+            "sync": summarize(await measure(lookup_sync, names, concurrency, rounds)),
+            "async": summarize(await measure(lookup_async, names, concurrency, rounds)),
+        }
+
+    clear()
+    return results
+
+
+def main(
+    count: Annotated[int, typer.Option("--count")] = 1000,
+    concurrency: Annotated[int, typer.Option("--concurrency")] = 100,
+    rounds: Annotated[int, typer.Option("--rounds")] = 10,
+    output: Annotated[Optional[str], typer.Option("--output")] = None,
+):
+    results = asyncio.run(run(count, concurrency, rounds))
+    dump(
+        dict(count=count, concurrency=concurrency, rounds=rounds, results=results),
+        output,
+    )
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,121 @@
+"""Compare rendering ``rst`` with ``publish_parts`` per document against
+:class:`text_app.render.Renderer`.
+
+Every round renders the same ``--count`` generated ``rst`` files once per
+approach, in a fresh renderer, so that the one time setup of the renderer is
+included in its total. Per document latencies come from
+:attr:`text_app.render.Renderer.timings`. Outputs of both approaches are
+compared and must be identical.
+
+.. code:: shell
+
+    PYTHONPATH=src python benchmarks/bench_render.py --count 300
+"""
+
+# =========================================================================== #
+import random
+import tempfile
+import time
+from os import path
+from typing import Annotated, Any, Dict, List, Optional, Tuple
+
+import typer
+from common import dump, summarize
+from docutils.core import publish_parts
+
+# --------------------------------------------------------------------------- #
+from text_app import fields
+from text_app.render import SETTINGS, WRITER, Renderer
+
+WORDS = ("text", "captura", "document", "render", "shard", "status", "page")
+
+
+def create_source(rand: random.Random, index: int) -> str:
+    """A small page with the usual sections, lists, links and code."""
+
+    def paragraph() -> str:
+        words = rand.choices(WORDS, k=rand.randint(20, 80))
+        return " ".join(words).capitalize() + "."
+
+    title = f"Page {index}"
+    lines = [title, "=" * len(title), "", paragraph(), ""]
+    for section in range(rand.randint(1, 4)):
+        heading = f"Section {section}"
+        lines.extend([heading, "-" * len(heading), "", paragraph(), ""])
+        lines.extend(f"- *{word}* ``{word}``" for word in rand.sample(WORDS, 3))
+        lines.extend(["", f"See `page <https://example.com/{index}>`_.", ""])
+        lines.extend([".. code:: python", "", f"    print({index})", ""])
+
+    return "\n".join(lines)
+
+
+def create_sources(directory: str, count: int, seed: int = 0) -> Dict[str, bytes]:
+    """Write ``count`` ``rst`` files to ``directory`` and read them back."""
+
+    rand = random.Random(seed)
+    sources = dict()
+    for index in range(count):
+        filepath = path.join(directory, f"page-{index}.rst")
+        with open(filepath, "w") as file:
+            file.write(create_source(rand, index))
+
+        with open(filepath, "rb") as file:
+            sources[filepath] = file.read()
+
+    return sources
+
+
+def render_per_call(sources: Dict[str, bytes]) -> Tuple[Dict[str, str], List[float]]:
+    outputs: Dict[str, str] = dict()
+    latencies: List[float] = []
+    for name, source in sources.items():
+        start = time.perf_counter()
+        parts = publish_parts(
+            source.decode(),
+            writer_name=WRITER,
+            settings_overrides=SETTINGS,
+        )
+        outputs[name] = str(parts["html_body"])
+        latencies.append(time.perf_counter() - start)
+
+    return outputs, latencies
+
+
+def render_batch(sources: Dict[str, bytes]) -> Tuple[Dict[str, str], List[float]]:
+    renderer = Renderer()
+    outputs = renderer.convert_many(sources, fields.Format.rst, fields.Format.html)
+    return outputs, [timing.seconds for timing in renderer.timings]
+
+
+def main(
+    count: Annotated[int, typer.Option("--count")] = 300,
+    rounds: Annotated[int, typer.Option("--rounds")] = 3,
+    output: Annotated[Optional[str], typer.Option("--output")] = None,
+):
+    results: Dict[str, Dict[str, Any]] = dict()
+    with tempfile.TemporaryDirectory() as directory:
+        sources = create_sources(directory, count)
+        for name, render in (("per_call", render_per_call), ("batch", render_batch)):
+            latencies: List[float] = []
+            totals: List[float] = []
+            for _ in range(rounds):
+                start = time.perf_counter()
+                outputs, latencies_round = render(sources)
+                totals.append(time.perf_counter() - start)
+                latencies.extend(latencies_round)
+
+            results[name] = dict(
+                summarize(latencies),
+                total=summarize(totals),
+                outputs=outputs,
+            )
+
+    if results["per_call"].pop("outputs") != results["batch"].pop("outputs"):
+        raise typer.BadParameter("Outputs of ``per_call`` and ``batch`` differ.")
+
+    speedup = results["per_call"]["total"]["p50"] / results["batch"]["total"]["p50"]
+    dump(dict(count=count, rounds=rounds, speedup=speedup, results=results), output)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,217 @@
+"""Serve the text router in process and measure it.
+
+The captura app is built exactly as in ``docker``, that is by mounting
+``TextView`` using ``captura_plugins_app`` from ``docker/hooks.py``. Requests
+go through ``httpx.ASGITransport`` so that no server or sockets are involved
+and what is measured is the app itself. The caches are cleared before every
+run, so larger corpora mostly measure cold lookups and rendering.
+
+Lifespan events are not sent by the transport, so the cache is not warmed on
+startup and the status file is not watched.
+
+.. code:: shell
+
+    PYTHONPATH=src python benchmarks/bench_serve.py --output baseline.json
+    PYTHONPATH=src python benchmarks/bench_serve.py --compare baseline.json
+"""
+
+# =========================================================================== #
+import asyncio
+import importlib.util
+import json
+import random
+import tempfile
+import time
+from os import path
+from typing import Annotated, Any, Dict, List, Optional
+
+import httpx
+import typer
+from app.depends import async_session_maker, session_maker
+from app.views import AppView
+from common import (
+    create_corpus,
+    create_database,
+    create_sessionmakers,
+    create_status,
+    dump,
+    rss,
+    summarize,
+)
+from fastapi import FastAPI
+
+# --------------------------------------------------------------------------- #
+from text_app import depends
+from text_app.schemas import BuilderConfig
+
+PATH_HOOKS = path.realpath(
+    path.join(path.dirname(__file__), "..", "docker", "hooks.py")
+)
+
+ROUTES: Dict[str, str] = dict(
+    get_by_name="/text/{name}",
+    get_by_name_json="/text/{name}/json",
+)
+
+
+def create_app() -> FastAPI:
+    """Mount ``TextView`` unless ``app`` already did so using its hooks."""
+
+    app: FastAPI = AppView.view_router  # type: ignore
+    if any(getattr(route, "path", "").startswith("/text") for route in app.routes):
+        return app
+
+    spec = importlib.util.spec_from_file_location("hooks", PATH_HOOKS)
+    if spec is None or spec.loader is None:
+        raise ValueError(f"Could not load hooks from `{PATH_HOOKS}`.")
+
+    hooks = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(hooks)
+    hooks.captura_plugins_app(AppView)
+    return app
+
+
+async def measure(
+    client: httpx.AsyncClient,
+    urls: List[str],
+    concurrency: int,
+) -> Dict[str, Any]:
+    """Request every url using ``concurrency`` concurrent clients."""
+
+    latencies: List[float] = []
+    queue = iter(urls)
+
+    async def worker() -> None:
+        for url in queue:
+            start = time.perf_counter()
+            response = await client.get(url)
+            latencies.append(time.perf_counter() - start)
+            if response.status_code != 200:
+                raise ValueError(f"Unexpected status `{response.status_code}`.")
+
+    start = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    elapsed = time.perf_counter() - start
+
+    return dict(
+        **summarize(latencies),
+        throughput=len(urls) / elapsed,
+        rss=rss(),
+    )
+
+
+async def run(
+    app: FastAPI,
+    count: int,
+    concurrencies: List[int],
+    requests: int,
+) -> Dict[str, Dict[str, Any]]:
+    results: Dict[str, Dict[str, Any]] = dict()
+    with tempfile.TemporaryDirectory() as directory:
+        corpus = create_corpus(count)
+        status = create_status(directory, corpus)
+        text = BuilderConfig.load(path.join(directory, "text.yaml"))
+        sessionmaker, async_sessionmaker = create_sessionmakers(
+            create_database(directory, corpus)
+        )
+
+        app.dependency_overrides.update(
+            {
+                session_maker: lambda: sessionmaker,
+                async_session_maker: lambda: async_sessionmaker,
+                depends.text: lambda: text,
+                depends.status: lambda: status,
+            }
+        )
+
+        rand = random.Random(count)
+        names = list(corpus)
+        transport = httpx.ASGITransport(app=app)  # type: ignore
+        async with httpx.AsyncClient(
+            transport=transport,
+            base_url="http://benchmark",
+            headers={"Accept-Encoding": "gzip"},
+        ) as client:
+            for route, url in ROUTES.items():
+                results[route] = dict()
+                for concurrency in concurrencies:
+                    depends.cache.clear()
+                    urls = [
+                        url.format(name=rand.choice(names)) for _ in range(requests)
+                    ]
+                    results[route][str(concurrency)] = await measure(
+                        client, urls, concurrency
+                    )
+
+        app.dependency_overrides.clear()
+        await async_sessionmaker.kw["bind"].dispose()
+
+    depends.cache.clear()
+    return results
+
+
+def compare(
+    results: Dict[str, Any],
+    baseline: Dict[str, Any],
+    tolerance: float,
+) -> List[str]:
+    """Find runs in ``results`` that are slower than in ``baseline`` by more
+    than ``tolerance`` (a fraction)."""
+
+    regressions: List[str] = []
+    for count, routes in results.items():
+        for route, concurrencies in routes.items():
+            for concurrency, result in concurrencies.items():
+                try:
+                    before = baseline[count][route][concurrency]
+                except KeyError:
+                    continue
+
+                label = f"count={count} route={route} concurrency={concurrency}"
+                for key in ("p50", "p99"):
+                    if result[key] > before[key] * (1 + tolerance):
+                        regressions.append(
+                            f"{label}: `{key}` {before[key]:.3f}ms -> "
+                            f"{result[key]:.3f}ms."
+                        )
+
+                if result["throughput"] < before["throughput"] * (1 - tolerance):
+                    regressions.append(
+                        f"{label}: `throughput` {before['throughput']:.1f}/s -> "
+                        f"{result['throughput']:.1f}/s."
+                    )
+
+    return regressions
+
+
+def main(
+    counts: Annotated[str, typer.Option("--counts")] = "10,1000,10000",
+    concurrencies: Annotated[str, typer.Option("--concurrencies")] = "1,10,100",
+    requests: Annotated[int, typer.Option("--requests")] = 1000,
+    output: Annotated[Optional[str], typer.Option("--output")] = None,
+    baseline: Annotated[Optional[str], typer.Option("--compare")] = None,
+    tolerance: Annotated[float, typer.Option("--tolerance")] = 0.1,
+):
+    app = create_app()
+    _concurrencies = [int(item) for item in concurrencies.split(",")]
+    results = {
+        count: asyncio.run(run(app, int(count), _concurrencies, requests))
+        for count in counts.split(",")
+    }
+    dump(dict(requests=requests, results=results), output)
+
+    if baseline is None:
+        return
+
+    with open(baseline, "r") as file:
+        regressions = compare(results, json.load(file)["results"], tolerance)
+
+    for regression in regressions:
+        print(regression)
+
+    if regressions:
+        raise typer.Exit(1)
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,230 @@
+"""Helpers shared by the benchmarks in this directory.
+
+SQLite stands in for MySQL so that these may run anywhere ``captura`` and
+``aiosqlite`` are installed. Run the benchmarks from the repository root, e.g.
+
+.. code:: shell
+
+    python benchmarks/bench_lookup.py --help
+"""
+
+# =========================================================================== #
+import json
+import math
+import os
+import random
+import resource
+import secrets
+import statistics
+import time
+from os import path
+from typing import Any, Dict, List, Tuple
+
+import yaml
+from app.models import Base, Document, Event, KindEvent, KindObject, User
+from sqlalchemy import create_engine
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.orm import Session, sessionmaker
+
+# --------------------------------------------------------------------------- #
+from text_app.schemas import TextBuilderStatus
+
+FORMATS: Tuple[str, ...] = ("html", "css", "svg")
+SIZES: Tuple[int, ...] = (2**8, 2**12, 2**16)
+
+
+def create_corpus(count: int, seed: int = 0) -> Dict[str, Dict[str, Any]]:
+    """Synthetic documents of varied formats and sizes keyed by name."""
+
+    rand = random.Random(seed)
+    corpus = dict()
+    for index in range(count):
+        format = FORMATS[index % len(FORMATS)]
+        size = rand.choice(SIZES)
+        content = ("<p>" + "x" * 60 + "</p>\n") * (size // 68 + 1)
+        corpus[f"page-{index}"] = dict(
+            uuid=secrets.token_urlsafe(8),
+            format=format,
+            content=content[:size],
+        )
+
+    return corpus
+
+
+def create_database(directory: str, corpus: Dict[str, Dict[str, Any]]) -> str:
+    """Create and seed a SQLite database. Returns its path.
+
+    Every document gets a creation event so that ``Last-Modified`` lookups
+    have something to find.
+    """
+
+    filepath = path.join(directory, "bench.sqlite")
+    if path.exists(filepath):
+        os.remove(filepath)
+
+    engine = create_engine(f"sqlite:///{filepath}")
+    Base.metadata.create_all(engine)
+    timestamp = int(time.time())
+    with sessionmaker(engine)() as session:
+        session.add(
+            User(
+                uuid="benchmark",
+                name="benchmark",
+                description="Benchmark user.",
+                email="benchmark@example.com",
+                public=True,
+                deleted=False,
+            )
+        )
+        session.add_all(
+            Document(
+                uuid=item["uuid"],
+                name=name,
+                description=f"Benchmark document ``{name}``.",
+                content=dict(
+                    text=dict(
+                        format=item["format"],
+                        content=item["content"],
+                        tags=["benchmark"],
+                    )
+                ),
+                public=True,
+                deleted=False,
+            )
+            for name, item in corpus.items()
+        )
+        session.add_all(
+            Event(
+                uuid=secrets.token_urlsafe(8),
+                uuid_parent=None,
+                uuid_user="benchmark",
+                uuid_obj=item["uuid"],
+                api_origin="benchmarks/common.py",
+                kind=KindEvent.create,
+                kind_obj=KindObject.document,
+                timestamp=timestamp,
+                detail="Benchmark document created.",
+            )
+            for item in corpus.values()
+        )
+        session.commit()
+
+    engine.dispose()
+    return filepath
+
+
+def create_status(
+    directory: str,
+    corpus: Dict[str, Dict[str, Any]],
+    identifier: str = "benchmark",
+) -> TextBuilderStatus:
+    """Create the status for ``corpus`` and write it and ``text.yaml`` into
+    ``directory``."""
+
+    documents = {
+        name: dict(
+            uuid=item["uuid"],
+            name=name,
+            name_captura=f"{name}-{identifier}-{item['format']}",
+            deleted=False,
+            content_file=f"{name}.{item['format']}",
+            description=f"Benchmark document ``{name}``.",
+            format_in="rst" if item["format"] == "html" else item["format"],
+            format_out=item["format"],
+        )
+        for name, item in corpus.items()
+    }
+    collection = dict(name="benchmark", description="Benchmark collection.")
+    status = dict(
+        identifier=identifier,
+        path_docs=directory,
+        documents=documents,
+        collection=dict(
+            **collection,
+            name_captura=f"benchmark-{identifier}",
+            uuid=secrets.token_urlsafe(8),
+            deleted=False,
+        ),
+    )
+    config = dict(
+        data=dict(
+            identifier=identifier,
+            path_docs=directory,
+            collection=collection,
+            documents={
+                name: {
+                    key: item[key]
+                    for key in (
+                        "content_file",
+                        "description",
+                        "format_in",
+                        "format_out",
+                    )
+                }
+                for name, item in documents.items()
+            },
+        )
+    )
+
+    with open(path.join(directory, ".text.status.yaml"), "w") as file:
+        yaml.dump(dict(status=status), file)
+
+    with open(path.join(directory, "text.yaml"), "w") as file:
+        yaml.dump(config, file)
+
+    return TextBuilderStatus(status=status)  # type: ignore
+
+
+def create_sessionmakers(
+    filepath: str,
+) -> Tuple[sessionmaker[Session], async_sessionmaker[AsyncSession]]:
+    engine = create_engine(f"sqlite:///{filepath}")
+    async_engine = create_async_engine(f"sqlite+aiosqlite:///{filepath}")
+    return (
+        sessionmaker(engine),
+        async_sessionmaker(bind=async_engine, class_=AsyncSession),
+    )
+
+
+def rss() -> int:
+    """Current resident set size of this process in bytes.
+
+    Falls back to the peak resident set size where ``/proc`` is missing.
+    """
+
+    try:
+        with open("/proc/self/statm") as file:
+            pages = int(file.read().split()[1])
+    except OSError:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+    return pages * os.sysconf("SC_PAGE_SIZE")
+
+
+def percentile(values: List[float], q: float) -> float:
+    """Nearest rank percentile."""
+
+    ordered = sorted(values)
+    index = max(0, math.ceil(q / 100 * len(ordered)) - 1)
+    return ordered[index]
+
+
+def summarize(latencies: List[float]) -> Dict[str, float]:
+    """Summarize latencies (in seconds) in milliseconds."""
+
+    return dict(
+        count=len(latencies),
+        mean=statistics.fmean(latencies) * 1000,
+        p50=percentile(latencies, 50) * 1000,
+        p99=percentile(latencies, 99) * 1000,
+        max=max(latencies) * 1000,
+    )
+
+
+def dump(data: Any, filepath: str | None) -> None:
+    if filepath is None:
+        print(json.dumps(data, indent=2))
+        return
+
+    with open(filepath, "w") as file:
+        json.dump(data, file, indent=2)
@@ -7,14 +7,20 @@ from app.views import AppView
 def captura_plugins_app(app_view: Type[AppView]):
 
     # --------------------------------------------------------------------------- #
+    from text_app import depends, watch
     from text_app.router import TextView
 
     app_view.view_router.include_router(TextView.view_router, prefix="/text")
+    app_view.view_router.add_event_handler("startup", depends.startup)
+    app_view.view_router.add_event_handler("startup", watch.startup)
+    app_view.view_router.add_event_handler("shutdown", watch.shutdown)
 
 
 def captura_plugins_client(requests):
 
     # --------------------------------------------------------------------------- #
     from text_client import TextCommands
+    from text_client.command import setup_logging
 
+    setup_logging()
     requests.typer_children.update(text=TextCommands)
@@ -0,0 +1,165 @@
+# =========================================================================== #
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, NamedTuple, Set, TypeVar
+
+from app import util
+from pydantic import BaseModel
+
+logger = util.get_logger(__name__)
+
+T = TypeVar("T")
+
+
+class CacheEntry(NamedTuple):
+    value: Any
+    size: int
+    name: str | None
+    expires: float | None
+
+
+class CacheStats(BaseModel):
+    """Counters for :class:`TextCache`."""
+
+    hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+    expirations: int = 0
+    invalidations: int = 0
+    entries: int = 0
+    size: int = 0
+    size_max: int = 0
+
+
+class TextCache:
+    """Least recently used cache bounded by the (approximate) size of its
+    values in bytes.
+
+    Entries may be tagged with a document name so that everything derived
+    from some document can be dropped at once using :meth:`invalidate`. This
+    is safe to use from the threadpool.
+
+    :attr size_max: Maximum total size of all entries in bytes.
+    :attr ttl: Optional number of seconds after which entries expire.
+    """
+
+    size_max: int
+    ttl: float | None
+
+    _entries: OrderedDict[Hashable, CacheEntry]
+    _names: Dict[str, Set[Hashable]]
+    _lock: threading.Lock
+    _stats: CacheStats
+
+    def __init__(self, size_max: int, ttl: float | None = None):
+        self.size_max = size_max
+        self.ttl = ttl
+
+        self._entries = OrderedDict()
+        self._names = dict()
+        self._lock = threading.Lock()
+        self._stats = CacheStats(size_max=size_max)
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._entries
+
+    def get(self, key: Hashable) -> Any | None:
+        with self._lock:
+            if (entry := self._entries.get(key)) is None:
+                self._stats.misses += 1
+                return None
+
+            if entry.expires is not None and entry.expires < time.monotonic():
+                self._remove(key)
+                self._stats.expirations += 1
+                self._stats.misses += 1
+                return None
+
+            self._entries.move_to_end(key)
+            self._stats.hits += 1
+            return entry.value
+
+    def set(
+        self,
+        key: Hashable,
+        value: T,
+        *,
+        size: int,
+        name: str | None = None,
+    ) -> T:
+        """Add ``value`` and evict least recently used entries until the
+        cache fits in ``size_max``.
+
+        Values larger than ``size_max`` are returned without being cached.
+        """
+
+        if size > self.size_max:
+            logger.warning(
+                "Not caching `%s`, size `%s` exceeds `%s`.",
+                key,
+                size,
+                self.size_max,
+            )
+            return value
+
+        expires = None if self.ttl is None else time.monotonic() + self.ttl
+        with self._lock:
+            if key in self._entries:
+                self._remove(key)
+
+            self._entries[key] = CacheEntry(value, size, name, expires)
+            self._stats.size += size
+            if name is not None:
+                self._names.setdefault(name, set()).add(key)
+
+            while self._stats.size > self.size_max:
+                key_lru = next(iter(self._entries))
+                self._remove(key_lru)
+                self._stats.evictions += 1
+
+        return value
+
+    def discard(self, key: Hashable) -> bool:
+        with self._lock:
+            if key not in self._entries:
+                return False
+
+            self._remove(key)
+            self._stats.invalidations += 1
+            return True
+
+    def invalidate(self, name: str) -> int:
+        """Remove every entry tagged with ``name``."""
+
+        with self._lock:
+            keys = self._names.get(name, set()).copy()
+            for key in keys:
+                self._remove(key)
+
+            self._stats.invalidations += len(keys)
+
+        logger.debug("Invalidated `%s` entries for `%s`.", len(keys), name)
+        return len(keys)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._stats.invalidations += len(self._entries)
+            self._entries.clear()
+            self._names.clear()
+            self._stats.size = 0
+
+    def stats(self) -> CacheStats:
+        with self._lock:
+            return self._stats.model_copy(update=dict(entries=len(self._entries)))
+
+    def _remove(self, key: Hashable) -> None:
+        entry = self._entries.pop(key)
+        self._stats.size -= entry.size
+        if entry.name is not None and (keys := self._names.get(entry.name)):
+            keys.discard(key)
+            if not keys:
+                self._names.pop(entry.name)
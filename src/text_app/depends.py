@@ -1,73 +1,121 @@
 # =========================================================================== #
-from functools import cache
+import asyncio
+import time
 from os import path
-from typing import Annotated, Any
+from typing import (
+    Annotated,
+    Any,
+    AsyncGenerator,
+    Collection,
+    Dict,
+    Hashable,
+    List,
+    Set,
+)
 
 from app import Document
 from app.config import BaseHashable
-from app.depends import DependsAsyncSessionMaker, DependsSessionMaker, util
-from app.models import User
+from app.depends import (
+    DependsAsyncSessionMaker,
+    DependsSessionMaker,
+    async_engine,
+    async_session_maker,
+    config,
+    util,
+)
+from app.models import Event, User
 from app.schemas import AsOutput, DocumentSchema, T_Output, mwargs
 from app.views.base import BaseView
-from fastapi import Depends, HTTPException, Response
-from fastapi.responses import PlainTextResponse
+from fastapi import Depends, HTTPException, Query, Request, Response
 from pydantic import TypeAdapter
-from sqlalchemy import select
-from starlette.responses import HTMLResponse
+from sqlalchemy import Row, func, select
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker
 
 # --------------------------------------------------------------------------- #
+from text_app import fields, metrics
+from text_app.cache import TextCache
 from text_app.fields import PATH_TEXT_CONFIG
-from text_app.schemas import BuilderConfig, TextBuilderStatus
-
-TEMPLATE = """
-<html>
-  <head>
-    <link rel="stylesheet" type="text/css" href="/index.css">
-    <link rel="shortcut icon" href="https://fastapi.tiangolo.com/img/favicon.png">
-    <title>{document.description}</title>
-  </head>
-  <body>
-    {body}
-  </body>
-</html>
-"""
+from text_app.metrics import Timings
+from text_app.page import (
+    TextPage,
+    TextTemplate,
+    load_template,
+    merge_shards,
+    render,
+)
+from text_app.schemas import (
+    DESC_NAMES,
+    BuilderConfig,
+    TextBuilderStatus,
+    TextDocumentStatus,
+)
 
 logger = util.get_logger(__name__)
 
+# NOTE: Entries derived from some document, e.g. its JSON or its page. Keys
+#       are tuples whose first item names the dependency. Entries are tagged
+#       with the name of their document in ``text.yaml``.
+cache = TextCache(fields.TEXT_CACHE_SIZE, fields.TEXT_CACHE_TTL)
+
+# NOTE: Configuration, status and template. These are never evicted, only
+#       replaced, so that they are never reloaded on the request path and so
+#       that the status is always there to be compared to when reloading.
+singletons: Dict[Hashable, Any] = dict()
+
+KEY_TEXT = ("text",)
+KEY_STATUS = ("status",)
+KEY_TEMPLATE = ("template",)
+
+# NOTE: Rough per entry overhead of the models wrapping cached content.
+SIZE_OVERHEAD: int = 2**10
+
 # --------------------------------------------------------------------------- #
 
 
-@cache
 def text() -> BuilderConfig:
+    if (text := singletons.get(KEY_TEXT)) is not None:
+        return text
+
     logger.info("Loading `%s` as a dependency.", PATH_TEXT_CONFIG)
-    return BuilderConfig.load(PATH_TEXT_CONFIG)
+    text = singletons[KEY_TEXT] = BuilderConfig.load(PATH_TEXT_CONFIG)
+    return text
 
 
 DependsBuilder = Annotated[BuilderConfig, Depends(text, use_cache=True)]
 
 
-@cache
 def status(text: DependsBuilder) -> TextBuilderStatus:
-    if text.status is None:
+    if (status := singletons.get(KEY_STATUS)) is not None:
+        return status
+
+    if not path.exists(text.path_status):
         raise HTTPException(500, detail="``status`` is required.")
 
-    return text.status
+    logger.info("Loading status `%s`.", text.path_status)
+    status = singletons[KEY_STATUS] = TextBuilderStatus.load(text.path_status)
+    return status
 
 
 DependsTextBuilderStatus = Annotated[TextBuilderStatus, Depends(status, use_cache=True)]
 
 
-@cache
-def template(text: DependsBuilder) -> str:
+def template(text: DependsBuilder) -> TextTemplate:
+    if (template := singletons.get(KEY_TEMPLATE)) is not None:
+        return template
+
     logger.info("Loading template `%s`.", text.data.template_file)
-    if (template_file := text.data.template_file) is None:
-        return TEMPLATE
+    template = singletons[KEY_TEMPLATE] = load_template(text.data)
+    return template
+
+
+DependsTemplate = Annotated[TextTemplate, Depends(template, use_cache=True)]
 
-    with open(path.join(text.data.path_docs, template_file), "r") as file:
-        return "".join(file.readlines())
 
+async def timings() -> Timings:
+    return Timings()
 
-DependsTemplate = Annotated[str, Depends(template, use_cache=True)]
+
+DependsTimings = Annotated[Timings, Depends(timings, use_cache=True)]
 
 
 class HashableDocumentSchema(DocumentSchema, BaseHashable):
@@ -78,30 +126,133 @@ class HashableDocumentSchema(DocumentSchema, BaseHashable):
 
 class HashableDocumentOutput(AsOutput, BaseHashable):
     data: HashableDocumentSchema
+    timestamp: int | None = None
+
+
+def q_select():
+    """Select documents and the time of their most recent event."""
+
+    q_timestamp = (
+        select(func.max(Event.timestamp))
+        .where(Event.uuid_obj == Document.uuid)
+        .scalar_subquery()
+    )
+    return select(Document, q_timestamp)
+
+
+def q_documents(uuids: Collection[str]):
+    return q_select().where(Document.uuid.in_(uuids))
+
+
+def require_document_status(status: TextBuilderStatus, name: str) -> TextDocumentStatus:
+    data = status.status.get(name)
+    if data is None or data.deleted:
+        raise HTTPException(404, detail="No such document.")
+
+    return data
+
+
+def sizeof_document(document: HashableDocumentOutput) -> int:
+    """Approximate size of ``document`` for :data:`cache`."""
 
+    if (content := document.data.content) is None:
+        return SIZE_OVERHEAD
 
-@cache
-def get_by_name_json(
+    text = content.get("text") or dict()
+    return len(text.get("content") or "") + SIZE_OVERHEAD
+
+
+def cache_document(name: str, document: HashableDocumentOutput) -> None:
+    key = ("json", document.data.uuid)
+    cache.set(key, document, size=sizeof_document(document), name=name)
+
+
+def uuids_document(data: TextDocumentStatus) -> List[str]:
+    """Uuids of the document for ``data`` followed by those of its shards."""
+
+    return [data.uuid, *data.shards]
+
+
+def create_document_output(
+    data: TextDocumentStatus,
+    rows: Dict[str, Row],
+) -> HashableDocumentOutput:
+    """Create the output for ``data`` from ``rows`` by uuid, joining its shards
+    if any. The timestamp is that of the most recently changed shard."""
+
+    rows_document = [rows.get(uuid) for uuid in uuids_document(data)]
+    if any(row is None for row in rows_document):
+        raise HTTPException(404, detail="No such document.")
+
+    documents = [DocumentSchema.model_validate(row[0]) for row in rows_document]
+    timestamps = [row[1] for row in rows_document if row[1] is not None]
+    try:
+        document_out = merge_shards(documents[0], documents[1:])
+    except ValueError as err:
+        raise HTTPException(500, detail=str(err))
+
+    return mwargs(
+        HashableDocumentOutput,
+        data=document_out,
+        timestamp=max(timestamps, default=None),
+    )
+
+
+def index_rows(rows: Collection[Row]) -> Dict[str, Row]:
+    return {row[0].uuid: row for row in rows}
+
+
+def get_by_name_json_sync(
     sessionmaker: DependsSessionMaker,
     status: DependsTextBuilderStatus,
     *,
     name: str,
 ) -> HashableDocumentOutput:
-    """Get JSON data for the document."""
+    """Get JSON data for the document using a blocking session.
 
-    logger.info("Finding captura document for text ``%s``.", name)
-    if (data := status.status.get(name)) is None:
-        raise HTTPException(404, detail="No such document.")
+    FastAPI runs this in its threadpool, so this should only be used where an
+    event loop is not available. Prefer :func:`get_by_name_json`.
+    """
+
+    data = require_document_status(status, name)
+    if (document := cache.get(("json", data.uuid))) is not None:
+        return document
 
+    logger.info("Finding captura document for text ``%s``.", name)
     with sessionmaker() as session:
-        q = select(Document).where(Document.uuid == data.uuid)
-        document = session.scalar(q)
+        rows = session.execute(q_documents(uuids_document(data))).all()
 
-    if document is None:
-        raise HTTPException(404, detail="No such document.")
+    document = create_document_output(data, index_rows(rows))
+    cache_document(name, document)
+    return document
 
-    document_out = DocumentSchema.model_validate(document)
-    return mwargs(HashableDocumentOutput, data=document_out)
+
+async def get_by_name_json(
+    timings: DependsTimings,
+    sessionmaker: DependsAsyncSessionMaker,
+    status: DependsTextBuilderStatus,
+    *,
+    name: str,
+) -> HashableDocumentOutput:
+    """Get JSON data for the document.
+
+    This runs on the event loop and does not occupy a threadpool worker while
+    waiting on the database.
+    """
+
+    data = require_document_status(status, name)
+    if (document := cache.get(("json", data.uuid))) is not None:
+        return document
+
+    logger.info("Finding captura document for text ``%s``.", name)
+    with timings.time("db", metrics.DB_DURATION, "document"):
+        async with sessionmaker() as session:
+            q = q_documents(uuids_document(data))
+            rows = (await session.execute(q)).all()
+
+    document = create_document_output(data, index_rows(rows))
+    cache_document(name, document)
+    return document
 
 
 DependsGetByNameJson = Annotated[
@@ -110,23 +261,249 @@ DependsGetByNameJson = Annotated[
 ]
 
 
-@cache
-def get_by_name_text(data: DependsGetByNameJson, template: DependsTemplate, name: str):
-    """Get document content in browser appropriate form."""
+async def get_by_names_json(
+    timings: DependsTimings,
+    sessionmaker: DependsAsyncSessionMaker,
+    status: DependsTextBuilderStatus,
+    *,
+    name: Annotated[List[str], Query(description=DESC_NAMES)],
+    content: Annotated[
+        bool,
+        Query(description="Set to false for metadata only responses."),
+    ] = True,
+) -> AsOutput[List[DocumentSchema]]:
+    """Get JSON data for many documents.
+
+    Documents not already cached are loaded using a single query. Output is
+    in the order of ``name``, without duplicates. Responds with ``404`` when
+    any document is missing.
+    """
+
+    if len(name) > fields.LENGTH_BATCH:
+        detail = f"Cannot request more than `{fields.LENGTH_BATCH}` documents."
+        raise HTTPException(422, detail=detail)
+
+    items = {item: require_document_status(status, item) for item in name}
+    found: Dict[str, HashableDocumentOutput] = dict()
+    missing: Dict[str, TextDocumentStatus] = dict()
+    for item, data in items.items():
+        if (document := cache.get(("json", data.uuid))) is not None:
+            found[item] = document
+        else:
+            missing[item] = data
+
+    if missing:
+        logger.info("Finding `%s` captura documents for text.", len(missing))
+        uuids = [uuid for data in missing.values() for uuid in uuids_document(data)]
+        with timings.time("db", metrics.DB_DURATION, "documents"):
+            async with sessionmaker() as session:
+                rows = (await session.execute(q_documents(uuids))).all()
+
+        rows_by_uuid = index_rows(rows)
+        for item, data in missing.items():
+            document = create_document_output(data, rows_by_uuid)
+            cache_document(item, document)
+            found[item] = document
+
+    documents = [found[item].data for item in items]
+    if not content:
+        documents = [
+            document.model_copy(update=dict(content=None)) for document in documents
+        ]
+
+    return mwargs(AsOutput[List[DocumentSchema]], data=documents)
+
+
+DependsGetByNamesJson = Annotated[
+    AsOutput[List[DocumentSchema]],
+    Depends(get_by_names_json, use_cache=True),
+]
+
+
+def get_by_name_text(
+    timings: DependsTimings,
+    data: DependsGetByNameJson,
+    template: DependsTemplate,
+    name: str,
+) -> TextPage:
+    """Get document content in browser appropriate form.
+
+    The page is encoded once and cached with its validators so that repeat
+    requests and revalidations do not render or encode anything.
+    """
+
+    key = ("page", name, data.data.uuid)
+    if (page := cache.get(key)) is not None:
+        return page
 
     logger.info("Rendering browser content for text ``%s``.", name)
-    if (content := data.data.content) is None or (text := content.get("text")) is None:
-        raise HTTPException(500, detail="Cannot serve malformed text data.")
-
-    if (format := text["format"]) == "html":
-        wrapped = template.format(document=data.data, body=text["content"])
-        return HTMLResponse(wrapped)
-    elif format == "svg":
-        content = text["content"]
-        return Response(content, media_type="image/svg+xml")
+    try:
+        with timings.time("render", metrics.RENDER_DURATION):
+            page = render(name, data.data, template, data.timestamp)
+    except ValueError as err:
+        raise HTTPException(500, detail=str(err))
+
+    return cache.set(key, page, size=page.size + SIZE_OVERHEAD, name=name)
+
+
+DependsGetByNameText = Annotated[TextPage, Depends(get_by_name_text, use_cache=True)]
+
+
+def get_by_name(
+    timings: DependsTimings,
+    request: Request,
+    page: DependsGetByNameText,
+) -> Response:
+    """Respond with the page or ``304`` when the client is up to date."""
+
+    response = page.response(request)
+    if response.status_code == 200:
+        size = int(response.headers["content-length"])
+        encoding = response.headers.get("content-encoding", "identity")
+        metrics.RESPONSE_SIZE.observe(size, page.format, encoding)
+
+    return timings.finish(response, "get_by_name")
+
+
+DependsGetByName = Annotated[Any, Depends(get_by_name, use_cache=True)]
+
+
+def swap_status(status_new: TextBuilderStatus) -> Set[str]:
+    """Replace the status and invalidate only the entries for documents that
+    changed.
+
+    The status is swapped before invalidating so that requests never pair
+    the new status with stale entries. The previous status is the last one
+    applied, which is kept in :data:`singletons` and never evicted. Without
+    one everything is invalidated. Returns the names of the documents that
+    changed.
+    """
+
+    status_old: TextBuilderStatus | None = singletons.get(KEY_STATUS)
+    singletons[KEY_STATUS] = status_new
+    if status_old is None:
+        cache.clear()
+        return set(status_new.status.documents)
+
+    documents_old = status_old.status.documents
+    documents_new = status_new.status.documents
+    changed = {
+        name
+        for name in documents_old.keys() | documents_new.keys()
+        if documents_old.get(name) != documents_new.get(name)
+    }
+    for name in changed:
+        cache.invalidate(name)
+
+    return changed
+
+
+# --------------------------------------------------------------------------- #
+# Warming
+
+
+async def warm(
+    sessionmaker: async_sessionmaker[AsyncSession],
+    status: TextBuilderStatus,
+    template: TextTemplate,
+    *,
+    names_include: Collection[str] | None = None,
+    chunk_size: int = fields.TEXT_WARM_CHUNK,
+) -> AsyncGenerator[int, None]:
+    """Load every document in ``status`` (or only those in ``names_include``)
+    and render its page.
+
+    Documents are loaded using ``WHERE uuid IN (...)`` in chunks of
+    ``chunk_size``. Yields the number of pages warmed for each chunk.
+    """
+
+    items = [
+        (name, item)
+        for name, item in status.status.documents.items()
+        if not item.deleted and (names_include is None or name in names_include)
+    ]
+
+    async with sessionmaker() as session:
+        for start in range(0, len(items), chunk_size):
+            chunk = items[start : start + chunk_size]
+            uuids = [uuid for _, item in chunk for uuid in uuids_document(item)]
+            rows = (await session.execute(q_documents(uuids))).all()
+            rows_by_uuid = index_rows(rows)
+
+            warmed = 0
+            for name, item in chunk:
+                try:
+                    document = create_document_output(item, rows_by_uuid)
+                except HTTPException as err:
+                    logger.warning("Could not warm text ``%s``: %s", name, err.detail)
+                    continue
+
+                cache_document(name, document)
+                warmed += 1
+
+                try:
+                    get_by_name_text(Timings(), document, template, name)
+                except HTTPException as err:
+                    logger.warning("Could not warm text ``%s``: %s", name, err.detail)
+
+            yield warmed
+
+
+async def warm_app(
+    timeout: float = fields.TEXT_WARM_TIMEOUT,
+    *,
+    names_include: Collection[str] | None = None,
+) -> int:
+    """Warm caches outside of a request, see :func:`warm`.
+
+    Gives up after ``timeout`` seconds, keeping whatever was already warmed.
+    Returns the number of pages warmed.
+    """
+
+    if not timeout:
+        logger.info("Warming disabled.")
+        return 0
+
+    try:
+        text_ = text()
+        status_ = status(text_)
+        template_ = template(text_)
+    except HTTPException:
+        logger.warning("No status, not warming.")
+        return 0
+    except Exception:
+        logger.exception("Failed to load `%s`, not warming.", PATH_TEXT_CONFIG)
+        return 0
+
+    sessionmaker = async_session_maker(async_engine(config()))
+
+    count, start = 0, time.monotonic()
+    try:
+        async with asyncio.timeout(timeout):
+            async for warmed in warm(
+                sessionmaker,
+                status_,
+                template_,
+                names_include=names_include,
+            ):
+                count += warmed
+    except TimeoutError:
+        logger.warning(
+            "Warming timed out after `%s` seconds with `%s` pages warmed.",
+            timeout,
+            count,
+        )
     else:
-        content = text["content"]
-        return PlainTextResponse(content, headers={"Content-Type": f"text/{format}"})
+        logger.info(
+            "Warmed `%s` pages in `%.3f` seconds.",
+            count,
+            time.monotonic() - start,
+        )
+
+    return count
+
 
+async def startup() -> int:
+    """Warm every page on startup."""
 
-DependsGetByName = Annotated[Any, Depends(get_by_name_text, use_cache=True)]
+    return await warm_app(fields.TEXT_WARM_TIMEOUT)
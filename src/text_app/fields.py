@@ -1,7 +1,7 @@
 # =========================================================================== #
 import enum
 from os import path
-from typing import Annotated, List, Literal
+from typing import Annotated, Dict, List, Literal, Tuple
 
 from app import fields, util
 from pydantic import BaseModel, Field
@@ -10,7 +10,11 @@ from pydantic import BaseModel, Field
 
 LENGTH_MESSAGE: int = 1024
 LENGTH_CONTENT: int = 2**18
+# NOTE: Shards of documents larger than ``LENGTH_CONTENT`` are named like the
+#       document with ``~{index}`` appended to its name.
+SHARD_SEPARATOR: str = "~"
 LENGTH_FORMAT: int = 8
+LENGTH_BATCH: int = 256
 
 
 PATH_HERE = path.realpath(path.join(path.dirname(__file__), "..", ".."))
@@ -28,6 +32,56 @@ PATH_TEXT_CONFIG = util.from_env(
     path.join(PATH_TEXT_DOCS, "text.yaml"),
 )
 
+# NOTE: Warming happens on startup. A timeout of ``0`` disables warming.
+TEXT_WARM_TIMEOUT: float = float(util.from_env("TEXT_WARM_TIMEOUT", "30"))
+TEXT_WARM_CHUNK: int = int(util.from_env("TEXT_WARM_CHUNK", "500"))
+
+# NOTE: Size of the dependency cache in bytes and optionally the number of
+#       seconds entries live for. An empty ``TEXT_CACHE_TTL`` means forever.
+TEXT_CACHE_SIZE: int = int(util.from_env("TEXT_CACHE_SIZE", str(2**26)))
+_TEXT_CACHE_TTL = util.from_env("TEXT_CACHE_TTL", "")
+TEXT_CACHE_TTL: float | None = None if not _TEXT_CACHE_TTL else float(_TEXT_CACHE_TTL)
+
+# NOTE: Pages are compressed once when they are rendered. A level of ``0``
+#       disables compression. Pages smaller than the minimum size are not
+#       compressed.
+TEXT_GZIP_LEVEL: int = int(util.from_env("TEXT_GZIP_LEVEL", "6"))
+TEXT_GZIP_SIZE_MIN: int = int(util.from_env("TEXT_GZIP_SIZE_MIN", "512"))
+
+# NOTE: Pages at least this large are streamed as ``[head, body, tail]``.
+TEXT_STREAM_SIZE_MIN: int = int(util.from_env("TEXT_STREAM_SIZE_MIN", str(2**16)))
+
+# NOTE: Seconds between checks of the status file for changes. ``0`` disables
+#       hot reloading.
+TEXT_STATUS_POLL: float = float(util.from_env("TEXT_STATUS_POLL", "2"))
+
+# NOTE: Number of changes kept in the history of the status file.
+TEXT_STATUS_HISTORY: int = int(util.from_env("TEXT_STATUS_HISTORY", "100"))
+
+# NOTE: Rendered ``rst`` is cached on disk, by default in ``.text.cache`` of
+#       ``path_docs``. Set ``TEXT_RENDER_CACHE`` to share the cache, e.g.
+#       between CI jobs. A size of ``0`` disables the cache.
+_PATH_TEXT_RENDER_CACHE = util.from_env("TEXT_RENDER_CACHE", "")
+PATH_TEXT_RENDER_CACHE: str | None = (
+    None if not _PATH_TEXT_RENDER_CACHE else _PATH_TEXT_RENDER_CACHE
+)
+TEXT_RENDER_CACHE_SIZE: int = int(util.from_env("TEXT_RENDER_CACHE_SIZE", str(2**28)))
+
+# NOTE: Requests to captura made by ``text`` commands. At most
+#       ``TEXT_CONCURRENCY`` are in flight. Failed requests are retried up to
+#       ``TEXT_RETRIES`` times with a delay starting at ``TEXT_BACKOFF`` and
+#       doubling up to ``TEXT_BACKOFF_MAX`` seconds.
+TEXT_CONCURRENCY: int = int(util.from_env("TEXT_CONCURRENCY", "16"))
+TEXT_RETRIES: int = int(util.from_env("TEXT_RETRIES", "5"))
+TEXT_BACKOFF: float = float(util.from_env("TEXT_BACKOFF", "0.5"))
+TEXT_BACKOFF_MAX: float = float(util.from_env("TEXT_BACKOFF_MAX", "30"))
+
+# NOTE: ``text watch`` checks sources for changes every ``TEXT_WATCH_POLL``
+#       seconds and pushes them once nothing changed for
+#       ``TEXT_WATCH_DEBOUNCE`` seconds.
+TEXT_WATCH_POLL: float = float(util.from_env("TEXT_WATCH_POLL", "0.2"))
+TEXT_WATCH_DEBOUNCE: float = float(util.from_env("TEXT_WATCH_DEBOUNCE", "0.1"))
+
 
 logger = util.get_logger(__name__)
 
@@ -111,6 +165,47 @@ FieldContentFile = Annotated[
         ),
     ),
 ]
+FieldHashSource = Annotated[
+    str | None,
+    Field(
+        default=None,
+        description=(
+            "Hash of the content file and every setting used to render it. "
+            "When unchanged the document is not rendered again."
+        ),
+    ),
+]
+FieldHashContent = Annotated[
+    str | None,
+    Field(
+        default=None,
+        description=(
+            "Hash of the content last sent to captura. When unchanged the "
+            "document is not uploaded again."
+        ),
+    ),
+]
+FieldShards = Annotated[
+    Tuple[str, ...],
+    Field(
+        default=(),
+        description=(
+            "Uuids of the shards holding the rest of the content, in order, "
+            "when the content is longer than ``LENGTH_CONTENT``."
+        ),
+    ),
+]
+FieldDependencies = Annotated[
+    Dict[str, str | None],
+    Field(
+        default_factory=dict,
+        description=(
+            "Hashes of the files read to render the content file, e.g. using "
+            "``.. include::``, by path relative to ``path_docs``. ``None`` for "
+            "files that were missing."
+        ),
+    ),
+]
 FieldPathDocs = Annotated[
     str,
     Field(
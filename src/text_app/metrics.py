@@ -0,0 +1,214 @@
+"""Metrics for the text router in the Prometheus exposition format.
+
+There is no dependency on ``prometheus_client``, the few metrics here are
+simple enough to expose by hand. Metrics are per process, so every worker
+must be scraped (or aggregated) separately.
+"""
+
+# =========================================================================== #
+import threading
+import time
+from contextlib import contextmanager
+from typing import Dict, Generator, Iterable, List, Tuple
+
+from fastapi import Response
+
+# --------------------------------------------------------------------------- #
+from text_app.cache import CacheStats
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+BUCKETS_DURATION: Tuple[float, ...] = (
+    0.0005,
+    0.001,
+    0.0025,
+    0.005,
+    0.01,
+    0.025,
+    0.05,
+    0.1,
+    0.25,
+    0.5,
+    1.0,
+    2.5,
+    5.0,
+)
+BUCKETS_SIZE: Tuple[float, ...] = tuple(float(4**exp) for exp in range(5, 11))
+
+
+def escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def format_labels(names: Iterable[str], values: Iterable[str]) -> str:
+    labels = ",".join(f'{n}="{escape(v)}"' for n, v in zip(names, values))
+    return "{" + labels + "}" if labels else ""
+
+
+class Histogram:
+    """Cumulative histogram with optional labels."""
+
+    name: str
+    help: str
+    label_names: Tuple[str, ...]
+    buckets: Tuple[float, ...]
+
+    _counts: Dict[Tuple[str, ...], List[int]]
+    _sums: Dict[Tuple[str, ...], float]
+    _lock: threading.Lock
+
+    def __init__(
+        self,
+        name: str,
+        help: str,
+        label_names: Tuple[str, ...] = (),
+        buckets: Tuple[float, ...] = BUCKETS_DURATION,
+    ):
+        self.name = name
+        self.help = help
+        self.label_names = label_names
+        self.buckets = buckets
+
+        self._counts = dict()
+        self._sums = dict()
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labels: str) -> None:
+        if len(labels) != len(self.label_names):
+            raise ValueError(f"Expected labels `{self.label_names}`.")
+
+        with self._lock:
+            counts = self._counts.get(labels)
+            if counts is None:
+                counts = self._counts[labels] = [0] * (len(self.buckets) + 1)
+                self._sums[labels] = 0
+
+            for index, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[index] += 1
+            counts[-1] += 1
+            self._sums[labels] += value
+
+    def expose(self) -> Generator[str, None, None]:
+        yield f"# HELP {self.name} {self.help}"
+        yield f"# TYPE {self.name} histogram"
+
+        with self._lock:
+            items = [(k, list(v), self._sums[k]) for k, v in self._counts.items()]
+
+        for labels, counts, total in items:
+            names = (*self.label_names, "le")
+            for bound, count in zip(self.buckets, counts):
+                bucket = format_labels(names, (*labels, repr(bound)))
+                yield f"{self.name}_bucket{bucket} {count}"
+
+            bucket = format_labels(names, (*labels, "+Inf"))
+            yield f"{self.name}_bucket{bucket} {counts[-1]}"
+
+            labels_fmt = format_labels(self.label_names, labels)
+            yield f"{self.name}_sum{labels_fmt} {total}"
+            yield f"{self.name}_count{labels_fmt} {counts[-1]}"
+
+
+REQUEST_DURATION = Histogram(
+    "text_request_duration_seconds",
+    "Time from resolving dependencies to returning a response.",
+    ("route",),
+)
+DB_DURATION = Histogram(
+    "text_db_duration_seconds",
+    "Time spent loading documents from the database.",
+    ("query",),
+)
+RENDER_DURATION = Histogram(
+    "text_render_duration_seconds",
+    "Time spent rendering pages.",
+)
+RESPONSE_SIZE = Histogram(
+    "text_response_size_bytes",
+    "Size of page response bodies.",
+    ("format", "encoding"),
+    buckets=BUCKETS_SIZE,
+)
+HISTOGRAMS: Tuple[Histogram, ...] = (
+    REQUEST_DURATION,
+    DB_DURATION,
+    RENDER_DURATION,
+    RESPONSE_SIZE,
+)
+
+
+# NOTE: Name, type, help, and the field of ``CacheStats``.
+CACHE_METRICS: Tuple[Tuple[str, str, str, str], ...] = (
+    ("text_cache_hits_total", "counter", "Cache hits.", "hits"),
+    ("text_cache_misses_total", "counter", "Cache misses.", "misses"),
+    ("text_cache_evictions_total", "counter", "LRU evictions.", "evictions"),
+    ("text_cache_expirations_total", "counter", "TTL expirations.", "expirations"),
+    (
+        "text_cache_invalidations_total",
+        "counter",
+        "Entries explicitly invalidated.",
+        "invalidations",
+    ),
+    ("text_cache_entries", "gauge", "Entries resident in the cache.", "entries"),
+    ("text_cache_size_bytes", "gauge", "Bytes resident in the cache.", "size"),
+    ("text_cache_size_max_bytes", "gauge", "Maximum cache size.", "size_max"),
+)
+
+
+def expose(stats: CacheStats) -> str:
+    lines: List[str] = []
+    for name, kind, help, field in CACHE_METRICS:
+        lines.append(f"# HELP {name} {help}")
+        lines.append(f"# TYPE {name} {kind}")
+        lines.append(f"{name} {getattr(stats, field)}")
+
+    for histogram in HISTOGRAMS:
+        lines.extend(histogram.expose())
+
+    return "\n".join(lines) + "\n"
+
+
+# --------------------------------------------------------------------------- #
+
+
+class Timings:
+    """Durations of the phases of a single request.
+
+    Created once per request as a dependency. Phases are recorded into their
+    histogram and reported back to the client using ``Server-Timing``.
+    """
+
+    start: float
+    durations: Dict[str, float]
+
+    def __init__(self):
+        self.start = time.perf_counter()
+        self.durations = dict()
+
+    @contextmanager
+    def time(
+        self,
+        name: str,
+        histogram: Histogram,
+        *labels: str,
+    ) -> Generator[None, None, None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter() - start
+            self.durations[name] = self.durations.get(name, 0) + duration
+            histogram.observe(duration, *labels)
+
+    def header(self, total: float) -> str:
+        items = (*self.durations.items(), ("total", total))
+        return ", ".join(f"{name};dur={1000 * dur:.3f}" for name, dur in items)
+
+    def finish(self, response: Response, route: str) -> Response:
+        """Record the request duration and add ``Server-Timing``."""
+
+        total = time.perf_counter() - self.start
+        REQUEST_DURATION.observe(total, route)
+        response.headers["Server-Timing"] = self.header(total)
+        return response
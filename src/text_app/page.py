@@ -0,0 +1,372 @@
+# =========================================================================== #
+import hashlib
+import string
+import zlib
+from datetime import datetime, timezone
+from email.utils import formatdate, parsedate_to_datetime
+from os import path
+from typing import Annotated, AsyncGenerator, Dict, List, Self, Sequence, Tuple
+
+from app.schemas import DocumentSchema
+from fastapi import Request, Response
+from fastapi.responses import StreamingResponse
+from pydantic import BaseModel, ConfigDict, Field
+
+# --------------------------------------------------------------------------- #
+from text_app import fields
+from text_app.schemas import TextDataConfig
+
+TEMPLATE = """
+<html>
+  <head>
+    <link rel="stylesheet" type="text/css" href="/index.css">
+    <link rel="shortcut icon" href="https://fastapi.tiangolo.com/img/favicon.png">
+    <title>{document.description}</title>
+  </head>
+  <body>
+    {body}
+  </body>
+</html>
+"""
+
+MEDIA_TYPES: Dict[str, str] = {
+    fields.Format.html: "text/html",
+    fields.Format.svg: "image/svg+xml",
+}
+
+
+def media_type(format: str) -> str:
+    """Media type to serve ``format`` as.
+
+    ``starlette`` adds the ``charset`` for anything under ``text/``.
+    """
+    return MEDIA_TYPES.get(format, f"text/{format}")
+
+
+def create_etag(*chunks: bytes) -> str:
+    """Strong validator for the concatenation of ``chunks``."""
+
+    hasher = hashlib.blake2b(digest_size=16)
+    for chunk in chunks:
+        hasher.update(chunk)
+
+    return '"' + hasher.hexdigest() + '"'
+
+
+def compress(
+    chunks: Sequence[bytes],
+    level: int = fields.TEXT_GZIP_LEVEL,
+) -> bytes | None:
+    """Compress the concatenation of ``chunks`` unless it is too small to be
+    worth it.
+
+    The gzip header written by ``zlib`` has no ``mtime`` so that every worker
+    produces identical bytes and therefore identical validators.
+    """
+
+    size = sum(len(chunk) for chunk in chunks)
+    if not level or size < fields.TEXT_GZIP_SIZE_MIN:
+        return None
+
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    compressed = b"".join(compressor.compress(chunk) for chunk in chunks)
+    compressed += compressor.flush()
+    return compressed if len(compressed) < size else None
+
+
+async def stream(chunks: Sequence[bytes]) -> AsyncGenerator[bytes, None]:
+    for chunk in chunks:
+        yield chunk
+
+
+def accepts_gzip(accept_encoding: str | None) -> bool:
+    """Check ``Accept-Encoding`` for a non-zero quality ``gzip`` or ``*``."""
+
+    if not accept_encoding:
+        return False
+
+    qualities: Dict[str, float] = dict()
+    for item in accept_encoding.split(","):
+        coding, _, params = item.strip().partition(";")
+        quality = 1.0
+        if (params := params.strip()).startswith("q="):
+            try:
+                quality = float(params[2:])
+            except ValueError:
+                quality = 0.0
+
+        qualities[coding.strip().lower()] = quality
+
+    if "gzip" in qualities:
+        return qualities["gzip"] > 0
+    elif "x-gzip" in qualities:
+        return qualities["x-gzip"] > 0
+
+    return qualities.get("*", 0) > 0
+
+
+class TextPage(BaseModel):
+    """A rendered page, encoded (and compressed) exactly once.
+
+    The bytes and validators here are reused for every response. This is
+    what should be cached, not the ``Response`` itself. Large pages are kept
+    as ``[head, body, tail]`` and streamed so that they are never copied into
+    a single buffer.
+    """
+
+    model_config = ConfigDict(frozen=True)
+
+    name: Annotated[str, Field(description="Name of the page in ``text.yaml``.")]
+    format: Annotated[str, Field(description="Format of the document.")]
+    media_type: Annotated[str, Field(description="Response media type.")]
+    chunks: Annotated[
+        Tuple[bytes, ...],
+        Field(description="``UTF-8`` encoded page, in order."),
+    ]
+    etag: Annotated[str, Field(description="Strong ``ETag`` for ``chunks``.")]
+    content_gzip: Annotated[
+        bytes | None,
+        Field(default=None, description="``chunks`` compressed using gzip."),
+    ]
+    etag_gzip: Annotated[
+        str | None,
+        Field(default=None, description="Strong ``ETag`` for ``content_gzip``."),
+    ]
+    last_modified: Annotated[
+        datetime | None,
+        Field(default=None, description="Time of the last captura event."),
+    ]
+
+    @classmethod
+    def create(
+        cls,
+        name: str,
+        format: str,
+        chunks: Sequence[bytes],
+        timestamp: int | float | None = None,
+    ) -> Self:
+        last_modified = None
+        if timestamp is not None:
+            last_modified = datetime.fromtimestamp(int(timestamp), tz=timezone.utc)
+
+        # NOTE: Not worth streaming, so concatenate once here.
+        if sum(len(chunk) for chunk in chunks) < fields.TEXT_STREAM_SIZE_MIN:
+            chunks = (b"".join(chunks),)
+
+        content_gzip = compress(chunks)
+        return cls(
+            name=name,
+            format=format,
+            media_type=media_type(format),
+            chunks=tuple(chunks),
+            etag=create_etag(*chunks),
+            content_gzip=content_gzip,
+            etag_gzip=None if content_gzip is None else create_etag(content_gzip),
+            last_modified=last_modified,
+        )
+
+    @property
+    def content(self) -> bytes:
+        return b"".join(self.chunks)
+
+    @property
+    def size_identity(self) -> int:
+        return sum(len(chunk) for chunk in self.chunks)
+
+    @property
+    def size(self) -> int:
+        return self.size_identity + len(self.content_gzip or b"")
+
+    def headers(self, etag: str) -> Dict[str, str]:
+        headers = {"ETag": etag, "Vary": "Accept-Encoding"}
+        if self.last_modified is not None:
+            timestamp = self.last_modified.timestamp()
+            headers["Last-Modified"] = formatdate(timestamp, usegmt=True)
+
+        return headers
+
+    def modified_since(self, if_modified_since: str) -> bool:
+        if self.last_modified is None:
+            return True
+
+        try:
+            since = parsedate_to_datetime(if_modified_since)
+        except (TypeError, ValueError):
+            return True
+
+        if since.tzinfo is None:
+            since = since.replace(tzinfo=timezone.utc)
+
+        return self.last_modified > since
+
+    def is_fresh(self, request: Request, etag: str) -> bool:
+        """Check if the client already has the representation tagged with
+        ``etag``.
+
+        When ``If-None-Match`` is present ``If-Modified-Since`` is ignored,
+        see RFC 9110 section 13.1.3.
+        """
+
+        headers = request.headers
+        if (if_none_match := headers.get("if-none-match")) is not None:
+            return matches(if_none_match, etag)
+        elif (if_modified_since := headers.get("if-modified-since")) is not None:
+            return not self.modified_since(if_modified_since)
+
+        return False
+
+    def response(self, request: Request) -> Response:
+        """Respond with the variant acceptable to the client, or ``304`` when
+        the client already has it."""
+
+        chunks: Sequence[bytes]
+        if self.content_gzip is not None and accepts_gzip(
+            request.headers.get("accept-encoding")
+        ):
+            chunks, etag = (self.content_gzip,), self.etag_gzip
+            headers = self.headers(etag)  # type: ignore[arg-type]
+            headers["Content-Encoding"] = "gzip"
+        else:
+            chunks, etag = self.chunks, self.etag
+            headers = self.headers(etag)
+
+        if self.is_fresh(request, etag):  # type: ignore[arg-type]
+            return Response(status_code=304, headers=headers)
+        elif len(chunks) == 1:
+            return Response(chunks[0], media_type=self.media_type, headers=headers)
+
+        headers["Content-Length"] = str(sum(len(chunk) for chunk in chunks))
+        return StreamingResponse(
+            stream(chunks),
+            media_type=self.media_type,
+            headers=headers,
+        )
+
+
+def matches(if_none_match: str, etag: str) -> bool:
+    """Weak comparison as required for ``If-None-Match``."""
+
+    if if_none_match.strip() == "*":
+        return True
+
+    etag = etag.removeprefix("W/")
+    tags = (tag.strip().removeprefix("W/") for tag in if_none_match.split(","))
+    return any(tag == etag for tag in tags)
+
+
+# --------------------------------------------------------------------------- #
+
+
+class TextTemplate:
+    """``str.format`` style template compiled into pre-encoded segments.
+
+    Literal text is encoded once, fields like ``{document.description}`` are
+    resolved per document, and ``{body}`` is never copied into the segments
+    around it. Rendering produces ``[head, body, tail]``.
+    """
+
+    source: str
+    segments: Tuple[bytes | Tuple[str, str | None, str] | None, ...]
+    formatter: string.Formatter
+
+    def __init__(self, source: str):
+        self.source = source
+        self.formatter = string.Formatter()
+
+        segments: List[bytes | Tuple[str, str | None, str] | None] = []
+        for literal, field_name, format_spec, conversion in self.formatter.parse(
+            source
+        ):
+            if literal:
+                segments.append(literal.encode())
+            if field_name is None:
+                continue
+            elif field_name == "body":
+                segments.append(None)
+            else:
+                segments.append((field_name, conversion, format_spec or ""))
+
+        self.segments = tuple(segments)
+
+    @property
+    def size(self) -> int:
+        return len(self.source) + sum(
+            len(segment) for segment in self.segments if isinstance(segment, bytes)
+        )
+
+    def resolve(self, field: Tuple[str, str | None, str], **kwargs) -> bytes:
+        field_name, conversion, format_spec = field
+        value, _ = self.formatter.get_field(field_name, (), kwargs)
+        value = self.formatter.convert_field(value, conversion)
+        return self.formatter.format_field(value, format_spec).encode()
+
+    def render(self, document: DocumentSchema, body: bytes) -> List[bytes]:
+        chunks: List[bytes] = []
+        current: List[bytes] = []
+        for segment in self.segments:
+            if segment is None:
+                chunks.extend((b"".join(current), body))
+                current = []
+            elif isinstance(segment, bytes):
+                current.append(segment)
+            else:
+                current.append(self.resolve(segment, document=document))
+
+        chunks.append(b"".join(current))
+        return [chunk for chunk in chunks if chunk]
+
+
+def load_template(data: TextDataConfig) -> TextTemplate:
+    if (template_file := data.template_file) is None:
+        return TextTemplate(TEMPLATE)
+
+    with open(path.join(data.path_docs, template_file), "r") as file:
+        return TextTemplate("".join(file.readlines()))
+
+
+def merge_shards(
+    document: DocumentSchema,
+    shards: Sequence[DocumentSchema],
+) -> DocumentSchema:
+    """Join the content of ``document`` and its ``shards``, in order.
+
+    Documents longer than ``LENGTH_CONTENT`` are uploaded as shards, see
+    ``TextDocumentConfig.create_contents``.
+    """
+
+    if not shards:
+        return document
+
+    texts = [
+        (item.content or dict()).get("text") or dict() for item in (document, *shards)
+    ]
+    if any(text.get("content") is None for text in texts):
+        raise ValueError("Cannot merge malformed shards.")
+
+    text = dict(texts[0], content="".join(text["content"] for text in texts))
+    content = dict(document.content or dict(), text=text)
+    return document.model_copy(update=dict(content=content))
+
+
+def render(
+    name: str,
+    document: DocumentSchema,
+    template: TextTemplate,
+    timestamp: int | float | None = None,
+) -> TextPage:
+    """Render ``document`` into a page.
+
+    This is shared by the router and ``text export`` so that pages are the
+    same regardless of how they are served.
+    """
+
+    if (content := document.content) is None or (text := content.get("text")) is None:
+        raise ValueError("Cannot serve malformed text data.")
+
+    body = text["content"].encode()
+    if (format := text["format"]) == "html":
+        chunks = template.render(document, body)
+    else:
+        chunks = [body]
+
+    return TextPage.create(name, format, chunks, timestamp)
@@ -0,0 +1,553 @@
+"""Conversion of content files into document content.
+
+Rendering ``rst`` using ``docutils`` is by far the most expensive part of
+``text up`` and ``text patch``, so rendered output is kept on disk in a
+content addressed :class:`RenderCache`. Keys include everything the output
+depends on, so entries never need to be invalidated, only evicted. What is
+rendered goes through the :class:`Renderer` of the process, which sets up
+``docutils`` once instead of once per document.
+
+Sources may read other files, e.g. using ``.. include::``. These are recorded
+with their hashes in :class:`RenderOutput` so that cache entries, and the
+status of documents, are invalidated exactly when any of them changes.
+"""
+
+# =========================================================================== #
+import functools
+import hashlib
+import json
+import os
+import tempfile
+import time
+from collections import deque
+from os import path
+from typing import Any, Deque, Dict, Iterable, List, Mapping, Tuple
+
+from app import util
+from pydantic import BaseModel, ValidationError
+
+# --------------------------------------------------------------------------- #
+from text_app import fields
+
+logger = util.get_logger(__name__)
+
+# NOTE: Passed to ``publish_parts`` and part of every cache key. Anything that
+#       changes the output of ``docutils`` must go here.
+SETTINGS: Dict[str, Any] = dict()
+WRITER = "html"
+
+DIRNAME_CACHE = ".text.cache"
+
+# NOTE: Number of timings kept by every :class:`Renderer`.
+TIMINGS_MAX = 2**12
+
+
+class RenderTiming(BaseModel):
+    """Time spent converting one source."""
+
+    name: str | None
+    format_in: str
+    format_out: str
+    size: int
+    seconds: float
+
+
+class RenderOutput(BaseModel):
+    """Converted content and the files read to convert it.
+
+    :attr dependencies: Hashes of every file read besides the source, e.g.
+        using ``.. include::``, by absolute path. ``None`` for missing files.
+    """
+
+    content: str
+    dependencies: Dict[str, str | None] = dict()
+
+
+def hash_file(filepath: str) -> str | None:
+    """Hash the file ``filepath``, ``None`` when it does not exist."""
+
+    try:
+        with open(filepath, "rb") as file:
+            return hashlib.file_digest(file, "sha256").hexdigest()
+    except FileNotFoundError:
+        return None
+
+
+def create_dependencies(filepaths: Iterable[str]) -> Dict[str, str | None]:
+    """Hash the files recorded by ``docutils``.
+
+    Files installed with ``docutils``, e.g. the stylesheets that the writer
+    always reads, are left out since they only change with its version.
+    """
+
+    import docutils
+
+    path_docutils = path.dirname(path.abspath(docutils.__file__)) + os.sep
+    dependencies = dict()
+    for filepath in map(path.abspath, filepaths):
+        if not filepath.startswith(path_docutils):
+            dependencies[filepath] = hash_file(filepath)
+
+    return dependencies
+
+
+class Renderer:
+    """Convert sources reusing one set of ``docutils`` components.
+
+    ``publish_parts`` creates the reader, parser and writer and reads the
+    ``docutils`` configuration files every time it is called, which dominates
+    the time spent on small documents. Here this is done once, on first use,
+    and only the settings are copied for every document. Output is the same
+    as that of ``publish_parts``. Not thread safe, use :func:`get_renderer` to
+    get the renderer of the current process.
+
+    :attr timings: The most recent timings, up to ``TIMINGS_MAX``.
+    """
+
+    settings_overrides: Dict[str, Any]
+    writer_name: str
+    timings: Deque[RenderTiming]
+
+    _publisher: Any
+
+    def __init__(
+        self,
+        settings_overrides: Dict[str, Any] = SETTINGS,
+        writer_name: str = WRITER,
+    ):
+        self.settings_overrides = settings_overrides
+        self.writer_name = writer_name
+        self.timings = deque(maxlen=TIMINGS_MAX)
+
+        self._publisher = None
+
+    @property
+    def publisher(self) -> Any:
+        """Publisher holding the components and settings to copy."""
+
+        if self._publisher is not None:
+            return self._publisher
+
+        # NOTE: Imported here since ``docutils.core`` is slow to import and the
+        #       server never renders.
+        from docutils.core import Publisher
+        from docutils.io import StringInput, StringOutput
+
+        publisher = Publisher(
+            "standalone",
+            "restructuredtext",
+            self.writer_name,
+            source_class=StringInput,
+            destination_class=StringOutput,
+        )
+        publisher.get_settings(**self.settings_overrides)
+        self._publisher = publisher
+        return publisher
+
+    def publish(
+        self,
+        content: str,
+        source_path: str | None = None,
+    ) -> Tuple[str, List[str]]:
+        """Render ``rst`` into the body of an html document.
+
+        Returns the body and the files that ``docutils`` read to render it.
+        """
+
+        from docutils.core import Publisher
+        from docutils.utils import DependencyList
+
+        template = self.publisher
+        settings = template.settings.copy()
+        settings.record_dependencies = DependencyList()
+        publisher = Publisher(
+            template.reader,
+            template.parser,
+            template.writer,
+            source_class=template.source_class,
+            destination_class=template.destination_class,
+            settings=settings,
+        )
+        publisher.set_source(content, source_path)
+        publisher.set_destination()
+        publisher.publish()
+
+        body = str(publisher.writer.parts["html_body"])
+        return body, list(settings.record_dependencies.list)
+
+    def render(
+        self,
+        source: bytes,
+        format_in: str,
+        format_out: str,
+        source_path: str | None = None,
+    ) -> RenderOutput:
+        """Convert ``source`` from ``format_in`` to ``format_out``.
+
+        ``source_path`` is where ``source`` was read from. Relative paths in
+        ``source`` are resolved against it and timings are recorded under it.
+        """
+
+        start = time.perf_counter()
+
+        # NOTE: Same as reading in text mode, that is universal newlines.
+        content = source.decode().replace("\r\n", "\n").replace("\r", "\n")
+        dependencies: Dict[str, str | None] = dict()
+        match (format_in, format_out):
+            case (fields.Format.rst, fields.Format.html):
+                content, filepaths = self.publish(content, source_path)
+                dependencies = create_dependencies(filepaths)
+            case (
+                (fields.Format.css, fields.Format.css)
+                | (fields.Format.rst, fields.Format.rst)
+                | (fields.Format.svg, fields.Format.svg)
+            ):
+                pass
+            case _:
+                msg = f"Unsupported conversion ``{format_in} -> {format_out}``."
+                raise ValueError(msg)
+
+        timing = RenderTiming(
+            name=source_path,
+            format_in=format_in,
+            format_out=format_out,
+            size=len(source),
+            seconds=time.perf_counter() - start,
+        )
+        self.timings.append(timing)
+        logger.debug(
+            "Converted `%s` in `%.2f` milliseconds.",
+            source_path or "source",
+            timing.seconds * 1000,
+        )
+        return RenderOutput(content=content, dependencies=dependencies)
+
+    def convert(
+        self,
+        source: bytes,
+        format_in: str,
+        format_out: str,
+        source_path: str | None = None,
+    ) -> str:
+        """Like :meth:`render`, but only the content."""
+
+        return self.render(source, format_in, format_out, source_path).content
+
+    def convert_many(
+        self,
+        sources: Mapping[str, bytes],
+        format_in: str,
+        format_out: str,
+    ) -> Dict[str, str]:
+        """Convert every source by path. Timings are recorded by path."""
+
+        return {
+            source_path: self.convert(source, format_in, format_out, source_path)
+            for source_path, source in sources.items()
+        }
+
+
+@functools.cache
+def get_renderer() -> Renderer:
+    """The renderer of this process, created on first use."""
+
+    return Renderer()
+
+
+def render(
+    source: bytes,
+    format_in: str,
+    format_out: str,
+    source_path: str | None = None,
+) -> RenderOutput:
+    """See :meth:`Renderer.render`, using the renderer of this process."""
+
+    return get_renderer().render(source, format_in, format_out, source_path)
+
+
+def convert(
+    source: bytes,
+    format_in: str,
+    format_out: str,
+    source_path: str | None = None,
+) -> str:
+    """See :meth:`Renderer.convert`, using the renderer of this process."""
+
+    return get_renderer().convert(source, format_in, format_out, source_path)
+
+
+def create_key(
+    source: bytes,
+    format_in: str,
+    format_out: str,
+    source_path: str | None = None,
+    path_docs: str = os.curdir,
+) -> str:
+    """Key of the output for ``source``.
+
+    ``source_path`` shows in error messages in the output and relative paths
+    in ``source`` are resolved against it, so both ``source_path`` and where
+    it is within ``path_docs`` are part of the key. No absolute path is, so
+    that entries are shared by checkouts in different directories.
+    """
+
+    import docutils
+
+    hasher = hashlib.sha256()
+    settings = json.dumps(SETTINGS, sort_keys=True, default=str)
+    source_path_docs = ""
+    if source_path is not None:
+        source_path_docs = path.relpath(source_path, path_docs)
+
+    for value in (
+        docutils.__version__,
+        WRITER,
+        settings,
+        format_in,
+        format_out,
+        source_path or "",
+        source_path_docs,
+    ):
+        hasher.update(value.encode())
+        hasher.update(b"\0")
+
+    hasher.update(source)
+    return hasher.hexdigest()
+
+
+class RenderCacheStats(BaseModel):
+    """Counters for :class:`RenderCache`."""
+
+    directory: str
+    entries: int = 0
+    size: int = 0
+    size_max: int = 0
+    hits: int = 0
+    misses: int = 0
+    stale: int = 0
+    evictions: int = 0
+
+
+class RenderCache:
+    """Rendered content on disk keyed by :func:`create_key`.
+
+    Entries are evicted least recently used first once the total size exceeds
+    ``size_max``. Hits update the modification time of the entry. Writes are
+    atomic so the cache may be shared by concurrent builds.
+
+    :attr directory: Directory containing the cache.
+    :attr size_max: Maximum total size of all entries in bytes.
+    :attr path_docs: Directory of the sources. Paths in keys and entries are
+        relative to it.
+    """
+
+    directory: str
+    size_max: int
+    path_docs: str
+
+    _index: Dict[str, Tuple[int, int]] | None
+    _size: int
+    _stats: RenderCacheStats
+
+    def __init__(
+        self,
+        directory: str,
+        size_max: int = fields.TEXT_RENDER_CACHE_SIZE,
+        path_docs: str = os.curdir,
+    ):
+        self.directory = directory
+        self.size_max = size_max
+        self.path_docs = path_docs
+
+        self._index = None
+        self._size = 0
+        self._stats = RenderCacheStats(directory=directory, size_max=size_max)
+
+    def filepath(self, key: str) -> str:
+        return path.join(self.directory, key[:2], key)
+
+    @property
+    def index(self) -> Dict[str, Tuple[int, int]]:
+        """Size and modification time of every entry, loaded from disk once."""
+
+        if self._index is not None:
+            return self._index
+
+        self._index = dict()
+        if not path.isdir(self.directory):
+            return self._index
+
+        for dirpath, _, filenames in os.walk(self.directory):
+            for filename in filenames:
+                if filename.startswith("."):
+                    continue
+
+                stat = os.stat(path.join(dirpath, filename))
+                self._index[filename] = (stat.st_size, stat.st_mtime_ns)
+                self._size += stat.st_size
+
+        return self._index
+
+    def get(self, key: str) -> str | None:
+        if (content := self._read(key)) is None:
+            self._stats.misses += 1
+        else:
+            self._stats.hits += 1
+
+        return content
+
+    def _read(self, key: str) -> str | None:
+        filepath = self.filepath(key)
+        try:
+            with open(filepath, "rb") as file:
+                content = file.read()
+        except FileNotFoundError:
+            self._forget(key)
+            return None
+
+        os.utime(filepath)
+        self._remember(key, len(content), os.stat(filepath).st_mtime_ns)
+        return content.decode()
+
+    def set(self, key: str, content: str) -> None:
+        data = content.encode()
+        if not self.size_max or len(data) > self.size_max:
+            return
+
+        filepath = self.filepath(key)
+        os.makedirs(path.dirname(filepath), exist_ok=True)
+
+        # NOTE: Write then rename, readers never see partial entries.
+        fd, filepath_tmp = tempfile.mkstemp(dir=path.dirname(filepath), prefix=".")
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        os.replace(filepath_tmp, filepath)
+
+        self._remember(key, len(data), os.stat(filepath).st_mtime_ns)
+        self.evict()
+
+    def _remember(self, key: str, size: int, mtime: int) -> None:
+        self._forget(key)
+        self.index[key] = (size, mtime)
+        self._size += size
+
+    def _forget(self, key: str) -> None:
+        if (entry := self.index.pop(key, None)) is not None:
+            self._size -= entry[0]
+
+    def evict(self) -> int:
+        """Remove least recently used entries until the cache fits."""
+
+        index = self.index
+        if self._size <= self.size_max:
+            return 0
+
+        keys: List[str] = sorted(index, key=lambda key: index[key][1])
+        evicted = 0
+        for key in keys:
+            if self._size <= self.size_max:
+                break
+
+            self._forget(key)
+            evicted += 1
+            try:
+                os.remove(self.filepath(key))
+            except FileNotFoundError:
+                pass
+
+        logger.debug("Evicted `%s` entries from `%s`.", evicted, self.directory)
+        self._stats.evictions += evicted
+        return evicted
+
+    def clear(self) -> int:
+        """Remove every entry. Returns the number of entries removed."""
+
+        count = len(self.index)
+        for key in list(self.index):
+            try:
+                os.remove(self.filepath(key))
+            except FileNotFoundError:
+                pass
+
+        self.index.clear()
+        self._size = 0
+        return count
+
+    def stats(self) -> RenderCacheStats:
+        entries = len(self.index)
+        return self._stats.model_copy(update=dict(entries=entries, size=self._size))
+
+    def render(
+        self,
+        source: bytes,
+        format_in: str,
+        format_out: str,
+        source_path: str | None = None,
+    ) -> RenderOutput:
+        """Like :func:`render` but cached. Only conversions that change the
+        source are cached.
+
+        Entries hold the hashes of the files read to render them, so they are
+        rendered again once any of those files changed.
+        """
+
+        if format_in == format_out:
+            return render(source, format_in, format_out, source_path)
+
+        key = create_key(source, format_in, format_out, source_path, self.path_docs)
+        if (content := self._read(key)) is None:
+            self._stats.misses += 1
+        elif (output := self.load(key, content)) is not None:
+            self._stats.hits += 1
+            return output
+        else:
+            self._stats.stale += 1
+
+        output = render(source, format_in, format_out, source_path)
+        self.set(key, self.dump(output))
+        return output
+
+    def load(self, key: str, content: str) -> RenderOutput | None:
+        """Load an entry written by :meth:`dump`. Returns ``None`` when any of
+        its dependencies changed since."""
+
+        try:
+            output = RenderOutput.model_validate_json(content)
+        except ValidationError:
+            logger.warning("Ignoring malformed entry `%s`.", key)
+            return None
+
+        path_docs = path.abspath(self.path_docs)
+        dependencies = {
+            path.normpath(path.join(path_docs, filepath)): hash_
+            for filepath, hash_ in output.dependencies.items()
+        }
+        if any(
+            hash_file(filepath) != hash_ for filepath, hash_ in dependencies.items()
+        ):
+            return None
+
+        return output.model_copy(update=dict(dependencies=dependencies))
+
+    def dump(self, output: RenderOutput) -> str:
+        """Dump ``output`` with the paths of its dependencies relative to
+        :attr:`path_docs`."""
+
+        dependencies = {
+            path.relpath(filepath, self.path_docs): hash_
+            for filepath, hash_ in output.dependencies.items()
+        }
+        return output.model_copy(
+            update=dict(dependencies=dependencies)
+        ).model_dump_json()
+
+
+@functools.cache
+def get_cache(path_docs: str) -> RenderCache:
+    """Render cache for documents in ``path_docs``."""
+
+    directory = fields.PATH_TEXT_RENDER_CACHE
+    if directory is None:
+        directory = path.join(path_docs, DIRNAME_CACHE)
+
+    return RenderCache(directory, path_docs=path_docs)
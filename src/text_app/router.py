@@ -9,27 +9,52 @@ your ``.text.status.yaml`` and use its contents to deploy this app.
 # =========================================================================== #
 from functools import cache
 from os import path
+from typing import List
 
 from app.schemas import AsOutput, DocumentSchema, T_Output, mwargs
 from app.views.base import BaseView
+from fastapi import Response
+from fastapi.responses import PlainTextResponse
 
 # --------------------------------------------------------------------------- #
-from text_app import depends
+from text_app import depends, metrics
 
 
 # NOTE: ALL rendering should be done using the command line for now until I
 #       have time to add posting, etc.
 class TextView(BaseView):
 
+    # NOTE: Order matters, ``/{name}`` would otherwise match ``/_batch``.
     view_routes = dict(
+        get_metrics="/_metrics",
+        get_by_names_json="/_batch",
         get_by_name_json="/{name}/json",
         get_by_name="/{name}",
     )
 
+    @classmethod
+    def get_metrics(cls) -> PlainTextResponse:
+        content = metrics.expose(depends.cache.stats())
+        return PlainTextResponse(content, media_type=metrics.CONTENT_TYPE)
+
     @classmethod
     def get_by_name_json(
-        cls, data: depends.DependsGetByNameJson
+        cls,
+        data: depends.DependsGetByNameJson,
+        timings: depends.DependsTimings,
+        response: Response,
     ) -> AsOutput[DocumentSchema]:
+        timings.finish(response, "get_by_name_json")
+        return data
+
+    @classmethod
+    def get_by_names_json(
+        cls,
+        data: depends.DependsGetByNamesJson,
+        timings: depends.DependsTimings,
+        response: Response,
+    ) -> AsOutput[List[DocumentSchema]]:
+        timings.finish(response, "get_by_names_json")
         return data
 
     @classmethod
@@ -1,4 +1,6 @@
 # =========================================================================== #
+import hashlib
+import json
 from os import path
 from typing import Annotated, Any, ClassVar, Dict, List, Self
 
@@ -9,15 +11,20 @@ from app import util
 from app.auth import functools
 from app.config import BaseHashable
 from app.schemas import computed_field, mwargs
-from docutils.core import publish_parts
 from pydantic import Field
 from yaml_settings_pydantic import YamlSettingsConfigDict
 
 # --------------------------------------------------------------------------- #
 from text_app import fields
+from text_app.render import RenderCache, RenderOutput, render
 
 logger = util.get_logger(__name__)
 
+# NOTE: Use ``libyaml`` when ``pyyaml`` was built with it, it is many times
+#       faster for large status files.
+YamlLoader = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
+YamlDumper = getattr(yaml, "CSafeDumper", yaml.SafeDumper)
+
 
 DESC_NAMES = "Document names to filter by. Uses the names specified in ``text.yaml``."
 DESC_FORMAT = "Formats to filter by."
@@ -39,35 +46,87 @@ class TextDocumentConfig(BaseObjectConfig):
     format_in: fields.FieldFormatIn
     format_out: fields.FieldFormatOut
 
-    def create_content(self, filepath: str) -> Dict[str, Any]:
+    def create_hash_source(self, filepath: str) -> str:
+        """Hash everything that :meth:`create_contents` depends on, except
+        for other files read while rendering. Those are tracked separately,
+        see ``TextDocumentStatus.dependencies``."""
+
+        hasher = hashlib.sha256()
+        for value in (self.format_in, self.format_out, self.description):
+            hasher.update(value.encode())
+            hasher.update(b"\0")
+
+        with open(filepath, "rb") as file:
+            hasher.update(file.read())
+
+        return hasher.hexdigest()
+
+    def render(
+        self,
+        filepath: str,
+        cache: RenderCache | None = None,
+    ) -> RenderOutput:
+        """Render the content file, using ``cache`` when provided."""
+
         logger.debug("Building content for `%s`.", filepath)
+        with open(filepath, "rb") as file:
+            source = file.read()
+
+        # NOTE: Relative so that error messages in the output do not include
+        #       the absolute path of the build.
+        source_path = path.relpath(filepath)
+        if cache is not None:
+            return cache.render(source, self.format_in, self.format_out, source_path)
+
+        return render(source, self.format_in, self.format_out, source_path)
+
+    def create_contents(
+        self,
+        filepath: str,
+        cache: RenderCache | None = None,
+    ) -> List[Dict[str, Any]]:
+        """Render the content file, using ``cache`` when provided.
+
+        Content longer than ``LENGTH_CONTENT`` is split into shards, so this
+        returns the content of the document followed by that of its shards.
+        """
+
+        return self.split(self.render(filepath, cache).content)
+
+    def split(self, content: str) -> List[Dict[str, Any]]:
+        """Split rendered ``content`` into the content of the document and
+        that of its shards."""
+
         tags = ["resume"]
-        with open(filepath, "r") as file:
-            content = "".join(file.readlines())
-
-        match (self.format_in, self.format_out):
-            case (fields.Format.rst, fields.Format.html):
-                content = str(publish_parts(content, writer_name="html")["html_body"])
-            case (
-                (fields.Format.css, fields.Format.css)
-                | (fields.Format.rst, fields.Format.rst)
-                | (fields.Format.svg, fields.Format.svg)
-            ):
-                ...
-            case _:
-                msg = (
-                    f"Unsupported conversion ``{self.format_in} -> {self.format_out}``."
-                )
-                raise ValueError(msg)
-
-        return dict(
-            text=mwargs(
-                fields.TextSchema,
-                format=self.format_out,
-                content=content,
-                tags=tags,
-            ).model_dump(mode="json")
-        )
+        size = fields.LENGTH_CONTENT
+        return [
+            dict(
+                text=mwargs(
+                    fields.TextSchema,
+                    format=self.format_out,
+                    content=content[start : start + size],
+                    tags=tags,
+                ).model_dump(mode="json")
+            )
+            for start in range(0, max(len(content), 1), size)
+        ]
+
+
+def create_hash_content(content: Dict[str, Any]) -> str:
+    """Hash content as created by :meth:`TextDocumentConfig.create_contents`."""
+
+    data = json.dumps(content, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(data.encode()).hexdigest()
+
+
+def create_hash_contents(contents: List[Dict[str, Any]]) -> str:
+    """Hash the content of a document and its shards. Unsharded documents
+    hash like their content alone."""
+
+    if len(contents) == 1:
+        return create_hash_content(contents[0])
+
+    return create_hash_content(dict(shards=contents))
 
 
 class TextCollectionConfig(BaseObjectConfig):
@@ -111,7 +170,13 @@ class BaseObjectStatus(BaseObjectConfig):
 
 
 class TextDocumentStatus(BaseObjectStatus, TextDocumentConfig):
+    hashable_fields_exclude = {"dependencies"}
+
     name: captura_fields.FieldName
+    hash_source: fields.FieldHashSource
+    hash_content: fields.FieldHashContent
+    shards: fields.FieldShards
+    dependencies: fields.FieldDependencies
 
 
 class TextCollectionStatus(BaseObjectStatus, TextCollectionConfig): ...
@@ -141,7 +206,7 @@ class BaseYaml:
     def load(cls, filepath: str) -> Self:
 
         with open(filepath, "r") as file:
-            results = yaml.safe_load(file)
+            results = yaml.load(file, Loader=YamlLoader)
 
         return cls(**results)
 
@@ -161,13 +226,92 @@ class TextBuilderStatus(BaseYaml, BaseHashable):
     ]
     history: Annotated[
         List[TextDataStatus],
-        Field(default_factory=list, description="Previous status."),
+        Field(
+            default_factory=list,
+            description=(
+                "Previous status. Only in status files written before history "
+                "was moved into its own file, see ``text_app.status``."
+            ),
+        ),
     ]
 
 
 # --------------------------------------------------------------------------- #
 
 
+class TextClientConfig(BaseHashable):
+    """Connections to captura made by ``text`` commands."""
+
+    concurrency: Annotated[
+        int,
+        Field(
+            default=fields.TEXT_CONCURRENCY,
+            description="Maximum number of requests in flight.",
+            gt=0,
+        ),
+    ]
+    retries: Annotated[
+        int,
+        Field(
+            default=fields.TEXT_RETRIES,
+            description="Maximum number of retries per request.",
+            ge=0,
+        ),
+    ]
+    backoff: Annotated[
+        float,
+        Field(
+            default=fields.TEXT_BACKOFF,
+            description="Delay before the first retry in seconds.",
+            ge=0,
+        ),
+    ]
+    backoff_max: Annotated[
+        float,
+        Field(
+            default=fields.TEXT_BACKOFF_MAX,
+            description="Maximum delay between retries in seconds.",
+            ge=0,
+        ),
+    ]
+    pool_size: Annotated[
+        int | None,
+        Field(
+            default=None,
+            description="Maximum number of connections. Defaults to ``concurrency``.",
+        ),
+    ]
+    keepalive: Annotated[
+        int | None,
+        Field(
+            default=None,
+            description=(
+                "Maximum number of idle connections kept open. Defaults to "
+                "``pool_size``."
+            ),
+        ),
+    ]
+    keepalive_expiry: Annotated[
+        float,
+        Field(default=30, description="Seconds idle connections are kept open."),
+    ]
+    timeout: Annotated[
+        float,
+        Field(default=30, description="Read, write, and pool timeout in seconds."),
+    ]
+    timeout_connect: Annotated[
+        float,
+        Field(default=10, description="Connect timeout in seconds."),
+    ]
+    http2: Annotated[
+        bool,
+        Field(
+            default=False,
+            description="Use HTTP/2 when the server supports it. Requires ``h2``.",
+        ),
+    ]
+
+
 class BuilderConfig(BaseYaml, BaseHashable):
     model_config = YamlSettingsConfigDict(yaml_files=fields.PATH_TEXT_CONFIG)
 
@@ -186,6 +330,10 @@ class BuilderConfig(BaseYaml, BaseHashable):
         return None
 
     data: Annotated[TextDataConfig, Field()]
+    client: Annotated[
+        TextClientConfig,
+        Field(default_factory=TextClientConfig, description="Client settings."),
+    ]
 
 
 class TextOptions(BaseHashable):
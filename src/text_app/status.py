@@ -0,0 +1,215 @@
+"""Storage of the status written by ``text up`` and friends.
+
+The status file only ever contains the current status, so reading it costs
+the same no matter how many times the site was deployed. History is kept in
+a sibling file as one delta per change, holding only the documents that
+changed, and only the latest ``TEXT_STATUS_HISTORY`` deltas are kept. Every
+write replaces the file atomically so that readers, e.g. the status watcher
+of the server, never see a partial status.
+"""
+
+# =========================================================================== #
+import os
+import stat
+import tempfile
+import time
+from os import path
+from typing import Annotated, Any, Dict, List, Self
+
+import yaml
+from app import util
+from pydantic import BaseModel, Field
+
+# --------------------------------------------------------------------------- #
+from text_app import fields
+from text_app.schemas import TextBuilderStatus, TextDataStatus, YamlDumper
+
+logger = util.get_logger(__name__)
+
+
+class TextStatusDelta(BaseModel):
+    """Reverts a status to the status before it.
+
+    Only what changed is included, with the value it had before.
+    """
+
+    timestamp: Annotated[int, Field(description="When the change was saved.")]
+    documents: Annotated[
+        Dict[str, Dict[str, Any] | None],
+        Field(
+            default_factory=dict,
+            description=(
+                "Previous status of changed documents by name, ``None`` for "
+                "documents that were added."
+            ),
+        ),
+    ]
+    data: Annotated[
+        Dict[str, Any],
+        Field(
+            default_factory=dict,
+            description="Previous values of everything else that changed.",
+        ),
+    ]
+
+    @classmethod
+    def create(cls, status: TextDataStatus, previous: TextDataStatus) -> Self:
+        data = status.model_dump(mode="json")
+        data_previous = previous.model_dump(mode="json")
+
+        documents = data.pop("documents")
+        documents_previous = data_previous.pop("documents")
+
+        return cls(
+            timestamp=int(time.time()),
+            documents={
+                name: documents_previous.get(name)
+                for name in documents.keys() | documents_previous.keys()
+                if documents.get(name) != documents_previous.get(name)
+            },
+            data={
+                key: value
+                for key, value in data_previous.items()
+                if data.get(key) != value
+            },
+        )
+
+    def revert(self, status: TextDataStatus) -> TextDataStatus:
+        """Apply this delta to ``status``, the status it was created from."""
+
+        data = status.model_dump(mode="json")
+        data.update(self.data)
+        for name, item in self.documents.items():
+            if item is None:
+                data["documents"].pop(name, None)
+            else:
+                data["documents"][name] = item
+
+        return TextDataStatus.model_validate(data)
+
+
+def get_umask() -> int:
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
+
+
+def write(filepath: str, content: str) -> None:
+    """Replace ``filepath`` with ``content`` atomically.
+
+    The file keeps its mode, new files get the mode ``open`` would give them.
+    Since the file is replaced, a bind mount of the file alone keeps seeing
+    the old content. Mount the directory containing it instead.
+    """
+
+    filepath = path.realpath(filepath)
+    try:
+        mode = stat.S_IMODE(os.stat(filepath).st_mode)
+    except FileNotFoundError:
+        mode = 0o666 & ~get_umask()
+
+    fd, filepath_tmp = tempfile.mkstemp(dir=path.dirname(filepath), prefix=".")
+    try:
+        with os.fdopen(fd, "w") as file:
+            os.fchmod(file.fileno(), mode)
+            file.write(content)
+        os.replace(filepath_tmp, filepath)
+    except BaseException:
+        os.remove(filepath_tmp)
+        raise
+
+
+class StatusStore:
+    """The status file and its history.
+
+    :attr filepath: Path to the status file.
+    :attr filepath_history: Path to the history, one delta per line.
+    :attr history_max: Maximum number of deltas kept.
+    """
+
+    filepath: str
+    filepath_history: str
+    history_max: int
+
+    def __init__(
+        self,
+        filepath: str,
+        history_max: int = fields.TEXT_STATUS_HISTORY,
+    ):
+        self.filepath = filepath
+        self.filepath_history = path.splitext(filepath)[0] + ".history.jsonl"
+        self.history_max = history_max
+
+    def exists(self) -> bool:
+        return path.exists(self.filepath)
+
+    def load(self) -> TextBuilderStatus | None:
+        """Load the current status, without any history."""
+
+        if not self.exists():
+            return None
+
+        return TextBuilderStatus.load(self.filepath)
+
+    def history(self) -> List[TextStatusDelta]:
+        """Deltas, most recent first."""
+
+        if not path.exists(self.filepath_history):
+            return list()
+
+        with open(self.filepath_history, "r") as file:
+            lines = file.readlines()
+
+        return [TextStatusDelta.model_validate_json(line) for line in reversed(lines)]
+
+    def record(self, deltas: List[TextStatusDelta]) -> None:
+        """Append ``deltas``, oldest first, keeping at most
+        :attr:`history_max`."""
+
+        if not self.history_max or not deltas:
+            return
+
+        lines: List[str] = list()
+        if path.exists(self.filepath_history):
+            with open(self.filepath_history, "r") as file:
+                lines = file.readlines()
+
+        lines.extend(delta.model_dump_json() + "\n" for delta in deltas)
+        write(self.filepath_history, "".join(lines[-self.history_max :]))
+
+    def save(self, status: TextDataStatus) -> bool:
+        """Write ``status`` unless it is unchanged. Returns if it was written.
+
+        Status files that still contain their history are migrated, that is
+        their history is moved into :attr:`filepath_history`.
+        """
+
+        deltas: List[TextStatusDelta] = list()
+        if (status_from_file := self.load()) is not None:
+            if status_from_file.history:
+                logger.info("Moving history into `%s`.", self.filepath_history)
+                history = [status_from_file.status, *status_from_file.history]
+                deltas.extend(
+                    TextStatusDelta.create(current, previous)
+                    for current, previous in zip(history[-2::-1], history[::-1])
+                )
+            elif status_from_file.status == status:
+                logger.debug("No changes in data.")
+                return False
+
+            if status_from_file.status != status:
+                deltas.append(TextStatusDelta.create(status, status_from_file.status))
+
+        logger.info("Dumping status in `%s`.", self.filepath)
+        data = TextBuilderStatus(status=status).model_dump(
+            mode="json", exclude={"history"}
+        )
+        write(self.filepath, yaml.dump(data, Dumper=YamlDumper))
+        self.record(deltas)
+        return True
+
+    def remove(self) -> None:
+        """Remove the status, keeping its history."""
+
+        if self.exists():
+            os.remove(self.filepath)
@@ -0,0 +1,137 @@
+"""Hot reloading of the status file.
+
+After ``text up`` or ``text patch`` the status file changes. Rather than
+restarting the server, :class:`StatusWatcher` notices the change, swaps the
+new status in and invalidates only the documents that changed. Everything
+else keeps being served from cache.
+"""
+
+# =========================================================================== #
+import asyncio
+import os
+from typing import Set, Tuple
+
+from app import util
+
+# --------------------------------------------------------------------------- #
+from text_app import depends, fields
+from text_app.schemas import TextBuilderStatus
+
+logger = util.get_logger(__name__)
+
+Signature = Tuple[int, int, int]
+
+
+class StatusWatcher:
+    """Poll the status file for changes.
+
+    Polling ``os.stat`` is cheap and needs no extra dependencies. When the
+    status file is bind mounted on its own, replacing it on the host is not
+    seen in the container, so mount the directory containing it instead.
+
+    :attr filepath: Path to the status file.
+    :attr interval: Seconds between polls.
+    :attr signature: Inode, size, and modification time as of the last poll.
+    """
+
+    filepath: str
+    interval: float
+    signature: Signature | None
+    task: asyncio.Task | None
+
+    def __init__(self, filepath: str, interval: float = fields.TEXT_STATUS_POLL):
+        self.filepath = filepath
+        self.interval = interval
+        self.signature = self.stat()
+        self.task = None
+
+    def stat(self) -> Signature | None:
+        try:
+            stat = os.stat(self.filepath)
+        except FileNotFoundError:
+            return None
+
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    async def check(self) -> Set[str] | None:
+        """Reload the status when the file changed.
+
+        Returns the names of the documents that changed or ``None`` when the
+        status was not reloaded.
+        """
+
+        if (signature := self.stat()) == self.signature:
+            return None
+
+        self.signature = signature
+        if signature is None:
+            logger.warning("Status `%s` removed, keeping last status.", self.filepath)
+            return None
+
+        try:
+            status = await asyncio.to_thread(TextBuilderStatus.load, self.filepath)
+        except Exception:
+            logger.exception(
+                "Failed to reload `%s`, keeping last status.", self.filepath
+            )
+            return None
+
+        changed = depends.swap_status(status)
+        logger.info("Reloaded status, `%s` documents changed.", len(changed))
+
+        if changed:
+            await depends.warm_app(names_include=changed)
+
+        return changed
+
+    async def run(self) -> None:
+        logger.info("Watching `%s` every `%s` seconds.", self.filepath, self.interval)
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.check()
+            except Exception:
+                logger.exception("Unexpected error while checking status.")
+
+    def start(self) -> None:
+        if self.task is None:
+            self.task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        if self.task is None:
+            return
+
+        self.task.cancel()
+        try:
+            await self.task
+        except asyncio.CancelledError:
+            pass
+
+        self.task = None
+
+
+watcher: StatusWatcher | None = None
+
+
+async def startup() -> None:
+    global watcher
+
+    if not fields.TEXT_STATUS_POLL:
+        logger.info("Status hot reloading disabled.")
+        return
+
+    try:
+        text = depends.text()
+    except Exception:
+        logger.exception(
+            "Failed to load `%s`, not watching status.", depends.PATH_TEXT_CONFIG
+        )
+        return
+
+    watcher = StatusWatcher(text.path_status)
+    watcher.start()
+
+
+async def shutdown() -> None:
+    if watcher is not None:
+        await watcher.stop()
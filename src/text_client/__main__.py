@@ -2,11 +2,13 @@ from client.requests.base import typerize
 
 # --------------------------------------------------------------------------- #
 from text_client import TextCommands
+from text_client.command import setup_logging
 
 
 def main():
     # --------------------------------------------------------------------------- #
 
+    setup_logging()
     cmd = typerize(TextCommands)
     cmd()
 
@@ -1,12 +1,10 @@
 # =========================================================================== #
 import asyncio
-import os
-from typing import Annotated
+import functools
+from os import path
+from typing import Annotated, List, Optional
 
-import httpx
 import typer
-import uvicorn
-import uvicorn.config
 from app import util
 from app.schemas import mwargs
 from client import BaseTyperizable, ContextData
@@ -15,12 +13,86 @@ from client.requests import Requests
 
 # --------------------------------------------------------------------------- #
 from text_app.fields import PATH_TEXT_CONFIG, PATH_TEXT_DOCS, PATH_TEXT_STATUS_DEFAULT
-from text_app.schemas import BuilderConfig, TextBuilderStatus
-from text_client.controller import TextController, TextOptions, update_status_file
+from text_app.render import get_cache
+from text_app.schemas import DESC_NAMES, BuilderConfig, TextBuilderStatus
+from text_app.status import StatusStore
+from text_client.controller import (
+    KindOperation,
+    TextController,
+    TextOptions,
+    update_status_file,
+)
+from text_client.scheduler import create_client
 
 logger = util.get_logger(__name__)
 
 FlagVerbose = Annotated[bool, typer.Option("--verbose/--silent")]
+FlagJobs = Annotated[
+    Optional[int],
+    typer.Option(
+        "--jobs",
+        help="Processes to render documents in. Defaults to the number of CPUs.",
+    ),
+]
+FlagNames = Annotated[
+    Optional[List[str]],
+    typer.Option("--name", help=DESC_NAMES),
+]
+FlagOutput = Annotated[
+    Optional[str],
+    typer.Option("--output", help="Output directory. Defaults to ``export``."),
+]
+
+
+def check_errors(controller: TextController) -> None:
+    """Print the errors collected by ``controller`` and exit when there are
+    any. Call this only after status has been saved."""
+
+    if not controller.errors:
+        return
+
+    for name, err in controller.errors.items():
+        CONSOLE.print(f"[red]Failed for `{name}`:")
+        CONSOLE.print(str(err), markup=False)
+
+    CONSOLE.print(f"[red]`{len(controller.errors)}` documents failed.")
+    raise typer.Exit(1)
+
+
+class TextCacheCommands(BaseTyperizable):
+    typer_help = "Manage the render cache."
+    typer_check_verbage = False
+    typer_decorate = False
+    typer_commands = dict(clear="clear", stats="stats")
+    typer_children = dict()
+
+    @classmethod
+    def clear(
+        cls,
+        _context: typer.Context,
+        text_file: Annotated[str, typer.Option("--text")] = PATH_TEXT_CONFIG,
+    ):
+        """Remove every rendered document from the render cache."""
+
+        text = BuilderConfig.load(text_file)
+        cache = get_cache(text.data.path_docs)
+        count = cache.clear()
+        CONSOLE.print(f"[green]Removed `{count}` entries from `{cache.directory}`.")
+
+    @classmethod
+    def stats(
+        cls,
+        _context: typer.Context,
+        text_file: Annotated[str, typer.Option("--text")] = PATH_TEXT_CONFIG,
+    ):
+        """Show the size of the render cache."""
+
+        context_data: ContextData = _context.obj
+        text = BuilderConfig.load(text_file)
+        stats = get_cache(text.data.path_docs).stats()
+
+        handler_data = BaseHandlerData(data=stats.model_dump(mode="json"))
+        context_data.console_handler.handle(handler_data=handler_data)
 
 
 class TextCommands(BaseTyperizable):
@@ -28,12 +100,61 @@ class TextCommands(BaseTyperizable):
     typer_decorate = False
     typer_commands = dict(
         status="status",
+        plan="plan",
         up="up",
         patch="patch",
         down="down",
+        export="export",
+        watch="watch",
         config="config",
     )
-    typer_children = dict()
+    typer_children = dict(cache=TextCacheCommands)
+
+    @classmethod
+    async def _plan(
+        cls,
+        _context: typer.Context,
+        text_file: Annotated[str, typer.Option("--text")] = PATH_TEXT_CONFIG,
+        jobs: FlagJobs = None,
+        names: FlagNames = None,
+    ):
+        context_data: ContextData = _context.obj
+        text = BuilderConfig.load(text_file)
+        resume_handler = TextController(context_data.config, text, jobs=jobs)
+
+        try:
+            async with create_client(text.client) as client:
+                requests = Requests(context_data, client)
+                plan = await resume_handler.plan(
+                    requests, mwargs(TextOptions, names=names)
+                )
+        finally:
+            resume_handler.close()
+
+        data = plan.model_dump(mode="json", include={"operations"})["operations"]
+        handler_data = BaseHandlerData(data=data)
+        context_data.console_handler.handle(handler_data=handler_data)
+
+        counts = ", ".join(
+            f"`{len(operations)}` {kind.name}"
+            for kind in KindOperation
+            if (operations := plan.filter(kind))
+        )
+        CONSOLE.print(
+            f"[green]Planned {counts or 'nothing'}, uploading `{plan.size}` bytes."
+        )
+        check_errors(resume_handler)
+
+    @classmethod
+    def plan(
+        cls,
+        _context: typer.Context,
+        jobs: FlagJobs = None,
+        names: FlagNames = None,
+    ):
+        """Show what ``up`` and ``patch`` would do without doing it."""
+
+        asyncio.run(cls._plan(_context, jobs=jobs, names=names))
 
     @classmethod
     async def _up(
@@ -41,6 +162,8 @@ class TextCommands(BaseTyperizable):
         _context: typer.Context,
         text_file: Annotated[str, typer.Option("--text")] = PATH_TEXT_CONFIG,
         verbose: FlagVerbose = False,
+        jobs: FlagJobs = None,
+        names: FlagNames = None,
     ):
         # data = [item.model_dump(mode="json") for item in context.config.items]
         # context.console_handler.handle(handler_data=handler_data)  # type: ignore
@@ -48,11 +171,16 @@ class TextCommands(BaseTyperizable):
         text = BuilderConfig.load(text_file)
 
         context_data: ContextData = _context.obj
-        resume_handler = TextController(context_data.config, text)
+        resume_handler = TextController(context_data.config, text, jobs=jobs)
 
-        async with httpx.AsyncClient() as client:
-            requests = Requests(context_data, client)
-            status = await resume_handler.ensure(requests)
+        try:
+            async with create_client(text.client) as client:
+                requests = Requests(context_data, client)
+                status = await resume_handler.ensure(
+                    requests, mwargs(TextOptions, names=names)
+                )
+        finally:
+            resume_handler.close()
 
         handler_data = BaseHandlerData(data=status.model_dump(mode="json"))
         if verbose:
@@ -60,10 +188,16 @@ class TextCommands(BaseTyperizable):
 
         status = mwargs(TextBuilderStatus, status=status)
         update_status_file(status, text.path_status)
+        check_errors(resume_handler)
 
     @classmethod
-    def up(cls, _context: typer.Context):
-        asyncio.run(cls._up(_context))
+    def up(
+        cls,
+        _context: typer.Context,
+        jobs: FlagJobs = None,
+        names: FlagNames = None,
+    ):
+        asyncio.run(cls._up(_context, jobs=jobs, names=names))
 
     @classmethod
     async def _patch(
@@ -71,18 +205,24 @@ class TextCommands(BaseTyperizable):
         _context: typer.Context,
         text_file: Annotated[str, typer.Option("--text")] = PATH_TEXT_CONFIG,
         verbose: FlagVerbose = False,
+        jobs: FlagJobs = None,
+        names: FlagNames = None,
     ):
         # data = [item.model_dump(mode="json") for item in context.config.items]
         # context.console_handler.handle(handler_data=handler_data)  # type: ignore
 
         context_data: ContextData = _context.obj
         text = BuilderConfig.load(text_file)
-        resume_handler = TextController(context_data.config, text)
+        resume_handler = TextController(context_data.config, text, jobs=jobs)
 
-        async with httpx.AsyncClient() as client:
-            requests = Requests(context_data, client)
-            status = await resume_handler.ensure(requests, TextOptions(names=None))
-            await resume_handler.update(requests, mwargs(TextOptions))
+        try:
+            async with create_client(text.client) as client:
+                requests = Requests(context_data, client)
+                status, report = await resume_handler.patch(
+                    requests, mwargs(TextOptions, names=names)
+                )
+        finally:
+            resume_handler.close()
 
         handler_data = BaseHandlerData(data=status.model_dump(mode="json"))
         if verbose:
@@ -91,9 +231,21 @@ class TextCommands(BaseTyperizable):
         status = mwargs(TextBuilderStatus, status=status)
         update_status_file(status, text.path_status)
 
+        CONSOLE.print(
+            f"[green]Created `{len(report.created)}`, updated "
+            f"`{len(report.updated)}`, deleted `{len(report.deleted)}`, and "
+            f"skipped `{len(report.skipped)}` documents."
+        )
+        check_errors(resume_handler)
+
     @classmethod
-    def patch(cls, _context: typer.Context):
-        asyncio.run(cls._patch(_context))
+    def patch(
+        cls,
+        _context: typer.Context,
+        jobs: FlagJobs = None,
+        names: FlagNames = None,
+    ):
+        asyncio.run(cls._patch(_context, jobs=jobs, names=names))
 
     @classmethod
     async def _down(
@@ -101,25 +253,100 @@ class TextCommands(BaseTyperizable):
         _context: typer.Context,
         text_file: Annotated[str, typer.Option("--text")] = PATH_TEXT_CONFIG,
         verbose: FlagVerbose = False,
+        names: FlagNames = None,
     ):
 
         context_data: ContextData = _context.obj
         text = BuilderConfig.load(text_file)
         resume_handler = TextController(context_data.config, text)
 
-        async with httpx.AsyncClient() as client:
+        async with create_client(text.client) as client:
             requests = Requests(context_data, client)
-            status = await resume_handler.destroy(requests, mwargs(TextOptions))
+            status = await resume_handler.destroy(
+                requests, mwargs(TextOptions, names=names)
+            )
 
         handler_data = BaseHandlerData(data=status.model_dump(mode="json"))
         if verbose:
             context_data.console_handler.handle(handler_data=handler_data)
 
-        os.remove(text.path_status)
+        # NOTE: Status is only removed once everything is gone. Otherwise it
+        #       keeps what remains, ``destroy`` drops what was deleted.
+        if resume_handler.errors or names is not None:
+            status = mwargs(TextBuilderStatus, status=status)
+            update_status_file(status, text.path_status)
+            check_errors(resume_handler)
+            return
+
+        StatusStore(text.path_status).remove()
+
+    @classmethod
+    def down(cls, _context: typer.Context, names: FlagNames = None):
+        asyncio.run(cls._down(_context, names=names))
+
+    @classmethod
+    async def _export(
+        cls,
+        _context: typer.Context,
+        text_file: Annotated[str, typer.Option("--text")] = PATH_TEXT_CONFIG,
+        output: FlagOutput = None,
+        verbose: FlagVerbose = False,
+    ):
+        context_data: ContextData = _context.obj
+        text = BuilderConfig.load(text_file)
+        resume_handler = TextController(context_data.config, text)
+
+        output = path.join(text.data.path_docs, "export") if output is None else output
+        async with create_client(text.client) as client:
+            requests = Requests(context_data, client)
+            manifest = await resume_handler.export(requests, output)
+
+        handler_data = BaseHandlerData(data=manifest.model_dump(mode="json"))
+        if verbose:
+            context_data.console_handler.handle(handler_data=handler_data)
+
+        CONSOLE.print(
+            f"[green]Exported `{len(manifest.documents)}` documents to `{output}`."
+        )
+        check_errors(resume_handler)
 
     @classmethod
-    def down(cls, _context: typer.Context):
-        asyncio.run(cls._down(_context))
+    def export(cls, _context: typer.Context, output: FlagOutput = None):
+        """Render every document into a static directory with precompressed
+        siblings and ``manifest.json``."""
+
+        asyncio.run(cls._export(_context, output=output))
+
+    @classmethod
+    async def _watch(
+        cls,
+        _context: typer.Context,
+        text_file: Annotated[str, typer.Option("--text")] = PATH_TEXT_CONFIG,
+        jobs: FlagJobs = None,
+    ):
+        context_data: ContextData = _context.obj
+        text = BuilderConfig.load(text_file)
+        resume_handler = TextController(context_data.config, text, jobs=jobs)
+
+        # --------------------------------------------------------------------------- #
+        from text_client.watch import DocsWatcher
+
+        try:
+            async with create_client(text.client) as client:
+                requests = Requests(context_data, client)
+                watcher = DocsWatcher(resume_handler, requests, text_file)
+                await watcher.run()
+        finally:
+            resume_handler.close()
+
+    @classmethod
+    def watch(cls, _context: typer.Context, jobs: FlagJobs = None):
+        """Push documents to captura as their sources change."""
+
+        try:
+            asyncio.run(cls._watch(_context, jobs=jobs))
+        except KeyboardInterrupt:
+            CONSOLE.print("[green]Stopped watching.")
 
     # @classmethod
     # def env():
@@ -160,6 +387,10 @@ class TextCommands(BaseTyperizable):
         cls,
         _context: typer.Context,
         text_file: Annotated[str, typer.Option("--text")] = PATH_TEXT_CONFIG,
+        history: Annotated[
+            bool,
+            typer.Option("--history", help="Show changes, most recent first."),
+        ] = False,
     ):
         context_data: ContextData = _context.obj
         text = BuilderConfig.load(text_file)
@@ -168,12 +399,28 @@ class TextCommands(BaseTyperizable):
             CONSOLE.print("[green]No status yet.")
             raise typer.Exit(1)
 
-        handler_data = BaseHandlerData(data=status.model_dump(mode="json"))
+        data = status.model_dump(mode="json", exclude={"history"})
+        if history:
+            deltas = StatusStore(text.path_status).history()
+            data = [delta.model_dump(mode="json") for delta in deltas]
+
+        handler_data = BaseHandlerData(data=data)
         context_data.console_handler.handle(handler_data=handler_data)
 
 
-LOGGING_CONFIG, _ = util.setup_logging()
-uvicorn.config.LOGGING_CONFIG.update(LOGGING_CONFIG)
+@functools.cache
+def setup_logging() -> None:
+    """Configure logging for ``text`` and ``uvicorn``, once.
+
+    Call this from entrypoints only, that is ``text_client.__main__`` and the
+    ``captura_plugins_client`` hook. This used to run on import, which made
+    everything importing ``text_client`` pay for ``uvicorn``.
+    """
+
+    import uvicorn.config
+
+    logging_config, _ = util.setup_logging()
+    uvicorn.config.LOGGING_CONFIG.update(logging_config)
 
 
 def create_command() -> typer.Typer:
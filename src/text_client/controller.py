@@ -1,10 +1,25 @@
 # =========================================================================== #
 import asyncio
+import enum
+import hashlib
+import json
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
 from os import path
-from typing import Annotated, Dict, Generator, List
+from typing import (
+    Annotated,
+    Any,
+    Awaitable,
+    Dict,
+    Generator,
+    List,
+    Set,
+    Tuple,
+    TypeVar,
+)
 
 import typer
-import yaml
 from app import ChildrenUser, util
 from app.config import BaseHashable
 from app.schemas import (
@@ -21,7 +36,10 @@ from client.requests import Requests
 from pydantic import Field, TypeAdapter
 
 # --------------------------------------------------------------------------- #
-from text_app.fields import PATH_TEXT_CONFIG
+from text_app import fields
+from text_app.fields import PATH_TEXT_CONFIG, Format
+from text_app.page import TextTemplate, load_template, merge_shards, render
+from text_app.render import get_cache, hash_file
 from text_app.schemas import (
     DESC_NAMES,
     BuilderConfig,
@@ -29,16 +47,37 @@ from text_app.schemas import (
     TextCollectionStatus,
     TextDataConfig,
     TextDataStatus,
+    TextDocumentConfig,
     TextDocumentStatus,
     TextOptions,
+    create_hash_contents,
     here,
 )
+from text_app.status import StatusStore
+from text_client.scheduler import Scheduler
 
 logger = util.get_logger(__name__)
 
+T = TypeVar("T")
+
+ADAPTER_DOCUMENTS = TypeAdapter(AsOutput[List[DocumentSchema]])
+ADAPTER_ASSIGNMENTS = TypeAdapter(AsOutput[List[AssignmentSchema]])
+
+# NOTE: Smallest limit used by ``search_documents``.
+DISCOVER_LIMIT_MIN: int = 64
+
 # --------------------------------------------------------------------------- #
 
 
+def create_name_captura(identifier: str, name: str, format: str, index: int = 0) -> str:
+    """Name of the document ``name`` in captura, or of its shard ``index``."""
+
+    if index:
+        name = f"{name}{fields.SHARD_SEPARATOR}{index}"
+
+    return f"{name}-{identifier}-{format}"
+
+
 def check_discover(requests, res, **kwargs):
     (handler_data,), err = requests.handler.check_status(res, **kwargs)
     if err is not None:
@@ -52,63 +91,206 @@ def check_discover(requests, res, **kwargs):
         raise ValueError("Too many results.")
 
 
-async def discover_document(
+async def search_documents(
     config: TextDataConfig,
     requests: Requests,
-    name: str,
-) -> DocumentSchema | None:
-    """Try to find uuid corresponding to the identifier.
+    scheduler: Scheduler | None = None,
+) -> List[DocumentSchema]:
+    """Find every document of the user whose name contains
+    ``-{identifier}-`` using a single search.
+
+    Captura searches do not support offsets, so when a search fills its limit
+    it is repeated with twice the limit. Public documents of other users are
+    never included.
+    """
+
+    scheduler = Scheduler() if scheduler is None else scheduler
+    limit = max(2 * len(config.documents), DISCOVER_LIMIT_MIN)
+    while True:
+        res = await scheduler.request(
+            requests.users.search,
+            requests.context.config.profile.uuid_user,  # type: ignore
+            child=ChildrenUser.documents,
+            name_like=re.escape(f"-{config.identifier}-"),
+            limit=limit,
+            randomize=False,
+            include_public=False,
+        )
+        (handler_data,), err = requests.handler.check_status(
+            res, adapter=ADAPTER_DOCUMENTS
+        )
+        if err is not None:
+            raise err
+
+        items: List[DocumentSchema] = list()
+        if handler_data.data.kind is not None:
+            items = handler_data.data.data
+
+        if len(items) < limit:
+            return items
+
+        logger.debug("Search filled limit `%s`, searching again.", limit)
+        limit *= 2
 
-    For more on the document name on the captura side, please see the
-    description of ``identifier``. To discover and create
-    ``TextDataStatus``, please see ``TextDataStaus.discover``.
+
+def match_documents(
+    config: TextDataConfig,
+    items: List[DocumentSchema],
+) -> Tuple[
+    Dict[str, DocumentSchema],
+    Dict[str, List[DocumentSchema]],
+    List[DocumentSchema],
+    Dict[str, Dict[int, DocumentSchema]],
+]:
+    """Match documents from :func:`search_documents` to names in
+    ``text.yaml``.
+
+    Returns the documents matched, names matching more than one document,
+    orphans, and shards by index for each name. Orphans are named like
+    documents of ``config.identifier`` but match no name in ``text.yaml``,
+    e.g. because they were removed from it.
     """
 
-    name_captura = f"{name}-{config.identifier}"
-    adptr = TypeAdapter(AsOutput[List[DocumentSchema]])
-    item = config.require(name)
-    name_captura += f"-{item.format_out.name}"
+    names_captura = {
+        create_name_captura(config.identifier, name, item.format_out.name): name
+        for name, item in config.documents.items()
+    }
+    suffixes = tuple(f"-{config.identifier}-{format.name}" for format in Format)
+
+    found: Dict[str, Dict[str, DocumentSchema]] = dict()
+    orphans: List[DocumentSchema] = list()
+    shards: Dict[str, Dict[int, DocumentSchema]] = dict()
+    for item in items:
+        if (name := names_captura.get(item.name)) is not None:
+            found.setdefault(name, dict())[item.uuid] = item
+            continue
+        elif not item.name.endswith(suffixes):
+            continue
+
+        base, _, suffix = item.name.rpartition(f"-{config.identifier}-")
+        name, _, index = base.rpartition(fields.SHARD_SEPARATOR)
+        if (
+            index.isdigit()
+            and int(index) > 0
+            and (document := config.get(name)) is not None
+            and document.format_out.name == suffix
+            and int(index) not in shards.get(name, dict())
+        ):
+            shards.setdefault(name, dict())[int(index)] = item
+        else:
+            orphans.append(item)
+
+    documents = {
+        name: next(iter(items.values()))
+        for name, items in found.items()
+        if len(items) == 1
+    }
+    duplicates = {
+        name: list(items.values()) for name, items in found.items() if len(items) > 1
+    }
+    return documents, duplicates, orphans, shards
+
+
+def list_shards(shards: Dict[int, DocumentSchema] | None) -> Tuple[str, ...]:
+    """Uuids of the shards following the document without gaps, i.e. those
+    that make up the content served."""
+
+    shards = dict() if shards is None else shards
+    uuids: List[str] = list()
+    while (shard := shards.get(len(uuids) + 1)) is not None:
+        uuids.append(shard.uuid)
+
+    return tuple(uuids)
+
+
+async def discover_assignments(
+    requests: Requests,
+    uuid_collection: str,
+    scheduler: Scheduler | None = None,
+) -> Set[str]:
+    """Uuids of the documents assigned to the collection."""
 
-    res = await requests.users.search(
-        requests.context.config.profile.uuid_user,  # type: ignore
-        child=ChildrenUser.documents,
-        name_like=name_captura,
+    scheduler = Scheduler() if scheduler is None else scheduler
+    res = await scheduler.request(requests.a.c.read, uuid_collection)
+    (handler_data,), err = requests.handler.check_status(
+        res, adapter=ADAPTER_ASSIGNMENTS
+    )
+    if err is not None:
+        raise err
+
+    if handler_data.data.kind is None:
+        return set()
+
+    return {item.uuid_document for item in handler_data.data.data}
+
+
+async def assign_documents(
+    requests: Requests,
+    uuid_collection: str,
+    uuid_document: List[str],
+    scheduler: Scheduler | None = None,
+) -> None:
+    """Assign the documents to the collection. Assigning is idempotent."""
+
+    scheduler = Scheduler() if scheduler is None else scheduler
+    logger.debug("Creating `%s` assignments.", len(uuid_document))
+    res = await scheduler.request(
+        requests.a.c.create,
+        uuid_collection,
+        uuid_document=uuid_document,
+    )
+    (_,), err = requests.handler.check_status(
+        res, expect_status=201, adapter=ADAPTER_ASSIGNMENTS
     )
-    return check_discover(requests, res, adapter=adptr)
+    if err is not None:
+        raise err
 
 
 async def discover_collection(
     config: TextDataConfig,
     requests: Requests,
+    scheduler: Scheduler | None = None,
 ) -> CollectionSchema | None:
+    scheduler = Scheduler() if scheduler is None else scheduler
     name_captura = f"{config.collection.name}-{config.identifier}"
-    adptr = TypeAdapter(AsOutput[List[DocumentSchema]])
 
-    res = await requests.users.search(
+    res = await scheduler.request(
+        requests.users.search,
         requests.context.config.profile.uuid_user,  # type: ignore
         child=ChildrenUser.collections,
-        name_like=name_captura,
+        name_like=re.escape(name_captura),
     )
-    return check_discover(requests, res, adapter=adptr)
+    return check_discover(requests, res, adapter=ADAPTER_DOCUMENTS)
 
 
 async def create_document(
     config: TextDataConfig,
     requests: Requests,
     name: str,
+    content: Dict[str, Any] | None = None,
+    scheduler: Scheduler | None = None,
+    index: int = 0,
 ) -> DocumentSchema:
     """Upsert a document by name.
 
     This returns the raw data from captura. Tranformation into ``status``
-    is done within ``controller`` as is bulk upsertion.
+    is done within ``controller`` as is bulk upsertion. A non-zero ``index``
+    creates that shard of the document instead.
     """
 
+    scheduler = Scheduler() if scheduler is None else scheduler
     item = config.require(name)
-    name_captura = f"{name}-{config.identifier}-{item.format_out.name}"
-    filename = path.join(config.path_docs, item.content_file)
-    content = item.create_content(filename)
-
-    res = await requests.d.create(
+    name_captura = create_name_captura(
+        config.identifier, name, item.format_out.name, index
+    )
+    if content is None:
+        filename = path.join(config.path_docs, item.content_file)
+        contents = item.create_contents(filename, get_cache(config.path_docs))
+        content = contents[index]
+
+    res = await scheduler.request(
+        requests.d.create,
+        idempotent=False,
         name=name_captura,
         description=item.description,
         content=content,  # type: ignore
@@ -128,11 +310,17 @@ async def create_document(
 
 
 async def create_collection(
-    config: TextDataConfig, requests: Requests, name: str
+    config: TextDataConfig,
+    requests: Requests,
+    name: str,
+    scheduler: Scheduler | None = None,
 ) -> CollectionSchema:
+    scheduler = Scheduler() if scheduler is None else scheduler
     logger.debug("Creating collection.")
     name_captura = f"{name}-{config.identifier}"
-    res = await requests.c.create(
+    res = await scheduler.request(
+        requests.c.create,
+        idempotent=False,
         name=name_captura,
         content=None,
         description=config.collection.description,
@@ -155,24 +343,35 @@ async def create_collection(
 
 
 async def update_document(
-    status: TextDataStatus,
+    config: TextDataConfig,
     requests: Requests,
     name: str,
+    uuid: str,
+    content: Dict[str, Any] | None = None,
+    scheduler: Scheduler | None = None,
+    index: int = 0,
 ) -> None:
-    """Upsert a document by name.
+    """Update the document ``uuid`` of ``name``.
 
-    This returns the raw data from captura. Tranformation into ``status``
-    is done within ``controller`` as is bulk upsertion.
+    Tranformation into ``status`` is done within ``controller`` as is bulk
+    upsertion. A non-zero ``index`` means ``uuid`` is that shard of the
+    document.
     """
 
-    item = status.require(name)
-    name_captura = f"{name}-{status.identifier}-{item.format_out.name}"
+    scheduler = Scheduler() if scheduler is None else scheduler
+    item = config.require(name)
+    name_captura = create_name_captura(
+        config.identifier, name, item.format_out.name, index
+    )
     expect_status = 200
-    filename = path.join(status.path_docs, item.content_file)
-    content = item.create_content(filename)
-
-    res = await requests.d.update(
-        item.uuid,
+    if content is None:
+        filename = path.join(config.path_docs, item.content_file)
+        contents = item.create_contents(filename, get_cache(config.path_docs))
+        content = contents[index]
+
+    res = await scheduler.request(
+        requests.d.update,
+        uuid,
         name=name_captura,
         description=item.description,
         content=content,  # type: ignore
@@ -191,17 +390,20 @@ async def update_document(
 async def update_collection(
     status: TextDataStatus,
     requests: Requests,
+    scheduler: Scheduler | None = None,
 ) -> None:
     """Upsert a document by name.
 
     This returns the raw data from captura. Tranformation into ``status``
     is done within ``controller`` as is bulk upsertion.
     """
+    scheduler = Scheduler() if scheduler is None else scheduler
     name_captura = f"{status.collection.name}-{status.identifier}"
 
     expect_status = 200
 
-    res = await requests.c.update(
+    res = await scheduler.request(
+        requests.c.update,
         status.collection.uuid,
         name=name_captura,
         description=status.collection.description,
@@ -215,16 +417,27 @@ async def update_collection(
         raise err
 
 
+async def delete_document(
+    requests: Requests,
+    uuid: str,
+    scheduler: Scheduler | None = None,
+) -> None:
+    scheduler = Scheduler() if scheduler is None else scheduler
+    res = await scheduler.request(requests.d.delete, uuid)
+    (_,), err = requests.handler.check_status(res)
+    if err is not None:
+        raise err
+
+
 async def destroy_document(
     status: TextDataStatus,
     requests: Requests,
     name: str,
+    scheduler: Scheduler | None = None,
 ) -> TextDocumentStatus:
     item = status.require(name)
-    res = await requests.d.delete(item.uuid)
-    (_,), err = requests.handler.check_status(res)
-    if err is not None:
-        raise err
+    for uuid in (*item.shards, item.uuid):
+        await delete_document(requests, uuid, scheduler)
 
     out = item.model_copy()
     out.deleted = True
@@ -232,9 +445,12 @@ async def destroy_document(
 
 
 async def destroy_collection(
-    status: TextDataStatus, requests: Requests
+    status: TextDataStatus,
+    requests: Requests,
+    scheduler: Scheduler | None = None,
 ) -> TextCollectionStatus:
-    res = await requests.c.delete(status.collection.uuid)
+    scheduler = Scheduler() if scheduler is None else scheduler
+    res = await scheduler.request(requests.c.delete, status.collection.uuid)
     (_,), err = requests.handler.check_status(res)
     if err is not None:
         raise err
@@ -244,29 +460,279 @@ async def destroy_collection(
     return out
 
 
-def update_status_file(status: TextBuilderStatus, filepath: str) -> None:
-    if path.exists(filepath):
-        logger.debug("Loading existing data.")
-        status_from_file = status.load(filepath)
-
-        if status_from_file.status == status.status:
-            logger.debug("No changes in data.")
-            return
-
-        logger.info("Found change in status!")
-        to_dump = status.__class__(
-            status=status.status,
-            history=[
-                status_from_file.status,
-                *status_from_file.history,
-            ],
+class TextExportDocument(BaseHashable):
+    uuid: Annotated[str, Field(description="Captura document uuid.")]
+    file: Annotated[str, Field(description="Rendered page, relative to output.")]
+    file_gzip: Annotated[
+        str | None,
+        Field(description="Precompressed sibling of ``file``.", default=None),
+    ]
+    media_type: Annotated[str, Field(description="Media type to serve as.")]
+    etag: Annotated[str, Field(description="ETag as served by the router.")]
+    sha256: Annotated[str, Field(description="Hash of ``file``.")]
+    sha256_gzip: Annotated[str | None, Field(default=None)]
+    size: Annotated[int, Field(description="Size of ``file`` in bytes.")]
+    size_gzip: Annotated[int | None, Field(default=None)]
+
+
+class TextExportManifest(BaseHashable):
+    hashable_fields_exclude = {"documents"}
+
+    identifier: Annotated[str, Field(description="Identifier of the export.")]
+    documents: Annotated[
+        Dict[str, TextExportDocument],
+        Field(description="Exported documents by their name in ``text.yaml``."),
+    ]
+
+
+def sha256(*chunks: bytes) -> str:
+    hasher = hashlib.sha256()
+    for chunk in chunks:
+        hasher.update(chunk)
+    return hasher.hexdigest()
+
+
+async def read_document(
+    requests: Requests,
+    uuid: str,
+    scheduler: Scheduler | None = None,
+) -> DocumentSchema:
+    scheduler = Scheduler() if scheduler is None else scheduler
+    res = await scheduler.request(requests.d.read, uuid)
+
+    handler_data: RequestHandlerData[AsOutput[DocumentSchema]]
+
+    adptr = TypeAdapter(AsOutput[DocumentSchema])
+    (handler_data,), err = requests.handler.check_status(
+        res, expect_status=200, adapter=adptr
+    )
+    if err is not None:
+        raise err
+
+    return handler_data.data.data
+
+
+async def export_document(
+    status: TextDataStatus,
+    requests: Requests,
+    name: str,
+    template: TextTemplate,
+    directory: str,
+    scheduler: Scheduler | None = None,
+) -> TextExportDocument:
+    """Render a document from captura into ``directory``.
+
+    Pages are rendered exactly as the router would render them.
+    """
+
+    item = status.require(name)
+    document, *shards = await asyncio.gather(
+        *(
+            read_document(requests, uuid, scheduler)
+            for uuid in (item.uuid, *item.shards)
         )
-    else:
-        to_dump = status
+    )
+
+    page = render(name, merge_shards(document, shards), template)
+    filename = f"{name}.{item.format_out.name}"
+    with open(path.join(directory, filename), "wb") as file:
+        file.writelines(page.chunks)
+
+    filename_gzip = None
+    if page.content_gzip is not None:
+        filename_gzip = filename + ".gz"
+        with open(path.join(directory, filename_gzip), "wb") as file:
+            file.write(page.content_gzip)
+
+    return TextExportDocument(
+        uuid=item.uuid,
+        file=filename,
+        file_gzip=filename_gzip,
+        media_type=page.media_type,
+        etag=page.etag,
+        sha256=sha256(*page.chunks),
+        sha256_gzip=None if page.content_gzip is None else sha256(page.content_gzip),
+        size=page.size_identity,
+        size_gzip=None if page.content_gzip is None else len(page.content_gzip),
+    )
+
+
+class TextPatchReport(BaseHashable):
+    """What ``text patch`` did with each document."""
+
+    created: Annotated[
+        List[str],
+        Field(default_factory=list, description="Documents created."),
+    ]
+    updated: Annotated[
+        List[str],
+        Field(default_factory=list, description="Documents uploaded again."),
+    ]
+    skipped: Annotated[
+        List[str],
+        Field(default_factory=list, description="Documents left unchanged."),
+    ]
+    failed: Annotated[
+        List[str],
+        Field(default_factory=list, description="Documents that failed."),
+    ]
+    deleted: Annotated[
+        List[str],
+        Field(default_factory=list, description="Orphaned documents deleted."),
+    ]
+
+
+class KindOperation(str, enum.Enum):
+    create = "create"
+    update = "update"
+    delete = "delete"
+    assign = "assign"
+    create_collection = "create_collection"
+    update_collection = "update_collection"
+
+
+class TextOperation(BaseHashable):
+    """One change to make in captura."""
+
+    hashable_fields_exclude = {"dependencies"}
+
+    kind: Annotated[KindOperation, Field(description="What to do.")]
+    name: Annotated[
+        str,
+        Field(
+            description=(
+                "Name in ``text.yaml``, or the name in captura for orphaned "
+                "documents."
+            )
+        ),
+    ]
+    uuid: Annotated[
+        str | None,
+        Field(default=None, description="Captura uuid, unless yet to be created."),
+    ]
+    reason: Annotated[str, Field(description="Why the operation is necessary.")]
+    size: Annotated[
+        int,
+        Field(default=0, description="Size of the content uploaded in bytes."),
+    ]
+    hash_source: fields.FieldHashSource
+    hash_content: fields.FieldHashContent
+    shards: Annotated[
+        Tuple[str | None, ...],
+        Field(
+            default=(),
+            description="Uuids of the shards to update, ``None`` to create.",
+        ),
+    ]
+    dependencies: fields.FieldDependencies
+    owner: Annotated[
+        str | None,
+        Field(
+            default=None,
+            description=(
+                "Name in ``text.yaml`` of the document an unused shard belongs "
+                "to. The shard is only deleted once that document is updated."
+            ),
+        ),
+    ]
+
+
+class TextPlan(BaseHashable):
+    """Operations required to make captura match ``text.yaml``.
+
+    Created by :meth:`TextController.plan` and executed by
+    :meth:`TextController.apply`.
+    """
+
+    hashable_fields_exclude = {
+        "documents",
+        "operations",
+        "contents",
+        "names",
+        "pushed",
+    }
+
+    identifier: fields.FieldIdentifier
+    names: Annotated[
+        List[str] | None,
+        Field(default=None, description="Names planned for, all when ``None``."),
+    ]
+    collection: Annotated[
+        TextCollectionStatus | None,
+        Field(description="Existing collection, if any."),
+    ]
+    documents: Annotated[
+        Dict[str, TextDocumentStatus],
+        Field(
+            description=(
+                "Status of existing documents, as in captura until their "
+                "operations are done."
+            )
+        ),
+    ]
+    operations: Annotated[
+        List[TextOperation],
+        Field(default_factory=list, description="Operations, in order."),
+    ]
+    contents: Annotated[
+        Dict[str, List[Dict[str, Any]]],
+        Field(
+            default_factory=dict,
+            exclude=True,
+            description="Rendered content to upload by document name.",
+        ),
+    ]
+    pushed: Annotated[
+        Dict[str, TextDocumentStatus],
+        Field(
+            default_factory=dict,
+            exclude=True,
+            description=(
+                "Status of documents already created or updated while "
+                "planning, by document name."
+            ),
+        ),
+    ]
+
+    def filter(self, kind: KindOperation) -> List[TextOperation]:
+        return [item for item in self.operations if item.kind == kind]
+
+    @property
+    def size(self) -> int:
+        return sum(item.size for item in self.operations)
+
+
+def render_contents(
+    item: TextDocumentConfig,
+    path_docs: str,
+) -> Tuple[List[Dict[str, Any]], Dict[str, str | None]]:
+    """Render the content of ``item`` and its shards.
+
+    This runs in the worker processes of :class:`TextController` and must
+    therefore stay at module level. Returns the contents and the files read
+    to render them, see ``TextDocumentStatus.dependencies``.
+    """
 
-    logger.info("Dumping status in `%s`.", filepath)
-    with open(filepath, "w") as file:
-        yaml.dump(to_dump.model_dump(mode="json"), file)
+    filename = path.join(path_docs, item.content_file)
+    output = item.render(filename, get_cache(path_docs))
+    dependencies = {
+        path.relpath(filepath, path_docs): hash_
+        for filepath, hash_ in output.dependencies.items()
+    }
+    return item.split(output.content), dependencies
+
+
+def check_dependencies(item: TextDocumentStatus, path_docs: str) -> bool:
+    """Check that no file read to render ``item`` changed since."""
+
+    return all(
+        hash_file(path.join(path_docs, filepath)) == hash_
+        for filepath, hash_ in item.dependencies.items()
+    )
+
+
+def update_status_file(status: TextBuilderStatus, filepath: str) -> None:
+    StatusStore(filepath).save(status.status)
 
 
 # --------------------------------------------------------------------------- #
@@ -324,60 +790,145 @@ class TextController:
     config: Config
     text: BuilderConfig
     data: TextDataConfig
+    jobs: int
+    executor: ProcessPoolExecutor | None
+    scheduler: Scheduler
+    errors: Dict[str, Exception]
+    saved: TextDataStatus | None
 
     @property
-    def status(self) -> TextDataStatus:
+    def status_previous(self) -> TextDataStatus | None:
+        if self.saved is not None:
+            return self.saved
+
         status_wrapper = self.text.status
-        if status_wrapper is None:
+        return None if status_wrapper is None else status_wrapper.status
+
+    @property
+    def status(self) -> TextDataStatus:
+        if (status := self.status_previous) is None:
             raise ValueError("Status does not exist.")
-        return status_wrapper.status
+        return status
 
-    def __init__(self, config: Config, text: BuilderConfig):
+    def __init__(
+        self,
+        config: Config,
+        text: BuilderConfig,
+        jobs: int | None = None,
+        scheduler: Scheduler | None = None,
+    ):
         self.config = config
         self.text = text
         self.data = self.text.data
+        self.jobs = (os.cpu_count() or 1) if jobs is None else jobs
+        self.executor = None
+        if scheduler is None:
+            scheduler = Scheduler.from_config(text.client)
+
+        self.scheduler = scheduler
+        self.errors = dict()
+        self.saved = None
+
+    def uuids_recorded(self) -> Set[str]:
+        """Uuids of documents and shards in the previous status or in its
+        history, i.e. those created by ``text`` for these docs."""
+
+        statuses: List[TextDataStatus] = list()
+        if (status := self.status_previous) is not None:
+            statuses.append(status)
+        if (status_wrapper := self.text.status) is not None:
+            statuses.extend(status_wrapper.history)
+
+        uuids = {
+            uuid
+            for status in statuses
+            for item in status.documents.values()
+            for uuid in (item.uuid, *item.shards)
+        }
+        for delta in StatusStore(self.text.path_status).history():
+            uuids.update(
+                uuid
+                for item in delta.documents.values()
+                if item is not None
+                for uuid in (item["uuid"], *item.get("shards", ()))
+            )
 
-    def filter_names(self, options: TextOptions) -> Generator[str, None, None]:
-        names = (name for name in self.text.data.documents)
-        if options.names is not None:
-            names = (name for name in names if name in options.names)
-        return names
+        return uuids
 
-    # NOTE: Moving discovery out of here gaurentees that status exists.
-    async def ensure_collection(
-        self,
-        requests: Requests,
-    ) -> TextCollectionStatus:
-        """Update the collection in captura."""
-        collection_config = self.text.data.collection
-        name = collection_config.name
+    def load(self, text: BuilderConfig) -> None:
+        """Use ``text`` from here on, e.g. after ``text.yaml`` changed."""
 
-        collection = await discover_collection(self.text.data, requests)
-        if collection is None:
-            collection = await create_collection(self.text.data, requests, name)
+        self.text = text
+        self.data = text.data
 
-        return TextCollectionStatus(
-            name=collection_config.name,
-            description=collection.description,
-            name_captura=collection.name,
-            uuid=collection.uuid,
-            deleted=False,
+    def save(self, status: TextDataStatus) -> None:
+        """Write ``status`` to the status file and use it as the previous
+        status from here on without reading the file again."""
+
+        update_status_file(
+            mwargs(TextBuilderStatus, status=status), self.text.path_status
         )
+        self.saved = status
+
+    async def gather(self, tasks: Dict[str, Awaitable[T]]) -> Dict[str, T]:
+        """Run ``tasks`` and keep the errors in :attr:`errors` by document
+        name, so that one failure does not abort the others."""
+
+        succeeded, failed = await self.scheduler.gather(tasks)
+        self.errors.update(failed)
+        return succeeded
 
-    async def ensure_document(
+    async def render(
         self,
-        requests: Requests,
-        name: str,
-    ) -> TextDocumentStatus:
-        """Upsert document items. Each document should be stored in raw form
-        and as html.
+        item: TextDocumentConfig,
+        path_docs: str,
+    ) -> Tuple[List[Dict[str, Any]], Dict[str, str | None]]:
+        """Render content in a worker process so that rendering does not block
+        uploads. With a single job, render in this process instead."""
+
+        if self.jobs <= 1:
+            return render_contents(item, path_docs)
+
+        if self.executor is None:
+            self.executor = ProcessPoolExecutor(self.jobs)
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self.executor,
+            render_contents,
+            item,
+            path_docs,
+        )
+
+    def close(self) -> None:
+        if self.executor is not None:
+            self.executor.shutdown()
+            self.executor = None
+
+    def filter_names(self, options: TextOptions) -> Generator[str, None, None]:
+        """Names in ``text.yaml`` selected by ``options``, in order.
+
+        Raises ``ValueError`` for names that are not in ``text.yaml``.
         """
 
-        item = self.text.data.require(name)
-        document = await discover_document(self.text.data, requests, name)
-        if document is None:
-            document = await create_document(self.text.data, requests, name)
+        names = (name for name in self.text.data.documents)
+        if options.names is not None:
+            for name in options.names:
+                self.text.data.require(name)
+
+            names = (name for name in names if name in options.names)
+        return names
 
+    def create_status(
+        self,
+        name: str,
+        document: DocumentSchema,
+        hash_source: str | None = None,
+        hash_content: str | None = None,
+        shards: Tuple[str, ...] = (),
+        dependencies: Dict[str, str | None] | None = None,
+    ) -> TextDocumentStatus:
+        item = self.data.require(name)
         return TextDocumentStatus(
             uuid=document.uuid,
             name=name,
@@ -387,75 +938,676 @@ class TextController:
             content_file=item.content_file,
             description=item.description,
             format_in=item.format_in,
+            hash_source=hash_source,
+            hash_content=hash_content,
+            shards=shards,
+            dependencies=dict() if dependencies is None else dependencies,
         )
 
-    async def ensure(
-        self, requests: Requests, options: TextOptions | None = None
-    ) -> TextDataStatus:
+    async def plan_document(
+        self,
+        requests: Requests,
+        name: str,
+        document: DocumentSchema | None = None,
+        shards: Dict[int, DocumentSchema] | None = None,
+    ) -> Tuple[
+        TextDocumentStatus | None,
+        TextOperation | None,
+        List[Dict[str, Any]] | None,
+    ]:
+        """Decide what to do with the document ``name``.
+
+        ``document`` and its ``shards`` are those found in captura, if any.
+        Documents are only rendered when their source, or any file read when
+        last rendering it, changed or when captura might not have their
+        current content. What captura has is compared to the rendered content
+        by hash, so unchanged content is never uploaded. Searches do not
+        include content, so without status the content is read from captura.
+
+        Returns the status of ``document`` as captura has it until the
+        operation is done, the operation if any, and the content to upload if
+        any.
+        """
+
+        item = self.data.require(name)
+        filename = path.join(self.data.path_docs, item.content_file)
+        hash_source = item.create_hash_source(filename)
+        shards = dict() if shards is None else shards
+
+        previous, hash_remote = None, None
+        if document is not None:
+            if (status := self.status_previous) is not None:
+                previous = status.get(name)
+                if previous is not None and previous.uuid != document.uuid:
+                    previous = None
+
+            # NOTE: The content of sharded documents is only known from status
+            #       and only when every shard is still there.
+            if previous is not None and previous.shards:
+                uuids = tuple(
+                    shard.uuid
+                    for index in range(1, len(previous.shards) + 1)
+                    if (shard := shards.get(index)) is not None
+                )
+                if uuids == previous.shards:
+                    hash_remote = previous.hash_content
+            elif previous is not None:
+                hash_remote = previous.hash_content
+
+            if (
+                previous is not None
+                and hash_remote is not None
+                and previous.hash_source == hash_source
+                and previous.hash_content == hash_remote
+                and document.description == item.description
+                and check_dependencies(previous, self.data.path_docs)
+            ):
+                status = self.create_status(
+                    name,
+                    document,
+                    hash_source,
+                    hash_remote,
+                    previous.shards,
+                    previous.dependencies,
+                )
+                return status, None, None
+
+        contents, dependencies = await self.render(item, self.data.path_docs)
+        hash_content = create_hash_contents(contents)
+        size = sum(len(json.dumps(content).encode()) for content in contents)
+        if document is None:
+            operation = TextOperation(
+                kind=KindOperation.create,
+                name=name,
+                reason="missing",
+                size=size,
+                hash_source=hash_source,
+                hash_content=hash_content,
+                shards=(None,) * (len(contents) - 1),
+                dependencies=dependencies,
+            )
+            return None, operation, contents
+
+        uuids_shards = tuple(
+            None if (shard := shards.get(index)) is None else shard.uuid
+            for index in range(1, len(contents))
+        )
+        status = self.create_status(
+            name,
+            document,
+            hash_source,
+            hash_content,
+            tuple(uuid for uuid in uuids_shards if uuid is not None),
+            dependencies,
+        )
+        if hash_remote is None and None not in uuids_shards:
+            remote = await asyncio.gather(
+                *(
+                    read_document(requests, uuid, self.scheduler)
+                    for uuid in (document.uuid, *uuids_shards)
+                )
+            )
+            if all(item.content is not None for item in remote):
+                hash_remote = create_hash_contents([item.content for item in remote])
+
+        if hash_remote is None:
+            reason = "content unknown"
+        elif hash_remote != hash_content:
+            reason = "content changed"
+        elif document.description != item.description:
+            reason = "description changed"
+        else:
+            return status, None, None
+
+        # NOTE: Until the update is done captura serves what it served before,
+        #       so that is the status should it fail. Without hashes, so that
+        #       the next plan compares with captura again.
+        if previous is not None:
+            update = dict(hash_source=None, hash_content=None)
+            status = previous.model_copy(update=update)
+        else:
+            status = self.create_status(name, document, shards=list_shards(shards))
+
+        operation = TextOperation(
+            kind=KindOperation.update,
+            name=name,
+            uuid=document.uuid,
+            reason=reason,
+            size=size,
+            hash_source=hash_source,
+            hash_content=hash_content,
+            shards=uuids_shards,
+            dependencies=dependencies,
+        )
+        return status, operation, contents
+
+    async def plan(
+        self,
+        requests: Requests,
+        options: TextOptions | None = None,
+        *,
+        push: bool = False,
+    ) -> TextPlan:
+        """Find the operations required to make captura match ``text.yaml``.
+
+        Nothing is changed in captura. Documents named like those of
+        ``identifier`` but no longer in ``text.yaml`` are deleted when the
+        status or its history has their uuid, as are shards no longer needed.
+        Documents that are not assigned to the collection are assigned.
+
+        When ``options.names`` is set only those documents are planned for and
+        no orphans are deleted. Every other document keeps its previous status,
+        or gets its status from captura when it has none.
+
+        Names matching more than one document are added to ``errors`` and
+        skipped.
+
+        With ``push`` the collection is created when missing and every
+        document is created or updated as soon as it is rendered, so that
+        uploads overlap with rendering. These are in ``pushed`` and are not
+        done again by :meth:`apply`.
+        """
 
         options = mwargs(TextOptions) if options is None else options
-        if options.names is not None:
-            raise ValueError("``ensure`` cannot yet filter by names.")
+        names = list(self.filter_names(options))
+
+        items = await search_documents(self.data, requests, self.scheduler)
+        documents, duplicates, orphans, shards = match_documents(self.data, items)
+
+        # NOTE: Which document to use is up to the user, so skip these names
+        #       and keep their previous status.
+        for name, found in duplicates.items():
+            uuids = ", ".join(f"`{item.uuid}`" for item in found)
+            msg = f"Found more than one document for ``{name}``: {uuids}."
+            self.errors[name] = ValueError(msg)
+            logger.error(msg)
+
+        names = [name for name in names if name not in duplicates]
+
+        collection = await discover_collection(self.data, requests, self.scheduler)
+        assigned: Set[str] = set()
+        if collection is not None:
+            assigned = await discover_assignments(
+                requests, collection.uuid, self.scheduler
+            )
 
-        documents_tasks = (
-            self.ensure_document(requests, name) for name in self.data.documents
+        if push and collection is None:
+            collection = await create_collection(
+                self.data, requests, self.data.collection.name, self.scheduler
+            )
+
+        pushed: Dict[str, TextDocumentStatus] = dict()
+
+        async def plan_push(name: str):
+            planned = await self.plan_document(
+                requests, name, documents.get(name), shards.get(name)
+            )
+            status, operation, contents = planned
+            if push and operation is not None and contents is not None:
+                pushed[name] = await self.push(requests, operation, contents, status)
+
+            return planned
+
+        planned = await self.gather({name: plan_push(name) for name in names})
+
+        plan = TextPlan(
+            identifier=self.data.identifier,
+            collection=(
+                None
+                if collection is None
+                else TextCollectionStatus(
+                    name=self.data.collection.name,
+                    description=collection.description,
+                    name_captura=collection.name,
+                    uuid=collection.uuid,
+                    deleted=False,
+                )
+            ),
+            documents=dict(),
+            names=options.names,
+            pushed=pushed,
         )
+        if (status_previous := self.status_previous) is not None:
+            plan.documents.update(
+                (name, item)
+                for name, item in status_previous.documents.items()
+                if not item.deleted
+                and (
+                    name in duplicates
+                    or (options.names is not None and name not in options.names)
+                )
+            )
 
-        documents_ensured: Dict[str, TextDocumentStatus]
-        documents_ensured = {v.name: v for v in await asyncio.gather(*documents_tasks)}
+        if options.names is not None:
 
-        collection = await self.ensure_collection(requests)
+            # NOTE: Without hashes, so that the next plan including these
+            #       renders them.
+            for name, document in documents.items():
+                if name in options.names or name in plan.documents:
+                    continue
+
+                plan.documents[name] = self.create_status(
+                    name, document, shards=list_shards(shards.get(name))
+                )
+
+        operations: Dict[KindOperation, List[TextOperation]] = {
+            kind: list() for kind in KindOperation
+        }
+        shards_unused: List[TextOperation] = list()
+        for name in names:
+            if name not in planned:
+                # NOTE: Planning or pushing failed, keep the document without
+                #       hashes so that the next attempt renders it again.
+                if (document := documents.get(name)) is None:
+                    continue
+
+                previous = (
+                    None if status_previous is None else status_previous.get(name)
+                )
+                if (
+                    previous is not None
+                    and previous.uuid == document.uuid
+                    and not previous.deleted
+                ):
+                    update = dict(hash_source=None, hash_content=None)
+                    plan.documents[name] = previous.model_copy(update=update)
+                else:
+                    plan.documents[name] = self.create_status(
+                        name, document, shards=list_shards(shards.get(name))
+                    )
+                continue
+
+            status, operation, contents = planned[name]
+            if status is not None:
+                plan.documents[name] = status
+            if operation is not None:
+                operations[operation.kind].append(operation)
+            if contents is not None and name not in pushed:
+                plan.contents[name] = contents
+
+            if status is None or status.uuid not in assigned:
+                operations[KindOperation.assign].append(
+                    TextOperation(
+                        kind=KindOperation.assign,
+                        name=name,
+                        uuid=None if status is None else status.uuid,
+                        reason="created" if status is None else "unassigned",
+                    )
+                )
+
+            kept = set(
+                operation.shards
+                if operation is not None
+                else () if status is None else status.shards
+            )
+            shards_unused.extend(
+                TextOperation(
+                    kind=KindOperation.delete,
+                    name=shard.name,
+                    uuid=shard.uuid,
+                    reason="unused shard",
+                    owner=name,
+                )
+                for shard in shards.get(name, dict()).values()
+                if shard.uuid not in kept
+            )
 
-        # NOTE: Assignments. Note that create is imdempotent.
-        uuid_document = list(document.uuid for document in documents_ensured.values())
+        # NOTE: Names alone do not say which docs a document belongs to, e.g.
+        #       ``home-{identifier}-html`` might be from another site using the
+        #       same identifier. Only delete documents recorded in the status.
+        if options.names is None and orphans:
+            recorded = self.uuids_recorded()
+            for item in orphans:
+                if item.uuid not in recorded:
+                    logger.warning(
+                        "Not deleting `%s` (`%s`), it is not in the status.",
+                        item.name,
+                        item.uuid,
+                    )
+                    continue
+
+                operations[KindOperation.delete].append(
+                    TextOperation(
+                        kind=KindOperation.delete,
+                        name=item.name,
+                        uuid=item.uuid,
+                        reason="orphaned",
+                    )
+                )
+
+        name_collection = self.data.collection.name
+        if collection is None:
+            operations[KindOperation.create_collection].append(
+                TextOperation(
+                    kind=KindOperation.create_collection,
+                    name=name_collection,
+                    reason="missing",
+                )
+            )
+        elif collection.description != self.data.collection.description:
+            operations[KindOperation.update_collection].append(
+                TextOperation(
+                    kind=KindOperation.update_collection,
+                    name=name_collection,
+                    uuid=collection.uuid,
+                    reason="description changed",
+                )
+            )
 
-        logger.debug("Creating assignments (imdempotently).")
-        check_status = requests.handler.check_status
-        adptr = TypeAdapter(AsOutput[List[AssignmentSchema]])
-        res = await requests.a.c.create(collection.uuid, uuid_document=uuid_document)
-        (_,), err = check_status(res, expect_status=201, adapter=adptr)
-        if err is not None:
-            raise err
+        # NOTE: Order matters, e.g. documents must exist to be assigned and
+        #       shards are only unused once their document is updated.
+        plan.operations = [
+            *operations[KindOperation.create_collection],
+            *operations[KindOperation.delete],
+            *operations[KindOperation.create],
+            *operations[KindOperation.update],
+            *shards_unused,
+            *operations[KindOperation.assign],
+            *operations[KindOperation.update_collection],
+        ]
+        return plan
+
+    async def push(
+        self,
+        requests: Requests,
+        operation: TextOperation,
+        contents: List[Dict[str, Any]],
+        item: TextDocumentStatus | None = None,
+    ) -> TextDocumentStatus:
+        """Create or update the document of ``operation`` and its shards.
 
-        return TextDataStatus(
-            identifier=self.text.data.identifier,
-            documents=documents_ensured,
+        ``item`` is the planned status of the document, required for updates.
+        Returns the status of the document including its shards.
+        """
+
+        name = operation.name
+        if operation.kind == KindOperation.create:
+            document = await create_document(
+                self.data, requests, name, contents[0], self.scheduler
+            )
+            item = self.create_status(name, document)
+        elif item is None:
+            raise ValueError(f"Status is required to update ``{name}``.")
+        else:
+            await update_document(
+                self.data, requests, name, item.uuid, contents[0], self.scheduler
+            )
+
+        async def push_shard(index: int, uuid: str | None) -> str:
+            if uuid is None:
+                shard = await create_document(
+                    self.data, requests, name, contents[index], self.scheduler, index
+                )
+                return shard.uuid
+
+            await update_document(
+                self.data, requests, name, uuid, contents[index], self.scheduler, index
+            )
+            return uuid
+
+        shards = await asyncio.gather(
+            *(
+                push_shard(index, uuid)
+                for index, uuid in enumerate(operation.shards, start=1)
+            )
+        )
+        update = dict(
+            hash_source=operation.hash_source,
+            hash_content=operation.hash_content,
+            shards=tuple(shards),
+            dependencies=operation.dependencies,
+        )
+        return item.model_copy(update=update)
+
+    async def apply(
+        self,
+        requests: Requests,
+        plan: TextPlan,
+    ) -> Tuple[TextDataStatus, TextPatchReport]:
+        """Execute the operations in ``plan`` and nothing else.
+
+        Failed documents are collected in :attr:`errors` and keep the status
+        from :meth:`plan`. Unused shards of a document are only deleted once
+        it is updated. Failures to assign documents or to update the
+        collection are collected by collection name.
+        """
+
+        collection = plan.collection
+        if collection is None:
+            created = await create_collection(
+                self.data, requests, self.data.collection.name, self.scheduler
+            )
+            collection = TextCollectionStatus(
+                name=self.data.collection.name,
+                description=created.description,
+                name_captura=created.name,
+                uuid=created.uuid,
+                deleted=False,
+            )
+
+        documents_deleted = await self.gather(
+            {
+                operation.name: delete_document(
+                    requests, operation.uuid, self.scheduler  # type: ignore
+                )
+                for operation in plan.filter(KindOperation.delete)
+                if operation.owner is None
+            }
+        )
+
+        status = TextDataStatus(
+            identifier=plan.identifier,
+            documents=dict(plan.documents),
             collection=collection,
-            path_docs=self.text.data.path_docs,
+            path_docs=self.data.path_docs,
+        )
+        # NOTE: Documents pushed while planning, or that failed to, are done.
+        operations = [
+            operation
+            for operation in (
+                *plan.filter(KindOperation.create),
+                *plan.filter(KindOperation.update),
+            )
+            if operation.name not in plan.pushed and operation.name not in self.errors
+        ]
+        documents_pushed = await self.gather(
+            {
+                operation.name: self.push(
+                    requests,
+                    operation,
+                    plan.contents[operation.name],
+                    plan.documents.get(operation.name),
+                )
+                for operation in operations
+            }
+        )
+        documents_pushed.update(plan.pushed)
+        status.documents.update(documents_pushed)
+
+        # NOTE: Shards of documents that failed to update are still served.
+        pending = {
+            operation.name
+            for operation in (
+                *plan.filter(KindOperation.create),
+                *plan.filter(KindOperation.update),
+            )
+        }
+        documents_deleted.update(
+            await self.gather(
+                {
+                    operation.name: delete_document(
+                        requests, operation.uuid, self.scheduler  # type: ignore
+                    )
+                    for operation in plan.filter(KindOperation.delete)
+                    if operation.owner is not None
+                    and (
+                        operation.owner in documents_pushed
+                        or operation.owner not in pending
+                    )
+                }
+            )
         )
 
+        # NOTE: Assigning is idempotent, so assign every shard pushed.
+        uuid_document = [
+            uuid
+            for name in dict.fromkeys(
+                [
+                    *(
+                        operation.name
+                        for operation in plan.filter(KindOperation.assign)
+                    ),
+                    *documents_pushed,
+                ]
+            )
+            if (item := status.documents.get(name)) is not None
+            for uuid in (item.uuid, *item.shards)
+        ]
+        # NOTE: Failures are kept in ``errors`` by collection name so that
+        #       the documents pushed are still in the status returned.
+        name_collection = self.data.collection.name
+        if uuid_document:
+            await self.gather(
+                {
+                    name_collection: assign_documents(
+                        requests, collection.uuid, uuid_document, self.scheduler
+                    )
+                }
+            )
+
+        if plan.filter(KindOperation.update_collection):
+            update = dict(description=self.data.collection.description)
+            status.collection = collection.model_copy(update=update)
+            updated_collection = await self.gather(
+                {name_collection: update_collection(status, requests, self.scheduler)}
+            )
+            if name_collection not in updated_collection:
+                status.collection = collection
+
+        created = [
+            operation.name
+            for operation in plan.filter(KindOperation.create)
+            if operation.name in documents_pushed
+        ]
+        updated = [
+            operation.name
+            for operation in plan.filter(KindOperation.update)
+            if operation.name in documents_pushed
+        ]
+        changed = {*documents_pushed, *self.errors}
+        report = TextPatchReport(
+            created=created,
+            updated=updated,
+            skipped=[
+                name
+                for name in status.documents
+                if name not in changed and (plan.names is None or name in plan.names)
+            ],
+            failed=list(self.errors),
+            deleted=list(documents_deleted),
+        )
+        return status, report
+
+    async def ensure(
+        self, requests: Requests, options: TextOptions | None = None
+    ) -> TextDataStatus:
+        """Plan and apply."""
+
+        status, _ = await self.patch(requests, options)
+        return status
+
     # NOTE: Only return status when status has been changed.
-    async def destroy(self, requests: Requests, options: TextOptions) -> TextDataStatus:
+    async def destroy(
+        self,
+        requests: Requests,
+        options: TextOptions | None = None,
+    ) -> TextDataStatus:
+        """Delete documents and the collection in captura.
+
+        When ``options.names`` is set only those documents are deleted and
+        the collection is kept. Every other document keeps its status. Deleted
+        documents are removed from the status returned.
+        """
 
         status = self.status
 
         options = mwargs(TextOptions) if options is None else options
-        if options.names is not None:
-            raise ValueError("``destroy`` cannot yet filter by names.")
-
-        documents_destroyed = await asyncio.gather(
-            *(
-                destroy_document(self.status, requests, name)
-                for name in self.status.documents
-            )
+        names = list(status.documents) if options.names is None else options.names
+        names = [name for name in names if not status.require(name).deleted]
+
+        documents_destroyed = await self.gather(
+            {
+                name: destroy_document(status, requests, name, self.scheduler)
+                for name in names
+            }
         )
-        collection_destroyed = await destroy_collection(self.status, requests)
+
+        # NOTE: Keep the collection when documents remain so that the next
+        #       attempt can still find it.
+        collection = status.collection
+        if (
+            options.names is None
+            and len(documents_destroyed) == len(names)
+            and not collection.deleted
+        ):
+            collection = await destroy_collection(status, requests, self.scheduler)
 
         return TextDataStatus(
-            documents={status.name: status for status in documents_destroyed},
-            collection=collection_destroyed,
+            documents={
+                name: item
+                for name, item in status.documents.items()
+                if not item.deleted and name not in documents_destroyed
+            },
+            collection=collection,
             identifier=status.identifier,
             path_docs=status.path_docs,
         )
 
-    async def update(self, requests: Requests, options: TextOptions) -> None:
-
-        names = self.filter_names(options)
+    async def export(
+        self,
+        requests: Requests,
+        directory: str,
+        options: TextOptions | None = None,
+    ) -> TextExportManifest:
+        """Render every document in status into ``directory`` and write
+        ``manifest.json`` describing them."""
 
         options = mwargs(TextOptions) if options is None else options
-
         status = self.status
-        await asyncio.gather(
-            *(update_document(status, requests, name) for name in names)
+        template = load_template(self.data)
+
+        names = [
+            name
+            for name, item in status.documents.items()
+            if not item.deleted and (options.names is None or name in options.names)
+        ]
+
+        os.makedirs(directory, exist_ok=True)
+        documents_exported = await self.gather(
+            {
+                name: export_document(
+                    status, requests, name, template, directory, self.scheduler
+                )
+                for name in names
+            }
         )
-        await update_collection(status, requests)
+
+        manifest = TextExportManifest(
+            identifier=status.identifier,
+            documents=documents_exported,
+        )
+        with open(path.join(directory, "manifest.json"), "w") as file:
+            json.dump(manifest.model_dump(mode="json"), file, indent=2)
+
+        return manifest
+
+    async def patch(
+        self,
+        requests: Requests,
+        options: TextOptions | None = None,
+    ) -> Tuple[TextDataStatus, TextPatchReport]:
+        """Make captura match ``text.yaml`` using only the operations from
+        :meth:`plan`. Documents are pushed while planning, see ``push``."""
+
+        plan = await self.plan(requests, options, push=True)
+        return await self.apply(requests, plan)
@@ -0,0 +1,209 @@
+"""Bounded, retrying requests to captura.
+
+Bulk operations like ``text up`` touch every document. Without a bound they
+open as many connections as there are documents, and a single transient
+failure aborts the whole run. :class:`Scheduler` limits the requests in
+flight, retries what is safe to retry, and backs off when captura asks it to.
+"""
+
+# =========================================================================== #
+import asyncio
+import importlib.util
+import random
+import time
+from email.utils import parsedate_to_datetime
+from typing import Awaitable, Callable, Dict, Mapping, Self, Tuple, TypeVar
+
+import httpx
+from app import util
+
+# --------------------------------------------------------------------------- #
+from text_app import fields
+from text_app.schemas import TextClientConfig
+
+logger = util.get_logger(__name__)
+
+T = TypeVar("T")
+
+# NOTE: Only retried for idempotent requests. ``429`` is always retried since
+#       the request was not processed.
+STATUS_RETRY = frozenset({500, 502, 503, 504})
+STATUS_TOO_MANY = 429
+
+
+def create_client(config: TextClientConfig) -> httpx.AsyncClient:
+    """Create the client shared by every request of a command.
+
+    HTTP/2 is only used when ``h2`` is installed, e.g. using the ``http2``
+    extra, and falls back to HTTP/1.1 otherwise.
+    """
+
+    http2 = config.http2
+    if http2 and importlib.util.find_spec("h2") is None:
+        logger.warning("HTTP/2 requires ``h2``, falling back to HTTP/1.1.")
+        http2 = False
+
+    pool_size = config.concurrency if config.pool_size is None else config.pool_size
+    limits = httpx.Limits(
+        max_connections=pool_size,
+        max_keepalive_connections=(
+            pool_size if config.keepalive is None else config.keepalive
+        ),
+        keepalive_expiry=config.keepalive_expiry,
+    )
+    timeout = httpx.Timeout(config.timeout, connect=config.timeout_connect)
+    return httpx.AsyncClient(limits=limits, timeout=timeout, http2=http2)
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse ``Retry-After``, which is either seconds or an HTTP date."""
+
+    if value is None:
+        return None
+
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+class Scheduler:
+    """Schedule requests to captura.
+
+    :attr concurrency: Maximum number of requests in flight.
+    :attr retries: Maximum number of retries per request.
+    :attr backoff: Base delay in seconds, doubled on every retry.
+    :attr backoff_max: Maximum delay in seconds, also bounds ``Retry-After``.
+    """
+
+    concurrency: int
+    retries: int
+    backoff: float
+    backoff_max: float
+
+    _semaphore: asyncio.Semaphore | None
+    _paused_until: float
+
+    def __init__(
+        self,
+        concurrency: int = fields.TEXT_CONCURRENCY,
+        retries: int = fields.TEXT_RETRIES,
+        backoff: float = fields.TEXT_BACKOFF,
+        backoff_max: float = fields.TEXT_BACKOFF_MAX,
+    ):
+        self.concurrency = concurrency
+        self.retries = retries
+        self.backoff = backoff
+        self.backoff_max = backoff_max
+
+        self._semaphore = None
+        self._paused_until = 0
+
+    @classmethod
+    def from_config(cls, config: TextClientConfig) -> Self:
+        return cls(
+            concurrency=config.concurrency,
+            retries=config.retries,
+            backoff=config.backoff,
+            backoff_max=config.backoff_max,
+        )
+
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # NOTE: Created lazily so that it belongs to the running loop.
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+
+    def delay(self, attempt: int) -> float:
+        """Exponential backoff with full jitter."""
+
+        return random.uniform(0, min(self.backoff_max, self.backoff * 2**attempt))
+
+    def pause(self, delay: float) -> None:
+        """Hold every request until ``delay`` seconds from now."""
+
+        self._paused_until = max(self._paused_until, time.monotonic() + delay)
+
+    async def wait(self) -> None:
+        while (remaining := self._paused_until - time.monotonic()) > 0:
+            await asyncio.sleep(remaining)
+
+    async def request(
+        self,
+        send: Callable[..., Awaitable[httpx.Response]],
+        *args,
+        idempotent: bool = True,
+        **kwargs,
+    ) -> httpx.Response:
+        """Call ``send(*args, **kwargs)`` once a slot is free.
+
+        Transport errors and server errors are retried only when the request
+        is ``idempotent``. Responses with ``429`` are always retried and pause
+        every request for ``Retry-After`` seconds. When out of retries the last
+        response is returned, or the last transport error is raised.
+        """
+
+        attempt = 0
+        while True:
+            await self.wait()
+            async with self.semaphore:
+                try:
+                    response = await send(*args, **kwargs)
+                except httpx.TransportError as err:
+                    if not idempotent or attempt >= self.retries:
+                        raise
+
+                    reason, delay = repr(err), self.delay(attempt)
+                else:
+                    status = response.status_code
+                    retry = status == STATUS_TOO_MANY or (
+                        idempotent and status in STATUS_RETRY
+                    )
+                    if not retry or attempt >= self.retries:
+                        return response
+
+                    reason, delay = f"status `{status}`", self.delay(attempt)
+                    retry_after = parse_retry_after(response.headers.get("retry-after"))
+                    if retry_after is not None:
+                        delay = min(retry_after, self.backoff_max)
+                    if status == STATUS_TOO_MANY:
+                        self.pause(delay)
+
+            attempt += 1
+            logger.warning(
+                "Retrying after %s in `%.2f` seconds (attempt `%s` of `%s`).",
+                reason,
+                delay,
+                attempt,
+                self.retries,
+            )
+            await asyncio.sleep(delay)
+
+    async def gather(
+        self,
+        tasks: Mapping[str, Awaitable[T]],
+    ) -> Tuple[Dict[str, T], Dict[str, Exception]]:
+        """Await every task, collecting errors by name instead of failing on
+        the first."""
+
+        names = list(tasks)
+        results = await asyncio.gather(*tasks.values(), return_exceptions=True)
+
+        succeeded: Dict[str, T] = dict()
+        failed: Dict[str, Exception] = dict()
+        for name, result in zip(names, results):
+            if isinstance(result, Exception):
+                logger.error("Failed for `%s`: %s", name, result)
+                failed[name] = result
+            elif isinstance(result, BaseException):
+                raise result
+            else:
+                succeeded[name] = result
+
+        return succeeded, failed
@@ -0,0 +1,174 @@
+"""Push documents to captura as they are edited.
+
+Running ``text patch`` after every edit loads ``text.yaml``, opens new
+connections, starts new render processes, and plans for every document.
+:class:`DocsWatcher` does all of that once and then polls the sources, pushing
+only the documents whose sources changed.
+"""
+
+# =========================================================================== #
+import asyncio
+import os
+import time
+from os import path
+from typing import Dict, Set, Tuple
+
+from app import util
+from app.schemas import mwargs
+from client.requests import Requests
+
+# --------------------------------------------------------------------------- #
+from text_app import fields
+from text_app.schemas import BuilderConfig, TextOptions
+from text_client.controller import TextController, TextPatchReport
+
+logger = util.get_logger(__name__)
+
+Signature = Tuple[int, int, int]
+
+
+class DocsWatcher:
+    """Poll ``text.yaml``, the content files of every document, and the files
+    they include.
+
+    Like the status watcher of the server this polls ``os.stat``, which needs
+    no extra dependencies and works on every filesystem. Changes are pushed
+    once nothing changed for ``debounce`` seconds, so that saving many files
+    at once results in a single push.
+
+    :attr controller: Controller kept for the lifetime of the watcher, along
+        with its render processes.
+    :attr requests: Requests sharing a single client.
+    :attr filepath: Path to ``text.yaml``.
+    :attr interval: Seconds between polls.
+    :attr debounce: Seconds without changes before pushing.
+    :attr signatures: Inode, size, and modification time of every file as of
+        the last poll.
+    """
+
+    controller: TextController
+    requests: Requests
+    filepath: str
+    interval: float
+    debounce: float
+    signatures: Dict[str, Signature | None]
+
+    def __init__(
+        self,
+        controller: TextController,
+        requests: Requests,
+        filepath: str,
+        interval: float = fields.TEXT_WATCH_POLL,
+        debounce: float = fields.TEXT_WATCH_DEBOUNCE,
+    ):
+        self.controller = controller
+        self.requests = requests
+        self.filepath = filepath
+        self.interval = interval
+        self.debounce = debounce
+        self.signatures = self.scan()
+
+    def files(self) -> Dict[str, Set[str]]:
+        """Names of the documents using each file, including the files read
+        when they were last rendered."""
+
+        data = self.controller.data
+        files: Dict[str, Set[str]] = {self.filepath: set()}
+        for name, item in data.documents.items():
+            filepath = path.join(data.path_docs, item.content_file)
+            files.setdefault(filepath, set()).add(name)
+
+        if (status := self.controller.status_previous) is not None:
+            for name, item in status.documents.items():
+                for filepath in item.dependencies:
+                    filepath = path.normpath(path.join(data.path_docs, filepath))
+                    files.setdefault(filepath, set()).add(name)
+
+        return files
+
+    def stat(self, filepath: str) -> Signature | None:
+        try:
+            stat = os.stat(filepath)
+        except FileNotFoundError:
+            return None
+
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+
+    def scan(self) -> Dict[str, Signature | None]:
+        return {filepath: self.stat(filepath) for filepath in self.files()}
+
+    def changed(self) -> Set[str]:
+        """Files changed since the last call."""
+
+        signatures = self.scan()
+        changed = {
+            filepath
+            for filepath, signature in signatures.items()
+            if self.signatures.get(filepath) != signature
+        }
+        self.signatures = signatures
+        return changed
+
+    async def wait(self) -> Set[str]:
+        """Wait for changes, then for ``debounce`` seconds without any."""
+
+        while not (changed := self.changed()):
+            await asyncio.sleep(self.interval)
+
+        while True:
+            await asyncio.sleep(self.debounce)
+            if not (more := self.changed()):
+                return changed
+
+            changed |= more
+
+    async def push(self, changed: Set[str] | None = None) -> TextPatchReport:
+        """Patch the documents using ``changed`` files, or every document
+        when ``text.yaml`` changed or ``changed`` is ``None``."""
+
+        names = None
+        if changed is not None and self.filepath in changed:
+            logger.info("`%s` changed, reloading.", self.filepath)
+            self.controller.load(BuilderConfig.load(self.filepath))
+            self.signatures = self.scan()
+        elif changed is not None:
+            files = self.files()
+            names = sorted(
+                name for filepath in changed for name in files.get(filepath, ())
+            )
+
+        self.controller.errors.clear()
+        status, report = await self.controller.patch(
+            self.requests, mwargs(TextOptions, names=names)
+        )
+        self.controller.save(status)
+
+        # NOTE: Start watching files read for the first time without pushing
+        #       again because of them.
+        for filepath in self.files().keys() - self.signatures.keys():
+            self.signatures[filepath] = self.stat(filepath)
+
+        for name, err in self.controller.errors.items():
+            logger.error("Failed to push `%s`: %s", name, err)
+
+        return report
+
+    async def run(self) -> None:
+        """Push everything once, then push changes until cancelled."""
+
+        logger.info("Watching `%s` every `%s` seconds.", self.filepath, self.interval)
+        await self.push()
+        while True:
+            changed = await self.wait()
+            start = time.perf_counter()
+            try:
+                report = await self.push(changed)
+            except Exception:
+                logger.exception("Unexpected error while pushing changes.")
+                continue
+
+            logger.info(
+                "Pushed `%s` documents in `%.3f` seconds.",
+                len(report.created) + len(report.updated),
+                time.perf_counter() - start,
+            )
@@ -0,0 +1,240 @@
+# =========================================================================== #
+import re
+from os import path
+from types import SimpleNamespace
+from typing import Any, Dict, Iterable, List, Set, Tuple
+
+import httpx
+import yaml
+from app import ChildrenUser
+from app.schemas import CollectionSchema, DocumentSchema
+
+# --------------------------------------------------------------------------- #
+from text_app.schemas import (
+    BuilderConfig,
+    TextBuilderStatus,
+    TextCollectionStatus,
+    TextDataStatus,
+    TextDocumentStatus,
+)
+
+IDENTIFIER = "ident"
+
+
+def create_document_status(name: str, **kwargs: Any) -> TextDocumentStatus:
+    data: Dict[str, Any] = dict(
+        uuid=f"uuid-{name}",
+        name=name,
+        name_captura=f"{name}-{IDENTIFIER}-html",
+        deleted=False,
+        content_file=f"{name}.rst",
+        description=f"Description of {name}.",
+        format_in="rst",
+        format_out="html",
+        hash_source=f"source-{name}",
+        hash_content=f"content-{name}",
+    )
+    data.update(kwargs)
+    return TextDocumentStatus(**data)
+
+
+def create_status(
+    path_docs: str,
+    documents: Dict[str, TextDocumentStatus] | None = None,
+) -> TextDataStatus:
+    if documents is None:
+        documents = {name: create_document_status(name) for name in ("a", "b")}
+
+    return TextDataStatus(
+        identifier=IDENTIFIER,
+        path_docs=path_docs,
+        documents=documents,
+        collection=TextCollectionStatus(
+            uuid="uuid-collection",
+            name="collection",
+            name_captura=f"collection-{IDENTIFIER}",
+            description="Collection.",
+            deleted=False,
+        ),
+    )
+
+
+def create_builder_status(
+    path_docs: str,
+    documents: Dict[str, TextDocumentStatus] | None = None,
+) -> TextBuilderStatus:
+    return TextBuilderStatus(status=create_status(path_docs, documents))
+
+
+def create_builder_config(
+    path_docs: str,
+    names: Iterable[str] = ("a", "b"),
+) -> BuilderConfig:
+    """Write ``text.yaml`` and a content file for every name into
+    ``path_docs``."""
+
+    documents = dict()
+    for name in names:
+        with open(path.join(path_docs, f"{name}.rst"), "w") as file:
+            file.write(f"Title\n=====\n\nContent of {name}.\n")
+
+        documents[name] = dict(
+            content_file=f"{name}.rst",
+            description=f"Description of {name}.",
+            format_in="rst",
+            format_out="html",
+        )
+
+    data = dict(
+        path_docs=path_docs,
+        identifier=IDENTIFIER,
+        collection=dict(name="collection", description="Collection."),
+        documents=documents,
+    )
+    filepath = path.join(path_docs, "text.yaml")
+    with open(filepath, "w") as file:
+        yaml.dump(dict(data=data), file)
+
+    return BuilderConfig.load(filepath)
+
+
+class FakeCaptura:
+    """Answers the requests made by ``text_client`` from memory.
+
+    Requests for anything in ``failing``, by uuid or by name, fail with
+    ``400`` so that they are not retried.
+
+    :attr requests: Stands in for ``client.requests.Requests``.
+    :attr calls: Every request made, as the method and uuid or name.
+    """
+
+    documents: Dict[str, DocumentSchema]
+    collections: Dict[str, CollectionSchema]
+    assignments: Dict[str, List[str]]
+    failing: Set[str]
+    calls: List[Tuple[str, str]]
+    count: int
+
+    def __init__(
+        self,
+        documents: Iterable[DocumentSchema] = (),
+        failing: Iterable[str] = (),
+    ):
+        self.documents = {item.uuid: item for item in documents}
+        self.collections = dict()
+        self.assignments = dict()
+        self.failing = set(failing)
+        self.calls = list()
+        self.count = 0
+        self.requests = SimpleNamespace(
+            d=SimpleNamespace(
+                create=self.create_document,
+                read=self.read_document,
+                update=self.update_document,
+                delete=self.delete_document,
+            ),
+            c=SimpleNamespace(
+                create=self.create_collection,
+                update=self.update_collection,
+                delete=self.delete_collection,
+            ),
+            a=SimpleNamespace(
+                c=SimpleNamespace(create=self.assign, read=self.read_assignments)
+            ),
+            users=SimpleNamespace(search=self.search),
+            handler=SimpleNamespace(check_status=self.check_status),
+            context=SimpleNamespace(
+                config=SimpleNamespace(profile=SimpleNamespace(uuid_user="user"))
+            ),
+        )
+
+    def respond(self, method: str, key: str, status: int, data: Any = None):
+        self.calls.append((method, key))
+        if key in self.failing:
+            status = 400
+
+        response = httpx.Response(status)
+        response.data = data  # type: ignore[attr-defined]
+        return response
+
+    def create_uuid(self) -> str:
+        self.count += 1
+        return f"uuid-created-{self.count}"
+
+    def check_status(self, res: httpx.Response, *, expect_status=200, **kwargs):
+        if res.status_code != expect_status:
+            return (None,), ValueError(f"Unexpected status `{res.status_code}`.")
+
+        data = res.data  # type: ignore[attr-defined]
+        kind = None if data is None or data == [] else "data"
+        return (SimpleNamespace(data=SimpleNamespace(kind=kind, data=data)),), None
+
+    async def search(self, uuid_user: str, *, child, name_like: str, limit=10, **kw):
+        items = (
+            self.collections if child == ChildrenUser.collections else self.documents
+        )
+        pattern = f"^.*{name_like}.*$"
+        found = [item for item in items.values() if re.match(pattern, item.name)]
+        return self.respond("search", name_like, 200, found[:limit])
+
+    async def create_document(self, *, name: str, description: str, content, public):
+        uuid = self.create_uuid()
+        item = DocumentSchema(
+            uuid=uuid, name=name, description=description, content=content
+        )
+        response = self.respond("d.create", name, 201, item)
+        if response.status_code == 201:
+            self.documents[uuid] = item
+        return response
+
+    async def read_document(self, uuid: str):
+        if (item := self.documents.get(uuid)) is None:
+            return self.respond("d.read", uuid, 404)
+        return self.respond("d.read", uuid, 200, item)
+
+    async def update_document(self, uuid: str, **kwargs):
+        response = self.respond("d.update", uuid, 200, self.documents.get(uuid))
+        if response.status_code == 200:
+            self.documents[uuid] = self.documents[uuid].model_copy(update=kwargs)
+        return response
+
+    async def delete_document(self, uuid: str):
+        response = self.respond("d.delete", uuid, 200)
+        if response.status_code == 200:
+            self.documents.pop(uuid)
+        return response
+
+    async def create_collection(self, *, name: str, description: str, **kwargs):
+        uuid = self.create_uuid()
+        item = CollectionSchema(
+            uuid=uuid, name=name, description=description, uuid_user="user"
+        )
+        response = self.respond("c.create", name, 201, item)
+        if response.status_code == 201:
+            self.collections[uuid] = item
+        return response
+
+    async def update_collection(self, uuid: str, **kwargs):
+        response = self.respond("c.update", uuid, 200, self.collections.get(uuid))
+        if response.status_code == 200:
+            self.collections[uuid] = self.collections[uuid].model_copy(update=kwargs)
+        return response
+
+    async def delete_collection(self, uuid: str):
+        response = self.respond("c.delete", uuid, 200)
+        if response.status_code == 200:
+            self.collections.pop(uuid)
+        return response
+
+    async def assign(self, uuid: str, *, uuid_document: List[str]):
+        response = self.respond("a.c.create", uuid, 201, [])
+        if response.status_code == 201:
+            self.assignments.setdefault(uuid, list()).extend(uuid_document)
+        return response
+
+    async def read_assignments(self, uuid: str):
+        data = [
+            SimpleNamespace(uuid_document=item)
+            for item in self.assignments.get(uuid, ())
+        ]
+        return self.respond("a.c.read", uuid, 200, data)
@@ -0,0 +1,97 @@
+import pytest
+
+# --------------------------------------------------------------------------- #
+from text_app import cache as text_cache
+from text_app import depends
+from text_app.cache import TextCache
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch):
+    now = [1000.0]
+    monkeypatch.setattr(text_cache.time, "monotonic", lambda: now[0])
+    return now
+
+
+def test_evicts_least_recently_used():
+    cache = TextCache(size_max=30)
+    cache.set("a", "a", size=10)
+    cache.set("b", "b", size=10)
+    cache.set("c", "c", size=10)
+
+    assert cache.get("a") == "a"
+    cache.set("d", "d", size=10)
+
+    assert "b" not in cache
+    assert {key for key in "acd" if key in cache} == {"a", "c", "d"}
+
+    stats = cache.stats()
+    assert stats.evictions == 1
+    assert stats.size == 30
+    assert stats.entries == 3
+
+
+def test_does_not_cache_oversized():
+    cache = TextCache(size_max=10)
+    assert cache.set("a", "a", size=11) == "a"
+    assert "a" not in cache
+    assert cache.stats().size == 0
+
+
+def test_replace_updates_size():
+    cache = TextCache(size_max=100)
+    cache.set("a", "a", size=10)
+    cache.set("a", "aa", size=20)
+
+    assert cache.get("a") == "aa"
+    assert cache.stats().size == 20
+
+
+def test_expires(clock):
+    cache = TextCache(size_max=100, ttl=5)
+    cache.set("a", "a", size=1)
+
+    clock[0] += 4
+    assert cache.get("a") == "a"
+
+    clock[0] += 2
+    assert cache.get("a") is None
+    assert "a" not in cache
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.expirations) == (1, 1, 1)
+
+
+def test_invalidate_by_name():
+    cache = TextCache(size_max=100)
+    cache.set(("json", "uuid-a"), "json", size=1, name="a")
+    cache.set(("page", "a", "uuid-a"), "page", size=1, name="a")
+    cache.set(("json", "uuid-b"), "json", size=1, name="b")
+
+    assert cache.invalidate("a") == 2
+    assert cache.invalidate("a") == 0
+    assert ("json", "uuid-b") in cache
+    assert len(cache) == 1
+    assert cache.stats().size == 1
+
+
+def test_evicted_entries_leave_names():
+    cache = TextCache(size_max=2)
+    cache.set("a", "a", size=2, name="a")
+    cache.set("b", "b", size=2, name="b")
+
+    assert cache.invalidate("a") == 0
+    assert cache.invalidate("b") == 1
+
+
+def test_singletons_survive_eviction(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(depends, "cache", TextCache(size_max=1))
+    monkeypatch.setattr(depends, "singletons", dict())
+
+    status = object()
+    depends.singletons[depends.KEY_STATUS] = status
+    depends.cache.set(("json", "uuid"), "json", size=1, name="a")
+    depends.cache.set(("page", "a", "uuid"), "page", size=1, name="a")
+    depends.cache.clear()
+
+    assert depends.singletons[depends.KEY_STATUS] is status
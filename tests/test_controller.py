@@ -0,0 +1,425 @@
+# =========================================================================== #
+import asyncio
+import json
+from os import path
+from types import SimpleNamespace
+from typing import Any, Dict, List, Set
+
+import httpx
+import pytest
+from app.schemas import DocumentSchema
+from fastapi import HTTPException
+
+# --------------------------------------------------------------------------- #
+from conftest import (
+    IDENTIFIER,
+    FakeCaptura,
+    create_builder_config,
+    create_builder_status,
+    create_document_status,
+    create_status,
+)
+from text_app.depends import require_document_status
+from text_app.schemas import BuilderConfig, TextOptions, create_hash_contents
+from text_client import controller as text_controller
+from text_client.controller import (
+    KindOperation,
+    TextController,
+    match_documents,
+    render_contents,
+)
+
+
+def create_document(name: str, uuid: str | None = None, **kwargs) -> DocumentSchema:
+    kwargs.setdefault("description", "Description.")
+    return DocumentSchema(
+        uuid=uuid or f"uuid-{name}",
+        name=f"{name}-{IDENTIFIER}-html",
+        **kwargs,
+    )
+
+
+@pytest.fixture
+def text(tmp_path) -> BuilderConfig:
+    return create_builder_config(str(tmp_path))
+
+
+@pytest.fixture
+def controller(text: BuilderConfig) -> TextController:
+    return TextController(None, text, jobs=1)  # type: ignore[arg-type]
+
+
+def test_match_documents(text: BuilderConfig):
+    a = create_document("a")
+    shard = create_document("a~1")
+    duplicates = [create_document("b"), create_document("b", "uuid-other")]
+    orphan = create_document("gone")
+    unrelated = DocumentSchema(uuid="uuid-x", name="unrelated", description="Other.")
+    items = [a, shard, *duplicates, orphan, unrelated]
+
+    documents, found_duplicates, orphans, shards = match_documents(text.data, items)
+
+    assert documents == dict(a=a)
+    assert found_duplicates == dict(b=duplicates)
+    assert orphans == [orphan]
+    assert shards == dict(a={1: shard})
+
+
+def test_match_documents_orphans_invalid_shards(text: BuilderConfig):
+    items = [
+        create_document("a~0"),
+        create_document("gone~1"),
+        DocumentSchema(uuid="uuid-c", name=f"a~1-{IDENTIFIER}-css", description="Css."),
+    ]
+    documents, _, orphans, shards = match_documents(text.data, items)
+
+    assert not documents and not shards
+    assert orphans == items
+
+
+def test_plan_document_missing(controller: TextController):
+    plan_document = controller.plan_document(None, "a")  # type: ignore[arg-type]
+    status, operation, contents = asyncio.run(plan_document)
+
+    assert status is None
+    assert operation is not None and operation.kind == KindOperation.create
+    assert contents is not None and "Content of a." in str(contents)
+
+
+def test_plan_document_unchanged(controller: TextController, text: BuilderConfig):
+    """Searches do not include content, so it is read to compare."""
+
+    item = text.data.require("a")
+    contents, _ = render_contents(item, text.data.path_docs)
+    document = create_document("a", description=item.description)
+    captura = FakeCaptura([document.model_copy(update=dict(content=contents[0]))])
+
+    plan_document = controller.plan_document(captura.requests, "a", document)
+    status, operation, _ = asyncio.run(plan_document)
+
+    assert operation is None
+    assert captura.calls == [("d.read", document.uuid)]
+    assert status is not None and status.uuid == document.uuid
+    assert status.hash_content == create_hash_contents(contents)
+
+
+def test_plan_document_changed(controller: TextController, text: BuilderConfig):
+    item = text.data.require("a")
+    document = create_document("a", description=item.description)
+    captura = FakeCaptura([document.model_copy(update=dict(content=dict()))])
+    plan_document = controller.plan_document(captura.requests, "a", document)
+    _, operation, _ = asyncio.run(plan_document)
+    assert operation is not None
+    assert (operation.kind, operation.reason) == (
+        KindOperation.update,
+        "content changed",
+    )
+
+    document = create_document("a", description="Old.")
+    captura = FakeCaptura([document])
+    plan_document = controller.plan_document(captura.requests, "a", document)
+    _, operation, _ = asyncio.run(plan_document)
+    assert operation is not None and operation.reason == "content unknown"
+
+
+def test_plan_document_uses_status(
+    controller: TextController,
+    text: BuilderConfig,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """With status nothing is read from captura and nothing is rendered,
+    unless a file read to render it changed."""
+
+    item = text.data.require("a")
+    document = create_document("a", description=item.description)
+    contents, _ = render_contents(item, text.data.path_docs)
+    captura = FakeCaptura([document.model_copy(update=dict(content=contents[0]))])
+    plan_document = controller.plan_document(captura.requests, "a", document)
+    previous, *_ = asyncio.run(plan_document)
+    assert previous is not None
+    dependency = path.join(text.data.path_docs, "included.rst")
+    previous = previous.model_copy(update=dict(dependencies={"included.rst": None}))
+    controller.saved = create_status(text.data.path_docs, dict(a=previous))
+    captura.calls.clear()
+
+    rendered = []
+
+    def render(*args):
+        rendered.append(args)
+        return render_contents(*args)
+
+    monkeypatch.setattr(text_controller, "render_contents", render)
+    plan_document = controller.plan_document(captura.requests, "a", document)
+    status, operation, _ = asyncio.run(plan_document)
+    assert operation is None and not rendered
+    assert status == previous
+
+    with open(dependency, "w") as file:
+        file.write("Included.\n")
+
+    plan_document = controller.plan_document(captura.requests, "a", document)
+    status, operation, _ = asyncio.run(plan_document)
+    assert len(rendered) == 1
+    assert operation is None
+    assert not captura.calls
+
+
+def create_requests(failing: Set[str] = set()) -> SimpleNamespace:
+    """Fake requests deleting anything except the uuids in ``failing``."""
+
+    deleted: List[str] = []
+
+    async def delete(uuid: str) -> httpx.Response:
+        if uuid not in failing:
+            deleted.append(uuid)
+        return httpx.Response(200, json=uuid)
+
+    def check_status(res: httpx.Response, **kwargs):
+        uuid = res.json()
+        err = ValueError(f"Failed to delete `{uuid}`.") if uuid in failing else None
+        return (None,), err
+
+    return SimpleNamespace(
+        d=SimpleNamespace(delete=delete),
+        c=SimpleNamespace(delete=delete),
+        handler=SimpleNamespace(check_status=check_status),
+        deleted=deleted,
+    )
+
+
+def test_destroy_prunes_status(controller: TextController, text: BuilderConfig):
+    controller.saved = create_status(text.data.path_docs)
+    requests = create_requests()
+
+    options = TextOptions(names=["a"])
+    status = asyncio.run(controller.destroy(requests, options))  # type: ignore
+    assert list(status.documents) == ["b"]
+    assert not status.collection.deleted
+    assert requests.deleted == ["uuid-a"]
+
+    controller.saved = status
+    status = asyncio.run(controller.destroy(requests))  # type: ignore
+    assert not status.documents
+    assert status.collection.deleted
+    assert requests.deleted == ["uuid-a", "uuid-b", "uuid-collection"]
+
+
+def test_destroy_skips_deleted(controller: TextController, text: BuilderConfig):
+    """Documents deleted before are not deleted again, so the collection is
+    removed."""
+
+    documents = dict(
+        a=create_document_status("a", deleted=True),
+        b=create_document_status("b"),
+    )
+    controller.saved = create_status(text.data.path_docs, documents)
+    requests = create_requests(failing={"uuid-a"})
+
+    status = asyncio.run(controller.destroy(requests))  # type: ignore
+    assert not controller.errors
+    assert not status.documents
+    assert requests.deleted == ["uuid-b", "uuid-collection"]
+
+
+def test_destroy_keeps_failed(controller: TextController, text: BuilderConfig):
+    controller.saved = create_status(text.data.path_docs)
+    requests = create_requests(failing={"uuid-b"})
+
+    status = asyncio.run(controller.destroy(requests))  # type: ignore
+    assert list(controller.errors) == ["b"]
+    assert list(status.documents) == ["b"]
+    assert not status.collection.deleted
+
+
+def test_deleted_documents_are_not_served():
+    documents = dict(a=create_document_status("a", deleted=True))
+    status = create_builder_status("docs", documents)
+
+    with pytest.raises(HTTPException) as err:
+        require_document_status(status, "a")
+
+    assert err.value.status_code == 404
+
+
+def test_plan_names_without_status(controller: TextController):
+    """Planning for some names keeps the others, even without status."""
+
+    a, b = create_document("a"), create_document("b")
+    shard = create_document("b~1")
+    captura = FakeCaptura([a, b, shard])
+
+    options = TextOptions(names=["a"])
+    plan = asyncio.run(controller.plan(captura.requests, options))  # type: ignore
+
+    assert set(plan.documents) == {"a", "b"}
+    assert plan.documents["b"].uuid == b.uuid
+    assert plan.documents["b"].shards == (shard.uuid,)
+    assert plan.documents["b"].hash_content is None
+    assert {item.name for item in plan.filter(KindOperation.update)} == {"a"}
+
+
+def create_text(content: str) -> Dict[str, Any]:
+    return dict(text=dict(format="html", content=content, tags=["resume"]))
+
+
+def test_export(controller: TextController, text: BuilderConfig, tmp_path):
+    documents = dict(
+        a=create_document_status("a", shards=("uuid-a~1",)),
+        b=create_document_status("b", deleted=True),
+    )
+    controller.saved = create_status(text.data.path_docs, documents)
+    captura = FakeCaptura(
+        [
+            create_document("a", content=create_text("<p>first")),
+            create_document("a~1", content=create_text(" second</p>")),
+        ]
+    )
+
+    directory = path.join(tmp_path, "export")
+    manifest = asyncio.run(controller.export(captura.requests, directory))
+
+    assert list(manifest.documents) == ["a"]
+    exported = manifest.documents["a"]
+    with open(path.join(directory, exported.file), "rb") as file:
+        content = file.read()
+
+    assert b"<p>first second</p>" in content
+    assert exported.size == len(content)
+    assert exported.uuid == "uuid-a"
+
+    with open(path.join(directory, "manifest.json")) as file:
+        assert json.load(file)["documents"]["a"]["etag"] == exported.etag
+
+
+def test_plan_skips_duplicates(controller: TextController, text: BuilderConfig):
+    """Names with more than one document are reported and keep their previous
+    status, the others are still planned."""
+
+    controller.saved = create_status(text.data.path_docs)
+    captura = FakeCaptura(
+        [create_document("a"), create_document("b"), create_document("b", "uuid-x")]
+    )
+
+    plan = asyncio.run(controller.plan(captura.requests))  # type: ignore[arg-type]
+
+    assert list(controller.errors) == ["b"]
+    assert "uuid-x" in str(controller.errors["b"])
+    assert plan.documents["b"] == controller.saved.documents["b"]
+    assert {item.name for item in plan.operations} == {"a", "collection"}
+
+
+def test_search_documents_doubles_limit(text: BuilderConfig):
+    """Searches filling their limit are repeated until everything is found."""
+
+    items = [create_document(f"a~{index}", f"uuid-{index}") for index in range(100)]
+    captura = FakeCaptura(items)
+    search, limits = captura.requests.users.search, []
+
+    async def search_limits(*args, limit: int, **kwargs):
+        limits.append(limit)
+        return await search(*args, limit=limit, **kwargs)
+
+    captura.requests.users.search = search_limits
+    found = asyncio.run(text_controller.search_documents(text.data, captura.requests))
+
+    assert limits == [64, 128]
+    assert {item.uuid for item in found} == {item.uuid for item in items}
+
+
+def test_apply_keeps_status_when_assigning_fails(controller: TextController):
+    captura = FakeCaptura(failing={"uuid-created-1"})
+    status, report = asyncio.run(controller.patch(captura.requests))  # type: ignore
+
+    assert ("a.c.create", "uuid-created-1") in captura.calls
+    assert list(controller.errors) == ["collection"]
+    assert status.collection.uuid == "uuid-created-1"
+    assert set(status.documents) == {"a", "b"}
+    assert set(report.created) == {"a", "b"}
+
+
+def test_plan_deletes_recorded_orphans(controller: TextController, text: BuilderConfig):
+    """Orphans are only deleted when the status or its history has them, other
+    sites might use the same identifier."""
+
+    documents = dict(create_status(text.data.path_docs).documents)
+    documents["old"] = create_document_status("old")
+    controller.save(create_status(text.data.path_docs, documents))
+    documents.pop("old")
+    documents["gone"] = create_document_status("gone")
+    controller.save(create_status(text.data.path_docs, documents))
+
+    orphans = [create_document(name) for name in ("old", "gone", "home-other")]
+    captura = FakeCaptura([create_document("a"), create_document("b"), *orphans])
+    plan = asyncio.run(controller.plan(captura.requests))  # type: ignore[arg-type]
+
+    deleted = {item.uuid for item in plan.filter(KindOperation.delete)}
+    assert deleted == {"uuid-old", "uuid-gone"}
+
+
+def test_patch_pushes_while_rendering(
+    controller: TextController,
+    monkeypatch: pytest.MonkeyPatch,
+):
+    """Each document is uploaded once rendered, ``plan`` alone uploads
+    nothing."""
+
+    events: List[Any] = []
+    captura = FakeCaptura()
+    captura.calls = events
+
+    def render(item, path_docs):
+        events.append(("render", item.content_file))
+        return render_contents(item, path_docs)
+
+    monkeypatch.setattr(text_controller, "render_contents", render)
+    plan = asyncio.run(controller.plan(captura.requests))  # type: ignore[arg-type]
+    assert not plan.pushed
+    assert [event for event in events if event[0] != "search"] == [
+        ("render", "a.rst"),
+        ("render", "b.rst"),
+    ]
+
+    events.clear()
+    status, report = asyncio.run(controller.patch(captura.requests))  # type: ignore
+    assert [event for event in events if event[0] != "search"] == [
+        ("c.create", f"collection-{IDENTIFIER}"),
+        ("render", "a.rst"),
+        ("d.create", f"a-{IDENTIFIER}-html"),
+        ("render", "b.rst"),
+        ("d.create", f"b-{IDENTIFIER}-html"),
+        ("a.c.create", "uuid-created-1"),
+    ]
+    assert set(report.created) == {"a", "b"}
+    assert set(status.documents) == {"a", "b"}
+
+
+def test_apply_keeps_shards_when_update_fails(
+    controller: TextController,
+    text: BuilderConfig,
+):
+    """Unused shards are only deleted once their document is updated, so the
+    page served stays whole."""
+
+    shards = ("uuid-a~1", "uuid-a~2")
+    documents = dict(a=create_document_status("a", shards=shards))
+    controller.saved = create_status(text.data.path_docs, documents)
+    items = [create_document(name) for name in ("a", "a~1", "a~2")]
+    captura = FakeCaptura(items, failing={"uuid-a"})
+
+    status, report = asyncio.run(controller.patch(captura.requests))  # type: ignore
+    assert report.failed == ["a"]
+    assert not [call for call in captura.calls if call[0] == "d.delete"]
+    assert status.documents["a"].shards == shards
+    assert status.documents["a"].hash_content is None
+
+    controller.errors.clear()
+    controller.saved = status
+    captura.failing.clear()
+    status, report = asyncio.run(controller.patch(captura.requests))  # type: ignore
+    assert "a" in report.updated
+    assert not status.documents["a"].shards
+    deleted = [uuid for method, uuid in captura.calls if method == "d.delete"]
+    assert deleted == list(shards)
+    assert captura.calls.index(("d.update", "uuid-a")) < captura.calls.index(
+        ("d.delete", "uuid-a~1")
+    )
@@ -0,0 +1,115 @@
+# =========================================================================== #
+import asyncio
+from types import SimpleNamespace
+from typing import Any, Generator, List, Tuple
+
+import pytest
+from app.depends import async_session_maker
+from app.schemas import DocumentSchema
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+# --------------------------------------------------------------------------- #
+from conftest import IDENTIFIER, create_builder_status, create_document_status
+from text_app import depends, fields
+from text_app.cache import TextCache
+from text_app.router import TextView
+
+
+@pytest.fixture
+def missing(monkeypatch: pytest.MonkeyPatch) -> None:
+    """No ``text.yaml``."""
+
+    monkeypatch.setattr(depends, "singletons", dict())
+    monkeypatch.setattr(depends, "PATH_TEXT_CONFIG", "/nonexistent/text.yaml")
+
+
+def test_startup_without_config(missing):
+    assert asyncio.run(depends.startup()) == 0
+
+
+class FakeSession:
+    def __init__(self, rows: List[Tuple[DocumentSchema, int]], queries: List[Any]):
+        self.rows = rows
+        self.queries = queries
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *args):
+        return None
+
+    async def execute(self, q):
+        self.queries.append(q)
+        return SimpleNamespace(all=lambda: self.rows)
+
+
+@pytest.fixture
+def queries() -> List[Any]:
+    return list()
+
+
+@pytest.fixture
+def client(
+    monkeypatch: pytest.MonkeyPatch,
+    queries: List[Any],
+) -> Generator[TestClient, None, None]:
+    """Serve ``a``, ``b`` and ``c``, where ``c`` is missing from captura."""
+
+    monkeypatch.setattr(depends, "cache", TextCache(size_max=2**20))
+    documents = dict((name, create_document_status(name)) for name in ("a", "b", "c"))
+    status = create_builder_status("docs", documents)
+    rows = [
+        (
+            DocumentSchema(
+                uuid=f"uuid-{name}",
+                name=f"{name}-{IDENTIFIER}-html",
+                description=f"Description of {name}.",
+                content=dict(text=dict(format="html", content=name, tags=[])),
+            ),
+            1000,
+        )
+        for name in ("a", "b")
+    ]
+
+    app = FastAPI()
+    app.include_router(TextView.view_router, prefix="/text")
+    app.dependency_overrides.update(
+        {
+            depends.status: lambda: status,
+            async_session_maker: lambda: lambda: FakeSession(rows, queries),
+        }
+    )
+    with TestClient(app) as client:
+        yield client
+
+
+def names(response) -> List[str]:
+    return [item["uuid"] for item in response.json()["data"]]
+
+
+def test_batch(client: TestClient, queries: List[Any]):
+    response = client.get("/text/_batch", params=dict(name=["b", "a", "b"]))
+    assert response.status_code == 200
+    assert names(response) == ["uuid-b", "uuid-a"]
+    assert response.json()["data"][0]["content"]["text"]["content"] == "b"
+    assert len(queries) == 1
+
+    # NOTE: Cached by now.
+    response = client.get("/text/_batch", params=dict(name=["a"], content=False))
+    assert response.status_code == 200
+    assert names(response) == ["uuid-a"]
+    assert response.json()["data"][0]["content"] is None
+    assert len(queries) == 1
+
+
+@pytest.mark.parametrize("name", [["a", "x"], ["a", "c"]])
+def test_batch_missing(client: TestClient, name: List[str]):
+    response = client.get("/text/_batch", params=dict(name=name))
+    assert response.status_code == 404
+
+
+def test_batch_too_many(client: TestClient, monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(fields, "LENGTH_BATCH", 2)
+    response = client.get("/text/_batch", params=dict(name=["a", "b", "a"]))
+    assert response.status_code == 422
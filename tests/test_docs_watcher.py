@@ -0,0 +1,66 @@
+# =========================================================================== #
+import asyncio
+from os import path
+
+import pytest
+
+# --------------------------------------------------------------------------- #
+from conftest import FakeCaptura, create_builder_config
+from text_client.controller import TextController
+from text_client.watch import DocsWatcher
+
+
+@pytest.fixture
+def captura() -> FakeCaptura:
+    return FakeCaptura()
+
+
+@pytest.fixture
+def watcher(tmp_path, captura: FakeCaptura) -> DocsWatcher:
+    text = create_builder_config(str(tmp_path))
+    controller = TextController(None, text, jobs=1)  # type: ignore[arg-type]
+    filepath = path.join(tmp_path, "text.yaml")
+    return DocsWatcher(controller, captura.requests, filepath, interval=0, debounce=0)
+
+
+def edit(watcher: DocsWatcher, name: str) -> str:
+    data = watcher.controller.data
+    filepath = path.join(data.path_docs, data.require(name).content_file)
+    with open(filepath, "a") as file:
+        file.write("\nEdited.\n")
+
+    return filepath
+
+
+def test_pushes_changed_documents(watcher: DocsWatcher, captura: FakeCaptura):
+    report = asyncio.run(watcher.push())
+    assert set(report.created) == {"a", "b"}
+    assert not watcher.changed()
+
+    filepath = edit(watcher, "a")
+    changed = asyncio.run(watcher.wait())
+    assert changed == {filepath}
+
+    captura.calls.clear()
+    report = asyncio.run(watcher.push(changed))
+    assert report.updated == ["a"]
+    assert not report.created and not watcher.controller.errors
+
+    uuid = watcher.controller.status.require("a").uuid
+    assert [call for call in captura.calls if call[0] == "d.update"] == [
+        ("d.update", uuid)
+    ]
+    assert "Edited." in str(captura.documents[uuid].content)
+
+
+def test_reloads_config(watcher: DocsWatcher):
+    asyncio.run(watcher.push())
+
+    with open(watcher.filepath, "r") as file:
+        content = file.read()
+    with open(watcher.filepath, "w") as file:
+        file.write(content.replace("Description of a.", "Edited description."))
+
+    report = asyncio.run(watcher.push(watcher.changed()))
+    assert watcher.controller.data.require("a").description == "Edited description."
+    assert report.updated == ["a"]
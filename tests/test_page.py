@@ -0,0 +1,175 @@
+# =========================================================================== #
+import gzip
+from typing import Any, Dict, List
+
+import pytest
+from app.schemas import DocumentSchema
+from fastapi import Request
+
+# --------------------------------------------------------------------------- #
+from text_app import fields
+from text_app.page import TextPage, accepts_gzip, matches, merge_shards
+from text_app.schemas import (
+    TextDocumentConfig,
+    create_hash_content,
+    create_hash_contents,
+)
+
+BODY = b"<p>" + b"text " * 1000 + b"</p>"
+
+
+def create_request(headers: Dict[str, str] | None = None) -> Request:
+    return Request(
+        dict(
+            type="http",
+            method="GET",
+            path="/",
+            headers=[
+                (key.lower().encode(), value.encode())
+                for key, value in (headers or dict()).items()
+            ],
+        )
+    )
+
+
+@pytest.fixture
+def page() -> TextPage:
+    return TextPage.create("page", "html", [b"<html>", BODY, b"</html>"], 1000)
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, expected",
+    [
+        (None, False),
+        ("", False),
+        ("gzip", True),
+        ("deflate, gzip;q=0.5", True),
+        ("gzip;q=0", False),
+        ("x-gzip", True),
+        ("*", True),
+        ("*, gzip;q=0", False),
+        ("br, identity", False),
+    ],
+)
+def test_accepts_gzip(accept_encoding: str | None, expected: bool):
+    assert accepts_gzip(accept_encoding) is expected
+
+
+def test_matches():
+    assert matches('"a"', '"a"')
+    assert matches('W/"a"', '"a"')
+    assert matches('"b", "a"', '"a"')
+    assert matches("*", '"a"')
+    assert not matches('"b"', '"a"')
+
+
+def test_identity(page: TextPage):
+    response = page.response(create_request())
+
+    assert response.status_code == 200
+    assert response.body == b"<html>" + BODY + b"</html>"
+    assert response.headers["etag"] == page.etag
+    assert response.headers["vary"] == "Accept-Encoding"
+    assert "content-encoding" not in response.headers
+
+
+def test_gzip(page: TextPage):
+    response = page.response(create_request({"Accept-Encoding": "gzip"}))
+
+    assert response.status_code == 200
+    assert response.headers["content-encoding"] == "gzip"
+    assert response.headers["etag"] == page.etag_gzip != page.etag
+    assert gzip.decompress(response.body) == page.content
+
+
+def test_gzip_is_deterministic(page: TextPage):
+    again = TextPage.create("page", "html", list(page.chunks), 1000)
+    assert again.content_gzip == page.content_gzip
+
+
+def test_small_pages_are_not_compressed():
+    page = TextPage.create("page", "html", [b"<p>small</p>"])
+    response = page.response(create_request({"Accept-Encoding": "gzip"}))
+
+    assert page.content_gzip is None
+    assert "content-encoding" not in response.headers
+
+
+def test_not_modified(page: TextPage):
+    response = page.response(create_request({"If-None-Match": page.etag}))
+    assert response.status_code == 304
+    assert response.headers["etag"] == page.etag
+
+    # NOTE: The validator of one encoding does not match the other.
+    headers = {"If-None-Match": page.etag, "Accept-Encoding": "gzip"}
+    assert page.response(create_request(headers)).status_code == 200
+
+
+def test_if_modified_since(page: TextPage):
+    before = "Thu, 01 Jan 1970 00:00:00 GMT"
+    after = "Thu, 01 Jan 1970 00:16:40 GMT"
+
+    assert (
+        page.response(create_request({"If-Modified-Since": after})).status_code == 304
+    )
+    assert (
+        page.response(create_request({"If-Modified-Since": before})).status_code == 200
+    )
+
+    # NOTE: ``If-None-Match`` takes precedence.
+    headers = {"If-Modified-Since": after, "If-None-Match": '"other"'}
+    assert page.response(create_request(headers)).status_code == 200
+
+
+def test_streams_large_pages(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(fields, "TEXT_STREAM_SIZE_MIN", 16)
+    page = TextPage.create("page", "html", [b"<html>", BODY, b"</html>"])
+    response = page.response(create_request())
+
+    assert len(page.chunks) == 3
+    assert response.headers["content-length"] == str(page.size_identity)
+    assert not hasattr(response, "body")
+
+
+def create_documents(contents: List[Dict[str, Any]]) -> List[DocumentSchema]:
+    return [
+        DocumentSchema(
+            uuid=f"uuid-{index}",
+            name=f"page~{index}",
+            description="Page.",
+            content=content,
+        )
+        for index, content in enumerate(contents)
+    ]
+
+
+def test_split_and_merge_shards(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(fields, "LENGTH_CONTENT", 16)
+    config = TextDocumentConfig(
+        content_file="page.rst",
+        description="Page.",
+        format_in="rst",
+        format_out="html",
+    )
+    content = "<p>" + "0123456789" * 5 + "</p>"
+    contents = config.split(content)
+
+    assert len(contents) == 4
+    assert create_hash_contents(contents) != create_hash_content(contents[0])
+
+    document, *shards = create_documents(contents)
+    merged = merge_shards(document, shards)
+    assert merged.content is not None
+    assert merged.content["text"]["content"] == content
+    assert merged.content["text"]["format"] == "html"
+    assert merged.uuid == document.uuid
+
+    (single,) = config.split("")
+    assert create_hash_contents([single]) == create_hash_content(single)
+    assert merge_shards(document, []) is document
+
+
+def test_merge_malformed_shards():
+    document, shard = create_documents([dict(text=dict(content="a")), dict()])
+    with pytest.raises(ValueError):
+        merge_shards(document, [shard])
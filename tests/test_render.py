@@ -0,0 +1,155 @@
+# =========================================================================== #
+import os
+import shutil
+from os import path
+
+import pytest
+from docutils.core import publish_parts
+
+# --------------------------------------------------------------------------- #
+from text_app import render as text_render
+from text_app.render import RenderCache, Renderer, create_key
+
+SOURCE = b"""
+Title
+=====
+
+Some *text*.
+
+.. include:: included.rst
+"""
+
+
+@pytest.fixture
+def path_docs(tmp_path) -> str:
+    path_docs = path.join(tmp_path, "docs")
+    os.mkdir(path_docs)
+    with open(path.join(path_docs, "page.rst"), "wb") as file:
+        file.write(SOURCE)
+    with open(path.join(path_docs, "included.rst"), "w") as file:
+        file.write("Included.\n")
+
+    return path_docs
+
+
+@pytest.fixture
+def calls(monkeypatch: pytest.MonkeyPatch):
+    """Count renders done by the cache."""
+
+    calls = []
+    render = text_render.render
+
+    def wrapper(*args, **kwargs):
+        calls.append(args)
+        return render(*args, **kwargs)
+
+    monkeypatch.setattr(text_render, "render", wrapper)
+    return calls
+
+
+def create_cache(path_docs: str, **kwargs) -> RenderCache:
+    directory = path.join(path_docs, text_render.DIRNAME_CACHE)
+    return RenderCache(directory, path_docs=path_docs, **kwargs)
+
+
+def render(cache: RenderCache, path_docs: str):
+    source_path = path.join(path_docs, "page.rst")
+    return cache.render(SOURCE, "rst", "html", source_path)
+
+
+def test_renderer_matches_publish_parts():
+    source = "Title\n=====\n\nSome *text*.\n"
+    parts = publish_parts(source, writer_name="html")
+
+    renderer = Renderer()
+    assert renderer.convert(source.encode(), "rst", "html") == parts["html_body"]
+    assert renderer.convert(source.encode(), "rst", "html") == parts["html_body"]
+    assert len(renderer.timings) == 2
+
+
+def test_unsupported():
+    with pytest.raises(ValueError):
+        Renderer().render(b"", "rst", "svg")
+
+
+def test_hit(path_docs: str, calls):
+    cache = create_cache(path_docs)
+    output = render(cache, path_docs)
+    assert "Included." in output.content
+    assert list(output.dependencies) == [path.join(path_docs, "included.rst")]
+
+    assert render(cache, path_docs) == output
+    assert len(calls) == 1
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.stale) == (1, 1, 0)
+
+
+def test_stale_when_dependency_changes(path_docs: str, calls):
+    cache = create_cache(path_docs)
+    render(cache, path_docs)
+
+    with open(path.join(path_docs, "included.rst"), "w") as file:
+        file.write("Changed.\n")
+
+    output = render(cache, path_docs)
+    assert "Changed." in output.content
+    assert len(calls) == 2
+
+    stats = cache.stats()
+    assert (stats.hits, stats.misses, stats.stale) == (0, 1, 1)
+
+    assert render(cache, path_docs) == output
+    assert cache.stats().hits == 1
+
+
+def test_malformed_entries_are_stale(path_docs: str, calls):
+    cache = create_cache(path_docs)
+    render(cache, path_docs)
+
+    (key,) = cache.index
+    with open(cache.filepath(key), "w") as file:
+        file.write("{")
+
+    assert "Included." in render(cache, path_docs).content
+    assert cache.stats().stale == 1
+
+
+def test_shared_across_checkouts(path_docs: str, tmp_path, calls, monkeypatch):
+    """Entries hold no absolute paths, so a copy of the docs and the cache in
+    another directory reuses them."""
+
+    monkeypatch.chdir(path.dirname(path_docs))
+    render(create_cache("docs"), "docs")
+
+    path_other = path.join(tmp_path, "other")
+    os.mkdir(path_other)
+    shutil.copytree(path_docs, path.join(path_other, "docs"))
+    monkeypatch.chdir(path_other)
+
+    cache = create_cache("docs")
+    output = render(cache, "docs")
+    assert len(calls) == 1
+    assert cache.stats().hits == 1
+    assert list(output.dependencies) == [path.join(path_other, "docs", "included.rst")]
+
+
+def test_key():
+    key = create_key(b"source", "rst", "html", "docs/page.rst", "docs")
+    assert key == create_key(b"source", "rst", "html", "docs/page.rst", "docs")
+    assert key != create_key(b"other", "rst", "html", "docs/page.rst", "docs")
+    assert key != create_key(b"source", "rst", "html", "docs/other.rst", "docs")
+    assert key != create_key(b"source", "rst", "html", "docs/page.rst", ".")
+
+
+def test_evicts_least_recently_used(tmp_path):
+    cache = RenderCache(str(tmp_path), size_max=20)
+    cache.set("a", "a" * 10)
+    cache.set("b", "b" * 10)
+    os.utime(cache.filepath("a"), ns=(0, 0))
+    assert cache.get("a") == "a" * 10
+
+    cache.set("c", "c" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == "a" * 10
+    assert cache.stats().entries == 2
@@ -0,0 +1,161 @@
+# =========================================================================== #
+import asyncio
+import time
+from datetime import datetime, timedelta, timezone
+from email.utils import format_datetime
+from typing import Dict, List
+
+import httpx
+import pytest
+
+# --------------------------------------------------------------------------- #
+from text_client import scheduler as text_scheduler
+from text_client.scheduler import Scheduler, parse_retry_after
+
+
+@pytest.fixture
+def sleeps(monkeypatch: pytest.MonkeyPatch) -> List[float]:
+    """Record sleeps and advance the clock instead of sleeping."""
+
+    sleeps: List[float] = []
+    monotonic = time.monotonic
+
+    async def sleep(delay: float) -> None:
+        sleeps.append(delay)
+
+    monkeypatch.setattr(text_scheduler.asyncio, "sleep", sleep)
+    monkeypatch.setattr(
+        text_scheduler.time, "monotonic", lambda: monotonic() + sum(sleeps)
+    )
+    return sleeps
+
+
+def create_send(*responses: int | Exception, headers: Dict[str, str] | None = None):
+    """Fake ``send`` returning ``responses`` in order."""
+
+    calls: List[int] = []
+
+    async def send() -> httpx.Response:
+        item = responses[len(calls)]
+        calls.append(len(calls))
+        if isinstance(item, Exception):
+            raise item
+
+        return httpx.Response(item, headers=headers)
+
+    send.calls = calls  # type: ignore[attr-defined]
+    return send
+
+
+def create_scheduler(**kwargs) -> Scheduler:
+    kwargs.setdefault("retries", 3)
+    return Scheduler(concurrency=2, backoff=1, backoff_max=10, **kwargs)
+
+
+@pytest.mark.parametrize(
+    "value, expected",
+    [(None, None), ("3", 3.0), ("-1", 0.0), ("soon", None)],
+)
+def test_parse_retry_after(value: str | None, expected: float | None):
+    assert parse_retry_after(value) == expected
+
+
+def test_parse_retry_after_date():
+    date = datetime.now(timezone.utc) + timedelta(seconds=60)
+    delay = parse_retry_after(format_datetime(date, usegmt=True))
+    assert delay is not None and 50 < delay <= 60
+
+    date = datetime.now(timezone.utc) - timedelta(seconds=60)
+    assert parse_retry_after(format_datetime(date, usegmt=True)) == 0
+
+
+def test_retries_server_errors(sleeps: List[float]):
+    send = create_send(503, 502, 200)
+    response = asyncio.run(create_scheduler().request(send))
+
+    assert response.status_code == 200
+    assert len(send.calls) == 3
+    assert len(sleeps) == 2
+    assert all(0 <= delay <= 10 for delay in sleeps)
+
+
+def test_returns_last_response_when_out_of_retries(sleeps: List[float]):
+    send = create_send(500, 500, 500)
+    response = asyncio.run(create_scheduler(retries=2).request(send))
+
+    assert response.status_code == 500
+    assert len(send.calls) == 3
+
+
+def test_does_not_retry_non_idempotent(sleeps: List[float]):
+    send = create_send(503, 200)
+    response = asyncio.run(create_scheduler().request(send, idempotent=False))
+    assert response.status_code == 503
+
+    send = create_send(httpx.ConnectError("refused"), 200)
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(create_scheduler().request(send, idempotent=False))
+
+    assert sleeps == []
+
+
+def test_retries_transport_errors(sleeps: List[float]):
+    send = create_send(httpx.ConnectError("refused"), 200)
+    assert asyncio.run(create_scheduler().request(send)).status_code == 200
+
+    send = create_send(*[httpx.ConnectError("refused")] * 4)
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(create_scheduler().request(send))
+
+
+def test_too_many_requests(sleeps: List[float]):
+    """``429`` is retried even when not idempotent, after ``Retry-After``."""
+
+    scheduler = create_scheduler()
+    send = create_send(429, 200, headers={"Retry-After": "4"})
+    response = asyncio.run(scheduler.request(send, idempotent=False))
+
+    assert response.status_code == 200
+    assert sleeps[-1] == 4
+    assert scheduler._paused_until > 0
+
+    # NOTE: ``Retry-After`` is bounded by ``backoff_max``.
+    send = create_send(429, 200, headers={"Retry-After": "60"})
+    asyncio.run(create_scheduler().request(send))
+    assert sleeps[-1] == 10
+
+
+def test_gather_collects_errors():
+    async def succeed() -> int:
+        return 1
+
+    async def fail() -> int:
+        raise ValueError("failed")
+
+    tasks = dict(a=succeed(), b=fail(), c=succeed())
+    succeeded, failed = asyncio.run(Scheduler().gather(tasks))
+
+    assert succeeded == dict(a=1, c=1)
+    assert list(failed) == ["b"]
+    assert isinstance(failed["b"], ValueError)
+
+
+def test_limits_requests_in_flight():
+    in_flight, peak = 0, 0
+
+    async def send() -> httpx.Response:
+        nonlocal in_flight, peak
+        in_flight += 1
+        peak = max(peak, in_flight)
+        await asyncio.sleep(0.01)
+        in_flight -= 1
+        return httpx.Response(200)
+
+    async def main():
+        scheduler = create_scheduler()
+        tasks = {str(index): scheduler.request(send) for index in range(8)}
+        return await scheduler.gather(tasks)
+
+    succeeded, failed = asyncio.run(main())
+    assert len(succeeded) == 8 and not failed
+    assert peak == 2
@@ -0,0 +1,104 @@
+# =========================================================================== #
+import os
+import stat
+from os import path
+from typing import List
+
+import pytest
+import yaml
+
+# --------------------------------------------------------------------------- #
+from conftest import create_document_status, create_status
+from text_app.schemas import TextBuilderStatus, TextDataStatus
+from text_app.status import StatusStore, TextStatusDelta
+
+
+def create_statuses(path_docs: str) -> List[TextDataStatus]:
+    """Statuses after adding, changing and removing a document."""
+
+    first = create_status(path_docs)
+    documents = dict(first.documents, c=create_document_status("c"))
+    second = create_status(path_docs, documents)
+    documents = dict(documents, a=create_document_status("a", hash_content="new"))
+    third = create_status(path_docs, documents)
+    documents.pop("b")
+    fourth = create_status(path_docs, documents)
+    return [first, second, third, fourth]
+
+
+@pytest.fixture
+def store(tmp_path) -> StatusStore:
+    return StatusStore(path.join(tmp_path, "status.yaml"), history_max=10)
+
+
+def test_delta():
+    previous, current, *_ = create_statuses("docs")
+    delta = TextStatusDelta.create(current, previous)
+
+    assert delta.documents == dict(c=None)
+    assert not delta.data
+    assert delta.revert(current) == previous
+
+
+def test_history(store: StatusStore):
+    statuses = create_statuses("docs")
+    for status in statuses:
+        assert store.save(status)
+
+    assert not store.save(statuses[-1])
+
+    with open(store.filepath, "r") as file:
+        assert "history" not in yaml.safe_load(file)
+
+    status = store.load()
+    assert status is not None and status.status == statuses[-1]
+
+    current = status.status
+    for delta, expected in zip(store.history(), statuses[-2::-1], strict=True):
+        current = delta.revert(current)
+        assert current == expected
+
+
+def test_history_is_bounded(store: StatusStore):
+    store.history_max = 2
+    for status in create_statuses("docs"):
+        store.save(status)
+
+    assert len(store.history()) == 2
+
+
+def test_migrates_embedded_history(store: StatusStore):
+    first, second, third, fourth = create_statuses("docs")
+    legacy = TextBuilderStatus(status=third, history=[second, first])
+    with open(store.filepath, "w") as file:
+        yaml.dump(legacy.model_dump(mode="json"), file)
+
+    assert store.save(fourth)
+
+    current = fourth
+    for delta, expected in zip(store.history(), (third, second, first), strict=True):
+        current = delta.revert(current)
+        assert current == expected
+
+
+def test_keeps_mode(store: StatusStore):
+    statuses = create_statuses("docs")
+    store.save(statuses[0])
+
+    umask = os.umask(0)
+    os.umask(umask)
+    assert stat.S_IMODE(os.stat(store.filepath).st_mode) == 0o666 & ~umask
+
+    os.chmod(store.filepath, 0o640)
+    store.save(statuses[1])
+    assert stat.S_IMODE(os.stat(store.filepath).st_mode) == 0o640
+
+
+def test_remove_keeps_history(store: StatusStore):
+    first, second, *_ = create_statuses("docs")
+    store.save(first)
+    store.save(second)
+    store.remove()
+
+    assert store.load() is None
+    assert len(store.history()) == 1
@@ -0,0 +1,104 @@
+# =========================================================================== #
+import asyncio
+from os import path
+from typing import List
+
+import pytest
+import yaml
+
+# --------------------------------------------------------------------------- #
+from conftest import create_builder_status, create_document_status
+from text_app import depends, watch
+from text_app.cache import TextCache
+from text_app.schemas import TextBuilderStatus
+
+
+@pytest.fixture(autouse=True)
+def isolated(monkeypatch: pytest.MonkeyPatch) -> List[object]:
+    """Fresh caches. Warming is recorded instead of querying anything."""
+
+    warmed: List[object] = []
+
+    async def warm_app(**kwargs):
+        warmed.append(kwargs["names_include"])
+        return 0
+
+    monkeypatch.setattr(depends, "cache", TextCache(size_max=2**20))
+    monkeypatch.setattr(depends, "singletons", dict())
+    monkeypatch.setattr(depends, "warm_app", warm_app)
+    return warmed
+
+
+def write(filepath: str, status: TextBuilderStatus) -> None:
+    with open(filepath, "w") as file:
+        yaml.dump(status.model_dump(mode="json"), file)
+
+
+def fill(name: str, uuid: str) -> None:
+    depends.cache.set(("json", uuid), "json", size=1, name=name)
+    depends.cache.set(("page", name, uuid), "page", size=1, name=name)
+
+
+def test_swap_status_invalidates_changed():
+    status = create_builder_status("docs")
+    depends.singletons[depends.KEY_STATUS] = status
+    fill("a", "uuid-a")
+    fill("b", "uuid-b")
+
+    documents = dict(status.status.documents)
+    documents["a"] = create_document_status("a", hash_content="changed")
+    changed = depends.swap_status(create_builder_status("docs", documents))
+
+    assert changed == {"a"}
+    assert ("json", "uuid-a") not in depends.cache
+    assert ("page", "b", "uuid-b") in depends.cache
+
+
+def test_swap_status_survives_eviction():
+    """Documents patched in place keep their uuid, so they must be invalidated
+    even when the cache evicted everything else in the meantime."""
+
+    status = create_builder_status("docs")
+    depends.singletons[depends.KEY_STATUS] = status
+    depends.cache.set(("json", "filler"), "x", size=2**20)
+    fill("a", "uuid-a")
+
+    documents = dict(status.status.documents)
+    documents["a"] = create_document_status("a", hash_content="changed")
+
+    assert depends.swap_status(create_builder_status("docs", documents)) == {"a"}
+    assert ("json", "uuid-a") not in depends.cache
+
+
+def test_swap_status_without_previous():
+    fill("a", "uuid-a")
+
+    changed = depends.swap_status(create_builder_status("docs"))
+    assert changed == {"a", "b"}
+    assert len(depends.cache) == 0
+
+
+def test_watcher(tmp_path, isolated: List[object]):
+    filepath = path.join(tmp_path, "status.yaml")
+    status = create_builder_status(str(tmp_path))
+    write(filepath, status)
+    depends.singletons[depends.KEY_STATUS] = status
+
+    watcher = watch.StatusWatcher(filepath)
+    assert asyncio.run(watcher.check()) is None
+
+    documents = dict(status.status.documents)
+    documents["b"] = create_document_status("b", hash_content="changed")
+    write(filepath, create_builder_status(str(tmp_path), documents))
+
+    assert asyncio.run(watcher.check()) == {"b"}
+    assert isolated == [{"b"}]
+    assert depends.singletons[depends.KEY_STATUS].status.documents == documents
+
+
+def test_startup_without_config(monkeypatch: pytest.MonkeyPatch):
+    monkeypatch.setattr(depends, "PATH_TEXT_CONFIG", "/nonexistent/text.yaml")
+    monkeypatch.setattr(watch, "watcher", None)
+
+    asyncio.run(watch.startup())
+    assert watch.watcher is None